@@ -0,0 +1,156 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Seconds an AI call may take, by calling feature, before the caller falls back to its local path.
+# Interactive requests get short budgets; AI_LATENCY_BUDGETS overrides, e.g. "process_query_response=5,..."
+DEFAULT_BUDGETS = {
+    'process_query_response': 8,
+    'evaluate_leave_request': 8,
+    'auto_verify_documents': 8,
+    'validate_passport_data': 10,
+    'smart_field_correction': 10,
+    'enhance_passport_extraction': 15,
+}
+
+
+class AIUnavailable(RuntimeError):
+    """The AI circuit breaker is open; the caller should use its local fallback"""
+
+
+def parse_budgets(spec):
+    """{feature: seconds} from "feature=seconds,..." """
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        feature, _, seconds = item.partition('=')
+        budgets[feature.strip()] = float(seconds)
+    return budgets
+
+
+def is_outage(error):
+    """Whether an error from an OpenAI call says the API is degraded (rather than the request being bad)"""
+    if isinstance(error, (TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Fails AI calls fast while OpenAI is degraded.
+
+    The outcomes of the last AI_BREAKER_WINDOW calls (within
+    AI_BREAKER_WINDOW_SECONDS) are kept. Once at least AI_BREAKER_MIN_CALLS
+    are in the window, the breaker opens when the share that failed with an
+    outage error reaches AI_BREAKER_ERROR_RATE or their p95 latency exceeds
+    AI_BREAKER_P95_SECONDS. While open, calls raise AIUnavailable at once. After
+    AI_BREAKER_COOLDOWN_SECONDS one probe call is let through: success closes
+    the breaker, failure opens it for another cooldown. AI_BREAKER_ENABLED=0
+    turns it off.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get('AI_BREAKER_ENABLED', '1') != '0'
+        self.window = int(os.environ.get('AI_BREAKER_WINDOW', '20'))
+        self.window_seconds = float(os.environ.get('AI_BREAKER_WINDOW_SECONDS', '120'))
+        self.min_calls = int(os.environ.get('AI_BREAKER_MIN_CALLS', '5'))
+        self.error_rate = float(os.environ.get('AI_BREAKER_ERROR_RATE', '0.5'))
+        self.p95_seconds = float(os.environ.get('AI_BREAKER_P95_SECONDS', '10'))
+        self.cooldown = float(os.environ.get('AI_BREAKER_COOLDOWN_SECONDS', '30'))
+        self.budgets = dict(DEFAULT_BUDGETS, **parse_budgets(os.environ.get('AI_LATENCY_BUDGETS', '')))
+
+        self.state = 'closed'  # closed, open, half_open
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=self.window)  # (finished at, elapsed seconds, outage)
+        self._opened_at = None
+        self._probing = False
+        self._counters = {'opened': 0, 'short_circuited': 0, 'probes': 0}
+
+    def budget(self, feature):
+        """Latency budget in seconds for a feature, or None for the client's default deadline"""
+        return self.budgets.get(feature)
+
+    def call(self, fn):
+        """Run fn() through the breaker; raises AIUnavailable without calling it while open"""
+        if not self.enabled:
+            return fn()
+        probe = self._admit()
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._record(time.monotonic() - start, is_outage(e), probe)
+            raise
+        self._record(time.monotonic() - start, False, probe)
+        return result
+
+    def _admit(self):
+        """True for the half-open probe, False for a normal call; raises AIUnavailable while open"""
+        with self._lock:
+            if self.state == 'closed':
+                return False
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                self._counters['probes'] += 1
+                return True
+            self._counters['short_circuited'] += 1
+        raise AIUnavailable('AI temporarily unavailable (circuit breaker open)')
+
+    def _record(self, elapsed, outage, probe):
+        with self._lock:
+            if probe:
+                self._probing = False
+                if outage:
+                    self._open('probe failed')
+                else:
+                    logger.info("AI circuit breaker closed: probe call succeeded")
+                    self.state = 'closed'
+                    self._calls.clear()
+                return
+            if self.state != 'closed':
+                # A call admitted before the breaker opened
+                return
+
+            now = time.monotonic()
+            self._calls.append((now, elapsed, outage))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            if len(self._calls) < self.min_calls:
+                return
+
+            failures = sum(1 for _, _, failed in self._calls if failed)
+            latencies = sorted(seconds for _, seconds, _ in self._calls)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            if failures / len(self._calls) >= self.error_rate:
+                self._open(f"{failures}/{len(self._calls)} recent calls failed")
+            elif p95 > self.p95_seconds:
+                self._open(f"p95 latency {p95:.1f}s over {self.p95_seconds:g}s")
+
+    def _open(self, reason):
+        # Called with the lock held
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self._counters['opened'] += 1
+        self._calls.clear()
+        logger.warning(f"AI circuit breaker opened ({reason}); local fallbacks for {self.cooldown:g}s")
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['state'] = self.state
+            stats['recent_calls'] = len(self._calls)
+            stats['recent_failures'] = sum(1 for _, _, failed in self._calls if failed)
+        stats['enabled'] = self.enabled
+        stats['budgets'] = self.budgets
+        return stats
+
+
+ai_breaker = CircuitBreaker()
@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import has_app_context
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import AIResponseCacheEntry
+from lru_eviction import evict_lru
+
+logger = logging.getLogger(__name__)
+
+
+class AIResponseCache:
+    """Database cache of OpenAI chat completions.
+
+    Entries are keyed by the SHA-256 of the whole request (model,
+    temperature, messages, response format, ...), so an identical prompt is
+    answered from the table instead of the API. They expire after
+    AI_CACHE_TTL_SECONDS and are evicted least-recently-used beyond
+    AI_CACHE_MAX_ENTRIES entries or AI_CACHE_MAX_BYTES of responses.
+    Hit/miss counters are kept per process.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get('AI_CACHE_ENABLED', '1') != '0'
+        self.ttl = timedelta(seconds=int(os.environ.get('AI_CACHE_TTL_SECONDS', str(7 * 24 * 3600))))
+        self.max_entries = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '5000'))
+        self.max_bytes = int(os.environ.get('AI_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stored': 0, 'expired': 0, 'evicted': 0}
+
+    @staticmethod
+    def request_hash(request):
+        """Stable SHA-256 of a chat.completions request's keyword arguments"""
+        canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @property
+    def usable(self):
+        # Needs the database, so not available outside an app context (e.g. standalone scripts)
+        return self.enabled and has_app_context()
+
+    def get(self, key):
+        """Cached response content for a request hash (marking it used), or None"""
+        if not self.usable:
+            return None
+
+        try:
+            entry = AIResponseCacheEntry.query.filter_by(request_hash=key).first()
+            now = datetime.utcnow()
+            if entry and entry.expires_at and entry.expires_at <= now:
+                db.session.delete(entry)
+                db.session.commit()
+                self._count('expired')
+                entry = None
+            if entry is None:
+                self._count('misses')
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_used_at = now
+            response = entry.response
+            db.session.commit()
+            self._count('hits')
+            return response
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"AI response cache lookup failed: {str(e)}")
+            return None
+
+    def put(self, key, model, response):
+        """Store (or refresh) the response for a request hash"""
+        if not self.usable or response is None:
+            return
+
+        try:
+            now = datetime.utcnow()
+            entry = AIResponseCacheEntry.query.filter_by(request_hash=key).first()
+            if entry is None:
+                entry = AIResponseCacheEntry(request_hash=key)
+                db.session.add(entry)
+            entry.model = model
+            entry.response = response
+            entry.size_bytes = len(response.encode('utf-8'))
+            entry.created_at = now
+            entry.last_used_at = now
+            entry.expires_at = now + self.ttl
+            db.session.commit()
+            self._count('stored')
+            self._evict()
+        except IntegrityError:
+            # Another worker stored the same response first
+            db.session.rollback()
+        except Exception as e:
+            # The caller already has its response; losing the entry costs one repeat API call at most
+            db.session.rollback()
+            logger.warning(f"Failed to store AI response cache entry: {str(e)}")
+
+    def bypass(self):
+        """Count a call that asked for a fresh response"""
+        self._count('bypassed')
+
+    def _evict(self):
+        """Drop expired entries, then least-recently-used ones until both size bounds hold"""
+        expired = AIResponseCacheEntry.query.filter(AIResponseCacheEntry.expires_at <= datetime.utcnow()) \
+            .delete(synchronize_session=False)
+        if expired:
+            db.session.commit()
+            self._count('expired', expired)
+
+        evicted, freed = evict_lru(AIResponseCacheEntry, AIResponseCacheEntry.last_used_at,
+                                   self.max_entries, self.max_bytes)
+        if evicted:
+            self._count('evicted', evicted)
+            logger.info(f"Evicted {evicted} AI response cache entries ({freed} bytes)")
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['enabled'] = self.enabled
+        return stats
+
+
+ai_cache = AIResponseCache()
@@ -0,0 +1,83 @@
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Fields every passport has; a missing one is worth asking the AI about
+DEFAULT_REQUIRED_FIELDS = 'passport_number,surname,given_names,nationality,date_of_birth,sex,date_of_expiry'
+
+
+class AIEnhancementPolicy:
+    """Decides whether a parse result needs the OpenAI enhancement call, and for which fields.
+
+    A field is sent when its parser confidence is below AI_CONFIDENCE_THRESHOLD
+    or it is missing but listed in AI_REQUIRED_FIELDS; when no field qualifies
+    (or the MRZ is checksum-valid) the call is skipped. Counters of calls
+    needed and avoided, and of how the needed ones ended (answered, cut short
+    by the circuit breaker, failed), are kept per process.
+    """
+
+    def __init__(self):
+        self.threshold = float(os.environ.get('AI_CONFIDENCE_THRESHOLD', '0.7'))
+        self.required_fields = [field.strip() for field in
+                                os.environ.get('AI_REQUIRED_FIELDS', DEFAULT_REQUIRED_FIELDS).split(',')
+                                if field.strip()]
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls_needed': 0,
+            'calls_made': 0,
+            'calls_short_circuited': 0,
+            'calls_failed': 0,
+            'calls_avoided_mrz_valid': 0,
+            'calls_avoided_confident': 0,
+            'fields_sent': 0,
+            'fields_considered': 0,
+        }
+
+    def fields_to_enhance(self, passport_data):
+        """Field names to send to the AI; an empty list means skip the call"""
+        mrz = passport_data.get('mrz')
+        if mrz and mrz['valid']:
+            return []
+
+        confidence = passport_data.get('confidence') or {}
+        fields = []
+        for field, score in confidence.items():
+            if passport_data.get(field):
+                if score < self.threshold:
+                    fields.append(field)
+            elif field in self.required_fields:
+                fields.append(field)
+        return fields
+
+    def record(self, passport_data, fields):
+        """Count one decision made by fields_to_enhance"""
+        mrz = passport_data.get('mrz')
+        with self._lock:
+            self._counters['fields_considered'] += len(passport_data.get('confidence') or {})
+            if fields:
+                self._counters['calls_needed'] += 1
+            elif mrz and mrz['valid']:
+                self._counters['calls_avoided_mrz_valid'] += 1
+            else:
+                self._counters['calls_avoided_confident'] += 1
+
+    def record_call(self, fields, outcome):
+        """Count how a needed call ended: 'made' (answered), 'short_circuited' or 'failed'"""
+        with self._lock:
+            self._counters[f'calls_{outcome}'] += 1
+            if outcome == 'made':
+                self._counters['fields_sent'] += len(fields)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+        decisions = stats['calls_needed'] + stats['calls_avoided_mrz_valid'] + stats['calls_avoided_confident']
+        stats['calls_avoided'] = decisions - stats['calls_needed']
+        stats['avoided_ratio'] = round(stats['calls_avoided'] / decisions, 3) if decisions else None
+        stats['threshold'] = self.threshold
+        return stats
+
+
+ai_policy = AIEnhancementPolicy()
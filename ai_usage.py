@@ -0,0 +1,235 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from flask import has_app_context
+from sqlalchemy import insert, func
+from app import db
+from models import AICallLog
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds; one overflow bucket follows each
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# USD per million (prompt, completion) tokens; AI_PRICES overrides, e.g. "gpt-4o=2.5/10,gpt-4o-mini=0.15/0.6"
+DEFAULT_PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+# Log rows between prunes of the rolling log
+PRUNE_EVERY = 200
+
+# Unflushed log rows kept in memory at most
+MAX_PENDING = 10000
+
+
+def parse_prices(spec):
+    """{model: (prompt, completion) USD per million tokens} from "model=in/out,..." """
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        model, _, rates = item.partition('=')
+        prompt_rate, _, completion_rate = rates.partition('/')
+        prices[model.strip()] = (float(prompt_rate), float(completion_rate or prompt_rate))
+    return prices
+
+
+def _quantile(bounds, counts, q, observed_max):
+    """Upper bound of the histogram bucket holding the q-th quantile (the largest value seen for the overflow bucket)"""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= rank:
+            return bounds[index] if index < len(bounds) else observed_max
+    return observed_max
+
+
+class FeatureUsage:
+    """Aggregated calls of one feature: outcomes, tokens, cost and latency/token histograms"""
+
+    def __init__(self):
+        self.calls = 0
+        self.outcomes = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.elapsed_ms = 0.0
+        self.max_ms = 0.0
+        self.max_tokens = 0
+        self.latency = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.tokens = [0] * (len(TOKEN_BUCKETS) + 1)
+
+    def add(self, outcome, elapsed_ms, prompt_tokens, completion_tokens, cost_usd):
+        self.calls += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if outcome in ('cached', 'short_circuited'):
+            # Cache hits and calls refused by the circuit breaker never reach the API; keep them out of the
+            # latency and token figures
+            return
+        total_tokens = prompt_tokens + completion_tokens
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost_usd
+        self.elapsed_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.max_tokens = max(self.max_tokens, total_tokens)
+        self.latency[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if total_tokens:
+            self.tokens[bisect_left(TOKEN_BUCKETS, total_tokens)] += 1
+
+    def to_dict(self):
+        api_calls = self.calls - self.outcomes.get('cached', 0) - self.outcomes.get('short_circuited', 0)
+        return {
+            'calls': self.calls,
+            'outcomes': dict(self.outcomes),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost_usd': round(self.cost_usd, 4),
+            'avg_ms': round(self.elapsed_ms / api_calls, 1) if api_calls else None,
+            'p50_ms': _quantile(LATENCY_BUCKETS_MS, self.latency, 0.5, round(self.max_ms, 1)),
+            'p95_ms': _quantile(LATENCY_BUCKETS_MS, self.latency, 0.95, round(self.max_ms, 1)),
+            'max_ms': round(self.max_ms, 1),
+            'latency_histogram_ms': dict(zip([*map(str, LATENCY_BUCKETS_MS), 'more'], self.latency)),
+            'token_histogram': dict(zip([*map(str, TOKEN_BUCKETS), 'more'], self.tokens)),
+        }
+
+
+def summarise(entries):
+    """{'features': {feature: usage}, 'total': usage} for (feature, outcome, elapsed_ms, prompt, completion, cost) rows"""
+    features = {}
+    total = FeatureUsage()
+    for feature, outcome, elapsed_ms, prompt_tokens, completion_tokens, cost_usd in entries:
+        values = (outcome, elapsed_ms or 0.0, prompt_tokens or 0, completion_tokens or 0, cost_usd or 0.0)
+        features.setdefault(feature, FeatureUsage()).add(*values)
+        total.add(*values)
+    return {
+        'features': {feature: usage.to_dict() for feature, usage in sorted(features.items())},
+        'total': total.to_dict(),
+    }
+
+
+class AIUsageTracker:
+    """Tokens, latency, cost and outcome of every AI call, by calling feature.
+
+    Calls are aggregated in memory per process (snapshot()) and appended to
+    the ai_call_log table, a rolling log kept to AI_USAGE_LOG_DAYS (30) days
+    and AI_USAGE_LOG_MAX_ROWS (50000) rows that summarise_log() reads across
+    all workers. Calls made outside an app context (bulk AI worker threads)
+    are written by the next flush() that has one. Cost uses AI_PRICES on top
+    of DEFAULT_PRICES; AI_USAGE_ENABLED=0 turns tracking off.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get('AI_USAGE_ENABLED', '1') != '0'
+        self.log_days = int(os.environ.get('AI_USAGE_LOG_DAYS', '30'))
+        self.log_max_rows = int(os.environ.get('AI_USAGE_LOG_MAX_ROWS', '50000'))
+        self.prices = dict(DEFAULT_PRICES, **parse_prices(os.environ.get('AI_PRICES', '')))
+        self.started_at = datetime.utcnow()
+        self._lock = threading.Lock()
+        self._features = {}
+        self._total = FeatureUsage()
+        self._pending = []
+        self._since_prune = 0
+
+    def cost(self, model, prompt_tokens, completion_tokens):
+        prompt_rate, completion_rate = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1_000_000
+
+    def record(self, feature, model, outcome, elapsed, usage=None, error=None):
+        """Account for one call; ``elapsed`` in seconds, ``usage`` the response's token usage"""
+        if not self.enabled:
+            return
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        cost_usd = self.cost(model, prompt_tokens, completion_tokens)
+        elapsed_ms = elapsed * 1000
+
+        with self._lock:
+            for stats in (self._features.setdefault(feature, FeatureUsage()), self._total):
+                stats.add(outcome, elapsed_ms, prompt_tokens, completion_tokens, cost_usd)
+            if len(self._pending) >= MAX_PENDING:
+                # Nothing with an app context has flushed for a long time; the oldest rows go unlogged
+                self._pending.pop(0)
+            self._pending.append({
+                'created_at': datetime.utcnow(), 'feature': feature, 'model': model, 'outcome': outcome,
+                'elapsed_ms': round(elapsed_ms, 1), 'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens, 'cost_usd': cost_usd,
+                'error': error[:200] if error else None,
+            })
+        if has_app_context():
+            self.flush()
+
+    def flush(self):
+        """Write the calls recorded since the last flush to the rolling log"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._since_prune += len(rows)
+            prune = self._since_prune >= PRUNE_EVERY
+            if prune:
+                self._since_prune = 0
+        if not rows:
+            return
+
+        try:
+            db.session.execute(insert(AICallLog), rows)
+            db.session.commit()
+            if prune:
+                self._prune()
+        except Exception as e:
+            # Usage logging must never fail the AI call it describes
+            db.session.rollback()
+            logger.warning(f"Failed to write {len(rows)} AI call log rows: {str(e)}")
+
+    def _prune(self):
+        """Keep the log within AI_USAGE_LOG_DAYS and AI_USAGE_LOG_MAX_ROWS"""
+        deleted = AICallLog.query.filter(
+            AICallLog.created_at < datetime.utcnow() - timedelta(days=self.log_days)
+        ).delete(synchronize_session=False)
+        newest = db.session.query(func.max(AICallLog.id)).scalar() or 0
+        deleted += AICallLog.query.filter(AICallLog.id <= newest - self.log_max_rows) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        if deleted:
+            logger.info(f"Pruned {deleted} AI call log rows")
+
+    def snapshot(self):
+        """Usage recorded by this process since it started"""
+        with self._lock:
+            return {
+                'since': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'features': {feature: usage.to_dict() for feature, usage in sorted(self._features.items())},
+                'total': self._total.to_dict(),
+            }
+
+    def summarise_log(self, hours=24):
+        """Usage across all workers over the last ``hours``, from the rolling log"""
+        self.flush()
+        since = datetime.utcnow() - timedelta(hours=hours)
+        rows = db.session.query(AICallLog.feature, AICallLog.outcome, AICallLog.elapsed_ms,
+                                AICallLog.prompt_tokens, AICallLog.completion_tokens, AICallLog.cost_usd) \
+            .filter(AICallLog.created_at >= since).all()
+        return dict(summarise(rows), hours=hours)
+
+
+def timed_call(feature, model, call):
+    """Run call(), recording its outcome with ai_usage; returns its result"""
+    start = time.perf_counter()
+    try:
+        response = call()
+    except Exception as e:
+        outcome = 'deadline' if isinstance(e, TimeoutError) else 'error'
+        ai_usage.record(feature, model, outcome, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        raise
+    ai_usage.record(feature, model, 'ok', time.perf_counter() - start, getattr(response, 'usage', None))
+    return response
+
+
+ai_usage = AIUsageTracker()
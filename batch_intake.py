@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import zipfile
+import logging
+from werkzeug.utils import secure_filename
+from app import app, db
+from models import ProcessingBatch, ProcessingJob
+from job_queue import job_queue
+from ocr_cache import ocr_cache
+
+logger = logging.getLogger(__name__)
+
+OCR_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.pdf'}
+
+
+class BatchIntake:
+    """Queues a batch of uploads (loose files and/or ZIP archives) as OCR jobs.
+
+    Each document is written to the upload folder and becomes one
+    ProcessingJob of a ProcessingBatch; the background job queue does the OCR,
+    so the request only pays for reading the upload. ZIP entries are read one
+    at a time straight from the archive, so at most one entry is held in
+    memory. Documents already processed are reported without a job.
+    """
+
+    def __init__(self, ai_enhance=False):
+        self.ai_enhance = ai_enhance
+        self.commit_every = int(os.environ.get('BATCH_COMMIT_EVERY', '50'))
+        self.max_entry_size = int(os.environ.get('BATCH_MAX_ENTRY_BYTES', str(16 * 1024 * 1024)))
+
+    def run(self, uploads):
+        """Queue werkzeug FileStorage uploads; returns the ProcessingBatch"""
+        timestamp = str(int(time.time()))
+        batch = ProcessingBatch(ai_enhance=self.ai_enhance)
+        db.session.add(batch)
+        db.session.commit()
+
+        intake = []
+        pending_jobs = []
+        try:
+            for index, (filename, data, status) in enumerate(self._iter_entries(uploads)):
+                if status:
+                    intake.append(status)
+                    continue
+
+                file_hash = ocr_cache.hash_bytes(data)
+                existing = ocr_cache.existing_record(ocr_cache.get(file_hash))
+                if existing:
+                    intake.append({'filename': filename, 'status': 'duplicate', 'record_id': existing.id})
+                    continue
+
+                # The index keeps same-named entries (e.g. from different ZIP folders) apart
+                name, ext = os.path.splitext(filename)
+                stored_name = f"{name}_{timestamp}_{index}{ext}"
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], stored_name)
+                with open(filepath, 'wb') as f:
+                    f.write(data)
+                pending_jobs.append(ProcessingJob(filename=stored_name, filepath=filepath, file_hash=file_hash,
+                                                  original_filename=filename, batch_id=batch.id,
+                                                  ai_enhance=self.ai_enhance, status='queued'))
+
+                # Queue in chunks so workers start on the first documents while the rest are read
+                if len(pending_jobs) >= self.commit_every:
+                    job_queue.enqueue_many(pending_jobs)
+                    pending_jobs = []
+
+            job_queue.enqueue_many(pending_jobs)
+        except Exception:
+            db.session.rollback()
+            for job in pending_jobs:
+                if os.path.exists(job.filepath):
+                    os.remove(job.filepath)
+            raise
+        finally:
+            batch.intake = json.dumps(intake)
+            db.session.commit()
+        return batch
+
+    def _iter_entries(self, uploads):
+        """Yield (filename, bytes, None) per document or (None, None, status) for skips"""
+        for upload in uploads:
+            if not upload or not upload.filename:
+                continue
+            filename = secure_filename(upload.filename)
+            ext = os.path.splitext(filename)[1].lower()
+
+            if ext == '.zip':
+                yield from self._iter_zip(upload.stream, filename)
+            elif ext in OCR_EXTENSIONS:
+                yield filename, upload.read(), None
+            else:
+                yield None, None, self._skipped(filename, 'Unsupported file type')
+
+    def _iter_zip(self, stream, archive_name):
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile:
+            yield None, None, {'filename': archive_name, 'status': 'failed', 'error': 'Invalid ZIP archive'}
+            return
+
+        with archive:
+            for info in archive.infolist():
+                base = os.path.basename(info.filename)
+                if info.is_dir() or not base or base.startswith('.') or '__MACOSX' in info.filename:
+                    continue
+
+                filename = secure_filename(base)
+                if os.path.splitext(filename)[1].lower() not in OCR_EXTENSIONS:
+                    yield None, None, self._skipped(info.filename, 'Unsupported file type')
+                    continue
+                if info.file_size > self.max_entry_size:
+                    yield None, None, self._skipped(info.filename, 'File too large')
+                    continue
+
+                try:
+                    with archive.open(info) as entry:
+                        # Bound the read in case the header under-reports the size
+                        data = entry.read(self.max_entry_size + 1)
+                except Exception as e:
+                    yield None, None, {'filename': info.filename, 'status': 'failed', 'error': str(e)}
+                    continue
+
+                if len(data) > self.max_entry_size:
+                    yield None, None, self._skipped(info.filename, 'File too large')
+                    continue
+                yield filename, data, None
+
+    @staticmethod
+    def _skipped(filename, reason):
+        return {'filename': filename, 'status': 'skipped', 'error': reason}
+
+
+def batch_status(batch):
+    """Progress of a batch: counts by status and one entry per file, from its jobs and the intake report"""
+    files = json.loads(batch.intake) if batch.intake else []
+    jobs = ProcessingJob.query.filter_by(batch_id=batch.id).order_by(ProcessingJob.id).all()
+    for job in jobs:
+        status = 'duplicate' if job.status == 'done' and job.duplicate else job.status
+        entry = {'filename': job.original_filename or job.filename, 'status': status, 'job_id': job.id,
+                 'record_id': job.passport_record_id}
+        if job.error and job.status == 'failed':
+            entry['error'] = job.error
+        files.append(entry)
+
+    counts = {}
+    for entry in files:
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    pending = counts.get('queued', 0) + counts.get('running', 0)
+
+    return {
+        'batch_id': batch.id,
+        'finished': not pending,
+        'total': len(files),
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'succeeded': counts.get('done', 0),
+        'failed': counts.get('failed', 0),
+        'skipped': counts.get('skipped', 0),
+        'duplicates': counts.get('duplicate', 0),
+        'created_at': batch.created_at.strftime('%Y-%m-%d %H:%M:%S') if batch.created_at else None,
+        'files': files
+    }
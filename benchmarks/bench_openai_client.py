@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared OpenAI client against a local stand-in for the API.
+
+The stand-in server answers /v1/chat/completions after a configurable
+latency and fails a fraction of requests with 429 (with Retry-After) or 503,
+or hangs past the deadline, so retries, backoff, deadlines and connection
+reuse can be measured without network access or an API key. The shared
+client (openai_client.py) is compared with the old pattern of building a new
+OpenAI client for every call.
+
+    python -m benchmarks.bench_openai_client --calls 200 --threads 16 --error-rate 0.2
+    python -m benchmarks.bench_openai_client --hang-rate 0.1 --timeout 2 --json client.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_pipeline import percentile
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Minimal chat completions endpoint with injectable latency and failures"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.05, error_rate=0.0, hang_rate=0.0, hang_seconds=30.0, retry_after=None, seed=0):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.statuses = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def outcome(self):
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.hang_rate:
+            return 'hang'
+        if roll < self.hang_rate + self.error_rate:
+            return 429 if roll < self.hang_rate + self.error_rate / 2 else 503
+        return 200
+
+    def count(self, client_address, status):
+        with self.lock:
+            self.connections.add(client_address)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.connections.clear()
+            self.statuses.clear()
+
+    def handle_error(self, request, client_address):
+        # Callers that gave up (deadline, closed client) drop the connection mid-response
+        pass
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        outcome = self.server.outcome()
+        if outcome == 'hang':
+            self.server.count(self.client_address, 'hang')
+            time.sleep(self.server.hang_seconds)
+            return
+
+        time.sleep(self.server.latency)
+        self.server.count(self.client_address, outcome)
+        if outcome == 200:
+            body = {
+                'id': 'chatcmpl-standin', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'gpt-4o',
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': '{"valid": true, "issues": []}'}}],
+                'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15},
+            }
+        else:
+            body = {'error': {'message': 'stand-in failure', 'type': 'server_error', 'code': None}}
+        payload = json.dumps(body).encode()
+        self.send_response(outcome)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if outcome == 429 and self.server.retry_after is not None:
+            self.send_header('Retry-After', str(self.server.retry_after))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+MESSAGES = [{'role': 'user', 'content': 'Validate this passport data.'}]
+
+
+def run_calls(call, calls, threads):
+    """Run ``calls`` invocations of call() on ``threads`` threads; returns (latencies, errors, wall seconds)"""
+    latencies, errors = [], {}
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            call()
+            error = None
+        except Exception as e:
+            error = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(calls)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarise(name, server, latencies, errors, wall, extra=None):
+    result = {
+        'client': name,
+        'calls': len(latencies),
+        'failed': sum(errors.values()),
+        'errors': errors,
+        'calls_per_second': round(len(latencies) / wall, 1) if wall else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'max_ms': round(max(latencies) * 1000, 1),
+        'connections': len(server.connections),
+        'server_responses': {str(key): value for key, value in sorted(server.statuses.items(), key=str)},
+    }
+    result.update(extra or {})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16, help='concurrent callers (web worker threads)')
+    parser.add_argument('--latency', type=float, default=0.05, help='stand-in response time in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='fraction of responses that are 429 or 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='fraction of requests that never answer')
+    parser.add_argument('--retry-after', type=float, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--timeout', type=float, default=5.0, help='OPENAI_TIMEOUT per call for the shared client')
+    parser.add_argument('--concurrency', type=int, default=4, help='OPENAI_MAX_CONCURRENCY for the shared client')
+    parser.add_argument('--skip-baseline', action='store_true', help='do not run the client-per-call baseline')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency, error_rate=args.error_rate, hang_rate=args.hang_rate,
+                           hang_seconds=args.timeout * 3, retry_after=args.retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        'OPENAI_API_KEY': 'stand-in', 'OPENAI_BASE_URL': server.base_url, 'OPENAI_TIMEOUT': str(args.timeout),
+        'OPENAI_MAX_CONCURRENCY': str(args.concurrency),
+    })
+    from openai import OpenAI
+    from openai_client import OpenAIClientManager
+
+    results = []
+    if not args.skip_baseline:
+        # Before: a new client (and connection pool) per call with the SDK's own retries; its 600 s
+        # default read timeout is cut to 3x the deadline so hung requests do not stall the run
+        def per_call_client():
+            client = OpenAI(api_key='stand-in', base_url=server.base_url, timeout=args.timeout * 3)
+            try:
+                client.chat.completions.create(model='gpt-4o', messages=MESSAGES)
+            finally:
+                client.close()
+        latencies, errors, wall = run_calls(per_call_client, args.calls, args.threads)
+        results.append(summarise('client per call', server, latencies, errors, wall))
+        server.reset()
+
+    manager = OpenAIClientManager()
+    latencies, errors, wall = run_calls(lambda: manager.chat(model='gpt-4o', messages=MESSAGES), args.calls, args.threads)
+    stats = manager.snapshot()
+    results.append(summarise('shared', server, latencies, errors, wall,
+                             {'retries': stats['retries'], 'deadline_exceeded': stats['deadline_exceeded']}))
+    manager.close()
+    server.shutdown()
+
+    print(f"{'client':<18}{'calls/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'failed':>8}{'conns':>7}  server responses")
+    for result in results:
+        print(f"{result['client']:<18}{result['calls_per_second']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+              f"{result['max_ms']:>9}{result['failed']:>8}{result['connections']:>7}  {result['server_responses']}")
+        if result['errors']:
+            print(f"{'':<18}errors: {result['errors']}")
+    shared = results[-1]
+    print(f"\nshared client: {shared['retries']} retries, {shared['deadline_exceeded']} deadlines exceeded")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
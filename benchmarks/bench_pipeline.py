@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark the OCR pipeline stage by stage on synthetic passports.
+
+Generates reproducible passport data pages (valid MRZ, noise, rotation,
+JPEG artifacts, multi-page PDFs) and reports, per stage, throughput,
+p50/p95 latency and peak RSS, plus field-level parse accuracy against the
+ground truth. When tesseract is not installed the OCR stage is skipped and
+the parser runs on the ideal page text and word boxes instead.
+
+    python -m benchmarks.bench_pipeline --count 20 --formats jpg pdf --json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.bench_enhance import _reset_peak_rss, _status_kb
+from benchmarks.synthetic_passports import generate, save_sample
+from nationalities import lookup as nationality_code
+
+ACCURACY_FIELDS = ['passport_number', 'surname', 'given_names', 'nationality', 'date_of_birth',
+                   'place_of_birth', 'sex', 'date_of_issue', 'date_of_expiry']
+IMAGE_FORMATS = {'jpg', 'png'}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def field_matches(field, value, sample):
+    """Normalised comparison of one parsed field with the ground truth"""
+    if not value:
+        return False
+    if field == 'nationality':
+        # Demonym, country name or code: whatever resolves to the MRZ nationality counts
+        return nationality_code(str(value)) == sample['nationality_code']
+    value = ' '.join(str(value).upper().split())
+    expected = ' '.join(sample['fields'][field].upper().split())
+    return value == expected
+
+
+class StageRecorder:
+    """Collects latencies and the peak RSS growth of each pipeline stage"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.peaks = {}
+        self.skipped = {}
+
+    def run(self, stage, func, *args):
+        resettable = _reset_peak_rss()
+        baseline_kb = _status_kb('VmRSS')
+        start = time.perf_counter()
+        result = func(*args)
+        self.latencies.setdefault(stage, []).append(time.perf_counter() - start)
+        if resettable:
+            peak_mb = max(0, _status_kb('VmHWM') - baseline_kb) / 1024.0
+            self.peaks[stage] = max(self.peaks.get(stage, 0.0), peak_mb)
+        return result
+
+    def summary(self):
+        stages = {}
+        for stage, latencies in self.latencies.items():
+            total = sum(latencies)
+            stages[stage] = {
+                'documents': len(latencies),
+                'docs_per_second': round(len(latencies) / total, 2) if total else None,
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'mean_ms': round(statistics.mean(latencies) * 1000, 1),
+                'peak_rss_mb': round(self.peaks[stage], 1) if stage in self.peaks else None,
+            }
+        for stage, reason in self.skipped.items():
+            stages[stage] = {'skipped': reason}
+        return stages
+
+
+def run_benchmark(count, seed, formats, pdf_pages, jpeg_quality, noise, rotation):
+    from image_enhance import enhance_for_ocr
+    from mrz_locator import locate_mrz
+    from ocr_processor import OCRProcessor
+    from passport_parser import PassportParser
+
+    processor = OCRProcessor()
+    parser = PassportParser()
+    recorder = StageRecorder()
+    correct = {field: 0 for field in ACCURACY_FIELDS}
+    documents = 0
+    ocr_available = True
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for sample in generate(count, seed=seed, noise=noise, rotation=rotation):
+            for fmt in formats:
+                path = save_sample(sample, os.path.join(workdir, f"{sample['id']}.{fmt}"),
+                                   jpeg_quality=jpeg_quality, pdf_pages=pdf_pages)
+                documents += 1
+
+                if fmt in IMAGE_FORMATS:
+                    enhanced = recorder.run('enhance', lambda: enhance_for_ocr(Image.open(path)))
+                    recorder.run('mrz_locate', locate_mrz, np.asarray(enhanced))
+
+                text, layout = sample['text'], sample['layout']
+                if ocr_available:
+                    try:
+                        ocr_result = recorder.run('ocr', processor.extract_file, path)
+                        text, layout = ocr_result['text'], ocr_result.get('layout')
+                    except Exception as e:
+                        # No tesseract (or poppler for PDFs): benchmark the parser on ideal text and boxes
+                        ocr_available = False
+                        recorder.skipped['ocr'] = f"{type(e).__name__}: {str(e)[:120]}"
+                        recorder.latencies.pop('ocr', None)
+
+                parsed = recorder.run('parse', parser.parse_passport_text, text, None, layout)
+                for field in ACCURACY_FIELDS:
+                    correct[field] += field_matches(field, parsed.get(field), sample)
+
+    accuracy = {field: round(hits / documents, 3) for field, hits in correct.items()} if documents else {}
+    return {
+        'documents': documents,
+        'parse_input': 'ocr' if ocr_available else 'ground_truth_text',
+        'stages': recorder.summary(),
+        'field_accuracy': accuracy,
+        'mean_accuracy': round(statistics.mean(accuracy.values()), 3) if accuracy else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=10, help='synthetic passports to generate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--formats', nargs='+', default=['jpg', 'pdf'], choices=['jpg', 'png', 'pdf'])
+    parser.add_argument('--pdf-pages', type=int, default=3, help='pages per PDF (data page first)')
+    parser.add_argument('--jpeg-quality', type=int, default=75)
+    parser.add_argument('--noise', type=float, default=8.0, help='Gaussian noise sigma')
+    parser.add_argument('--rotation', type=float, default=1.5, help='maximum skew in degrees')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.count, args.seed, args.formats, args.pdf_pages,
+                            args.jpeg_quality, args.noise, args.rotation)
+
+    print(f"{results['documents']} documents, parser input: {results['parse_input']}")
+    print(f"{'stage':<12}{'docs/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>10}")
+    for stage, stats in results['stages'].items():
+        if 'skipped' in stats:
+            print(f"{stage:<12}  skipped ({stats['skipped']})")
+            continue
+        peak = stats['peak_rss_mb'] if stats['peak_rss_mb'] is not None else float('nan')
+        print(f"{stage:<12}{stats['docs_per_second']:>9}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{peak:>10.1f}")
+
+    print('\nfield accuracy')
+    for field, value in results['field_accuracy'].items():
+        print(f"  {field:<18}{value:>7.1%}")
+    print(f"  {'mean':<18}{results['mean_accuracy']:>7.1%}")
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(results, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
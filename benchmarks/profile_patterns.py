@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Profile every regex the passport parser runs for cost and superlinear growth.
+
+Each pattern (and the parser as a whole) is timed over a corpus of synthetic
+passport texts and noisy raw_text, then over fuzzed inputs of doubling size:
+repeated OCR-like fragments, near-miss repetitions of the pattern's own
+corpus matches and random noise. The growth exponent is the log-log slope of
+time against input size; about 1.0 is linear, and a pattern above the
+threshold, or one that does not finish a single input within the timeout, is
+flagged. Exits non-zero when anything is flagged.
+
+    python -m benchmarks.profile_patterns --sizes 2 4 8 16 --json patterns.json
+    python -m benchmarks.profile_patterns --legacy --only legacy
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import queue
+import random
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mrz import find_mrz
+from passport_parser import PassportParser, LABEL_RE, FIELD_VALUES, FALLBACK_PATTERNS, _ASCII_LOWER
+from benchmarks.bench_parser import LegacyPassportParser, synthetic_texts, noisy_raw_text
+
+# Fragments that pump the character classes the parser's patterns are built from
+FUZZ_CHUNKS = ['a', 'A', '1', ' ', '\n', '<', '-', 'a ', 'A ', '1 ', '1/', '1-', '1.', 'a1', 'A1', '+1', '+1 ',
+               '12 ', 'ab ', 'dob ', 'no ', 'male', 'A<', "a'", 'a,', ' -', 'ab1234567']
+FUZZ_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789      <<<+-/.,:()\'\n'
+
+
+def _finditer(pattern, lowered):
+    def run(text):
+        for _ in pattern.finditer(text.translate(_ASCII_LOWER) if lowered else text):
+            pass
+    return run
+
+
+def parser_targets(legacy=False):
+    """(name, callable(text), compiled pattern or None) for everything profiled.
+
+    Names match the ones PassportParser reports when a parse runs past its
+    time budget. Label and fallback patterns run on the lower-cased text.
+    """
+    targets = [('LABEL_RE', _finditer(LABEL_RE, True), LABEL_RE)]
+    seen = set()
+    for field, pattern in FIELD_VALUES.items():
+        if pattern not in seen:
+            seen.add(pattern)
+            targets.append((f'FIELD_VALUES[{field}]', _finditer(pattern, False), pattern))
+    for field, pattern in FALLBACK_PATTERNS.items():
+        targets.append((f'FALLBACK_PATTERNS[{field}]', _finditer(pattern, True), pattern))
+    targets.append(('mrz', find_mrz, None))
+
+    parser = PassportParser(time_budget=0)
+    targets.append(('parse_passport_text', parser.parse_passport_text, None))
+
+    if legacy:
+        for field, patterns in LegacyPassportParser().patterns.items():
+            for index, source in enumerate(patterns):
+                pattern = re.compile(source, re.IGNORECASE | re.MULTILINE)
+                targets.append((f'legacy.{field}[{index}]', _finditer(pattern, False), pattern))
+    return targets
+
+
+def fuzz_inputs(pattern, corpus, seed=0):
+    """(description, make(size in characters) -> text) pairs of adversarial inputs for one pattern"""
+    inputs = [(f'{chunk!r} x n', lambda size, chunk=chunk: chunk * (size // len(chunk))) for chunk in FUZZ_CHUNKS]
+    inputs.append(('labels over values', lambda size: 'dob ' * (size // 8) + '\n' + 'ab ' * (size // 6)))
+
+    def noise(size):
+        rng = random.Random(seed + size)
+        return ''.join(rng.choice(FUZZ_ALPHABET) for _ in range(size))
+    inputs.append(('random noise', noise))
+
+    if pattern is not None:
+        # A real match minus its last character, repeated: each repetition almost matches again
+        matches = []
+        for text in corpus:
+            for match in pattern.finditer(text):
+                value = match.group(0)
+                if len(value) > 1 and value not in matches:
+                    matches.append(value)
+            if len(matches) >= 3:
+                break
+        for value in matches[:3]:
+            pump = value[:-1]
+            inputs.append((f'{pump!r} x n', lambda size, pump=pump: pump * (size // len(pump)) + '!'))
+    return inputs
+
+
+def time_call(func, text, min_time=0.002, repeat=2):
+    """Best seconds per call, each measurement looping until it takes at least min_time"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func(text)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= max(2, min(100, int(min_time / max(elapsed, 1e-7))))
+    best = elapsed
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def growth_exponent(sizes, seconds):
+    """Least-squares slope of log(time) against log(size)"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 0.0
+
+
+def _sweep(func, inputs, sizes, results):
+    """Child process: time every fuzzed input at every size, reporting each step"""
+    for description, make in inputs:
+        seconds = []
+        for size in sizes:
+            results.put(('start', description, size))
+            seconds.append(time_call(func, make(size)))
+        results.put(('done', description, seconds))
+    results.put(('end', None, None))
+
+
+def fuzz(func, inputs, sizes, timeout):
+    """Run the sweep in a child process so a catastrophic pattern can be killed.
+
+    Returns ({description: seconds per size}, (description, size) that timed out or None).
+    """
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    child = context.Process(target=_sweep, args=(func, inputs, sizes, results), daemon=True)
+    child.start()
+    timings = {}
+    running = None
+    try:
+        while True:
+            try:
+                kind, description, value = results.get(timeout=timeout)
+            except queue.Empty:
+                return timings, running
+            if kind == 'start':
+                running = (description, value)
+            elif kind == 'done':
+                timings[description] = value
+            else:
+                return timings, None
+    finally:
+        child.terminate()
+        child.join()
+
+
+def profile(name, func, pattern, corpus, corpus_kb, sizes, timeout, threshold):
+    start = time.perf_counter()
+    for text in corpus:
+        func(text)
+    corpus_seconds = time.perf_counter() - start
+
+    lowered_corpus = [text.translate(_ASCII_LOWER) for text in corpus] if name.startswith(('LABEL', 'FALLBACK')) else corpus
+    chars = [size * 1024 for size in sizes]
+    timings, timed_out = fuzz(func, fuzz_inputs(pattern, lowered_corpus), chars, timeout)
+
+    exponents = {description: growth_exponent(chars, seconds) for description, seconds in timings.items()}
+    worst = max(exponents, key=exponents.get) if exponents else None
+    return {
+        'pattern': name,
+        'source': pattern.pattern if pattern is not None else None,
+        'corpus_us_per_kb': round(corpus_seconds * 1e6 / corpus_kb, 2),
+        'growth': round(exponents[worst], 2) if worst else None,
+        'worst_input': worst,
+        'worst_ms_at_max_size': round(timings[worst][-1] * 1000, 3) if worst else None,
+        'timed_out': list(timed_out) if timed_out else None,
+        'flagged': bool(timed_out) or (worst is not None and exponents[worst] > threshold),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100, help='synthetic passport texts in the corpus')
+    parser.add_argument('--noise', type=int, nargs='+', default=[64], help='noisy raw_text sizes in KB in the corpus')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 4, 8, 16], help='fuzzed input sizes in KB')
+    parser.add_argument('--threshold', type=float, default=1.5, help='growth exponent flagged as superlinear')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds one fuzzed input may take')
+    parser.add_argument('--legacy', action='store_true', help='also profile the legacy per-field patterns')
+    parser.add_argument('--only', help='profile only patterns whose name contains this text')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    corpus = [text for text, _ in synthetic_texts(args.count)]
+    corpus += [noisy_raw_text(size, seed=size) for size in args.noise]
+    corpus_kb = sum(len(text) for text in corpus) / 1024
+
+    print(f"{'pattern':<34}{'corpus':>14}{'growth':>8}  worst input")
+    results = []
+    for name, func, pattern in parser_targets(args.legacy):
+        if args.only and args.only not in name:
+            continue
+        result = profile(name, func, pattern, corpus, corpus_kb, args.sizes, args.timeout, args.threshold)
+        results.append(result)
+        if result['timed_out']:
+            worst = f"timed out on {result['timed_out'][0]} at {result['timed_out'][1] // 1024} KB"
+        else:
+            worst = f"{result['worst_input']} ({result['worst_ms_at_max_size']:.2f} ms at {args.sizes[-1]} KB)"
+        growth = f"{result['growth']:.2f}" if result['growth'] is not None else '-'
+        flag = '  <-- superlinear' if result['flagged'] else ''
+        print(f"{name:<34}{result['corpus_us_per_kb']:>8.1f} us/KB{growth:>8}  {worst}{flag}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'sizes_kb': args.sizes, 'threshold': args.threshold, 'patterns': results}, f, indent=2)
+
+    flagged = [result['pattern'] for result in results if result['flagged']]
+    if flagged:
+        print(f"\n{len(flagged)} flagged: {', '.join(flagged)}")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
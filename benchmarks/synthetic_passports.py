@@ -0,0 +1,196 @@
+"""
+Synthetic passport data pages for offline benchmarks.
+
+Each sample is a dict with the ground-truth ``fields`` (in PassportParser's
+output format), the ideal OCR ``text`` (visual zone plus MRZ), its word
+boxes as a ``layout`` and the rendered, degraded page ``image``. ``save_sample`` writes it as JPEG, PNG
+or a multi-page PDF.
+"""
+
+import re
+import random
+from datetime import date, timedelta
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from ocr_backends import DATA_KEYS
+from word_layout import WordLayout
+
+SURNAMES = ['RAHMAN', 'HOSSAIN', 'SHARMA', 'PERERA', 'KHAN', 'SMITH', 'FERNANDO', 'THAPA', 'ALI', 'DAS']
+GIVEN_NAMES = ['MOHAMMED', 'ABDUL', 'KAMAL', 'PRIYA', 'RAVI', 'AHMED', 'JOHN', 'NIMAL', 'SITA', 'IBRAHIM']
+PLACES = ['DHAKA', 'CHITTAGONG', 'MUMBAI', 'COLOMBO', 'KATHMANDU', 'LAHORE', 'LONDON', 'MALE']
+COUNTRIES = [
+    ('BGD', 'BANGLADESHI'), ('IND', 'INDIAN'), ('PAK', 'PAKISTANI'), ('LKA', 'SRI LANKAN'),
+    ('NPL', 'NEPALESE'), ('MDV', 'MALDIVIAN'), ('GBR', 'BRITISH'), ('USA', 'AMERICAN'),
+]
+
+_CHECK_WEIGHTS = (7, 3, 1)
+
+
+def mrz_check_digit(value):
+    """ICAO 9303 check digit: weights 7-3-1, A-Z = 10-35, '<' = 0"""
+    total = 0
+    for i, char in enumerate(value):
+        if char.isdigit():
+            digit = int(char)
+        elif char.isalpha():
+            digit = ord(char.upper()) - 55
+        else:
+            digit = 0
+        total += digit * _CHECK_WEIGHTS[i % 3]
+    return str(total % 10)
+
+
+def td3_mrz(fields, nationality_code):
+    """The two 44-character TD3 MRZ lines for a set of passport fields"""
+    names = fields['surname'].replace(' ', '<') + '<<' + fields['given_names'].replace(' ', '<')
+    line1 = ('P<' + nationality_code + names)[:44].ljust(44, '<')
+
+    def yymmdd(value):
+        day, month, year = value.split('/')
+        return year[2:] + month + day
+
+    number = fields['passport_number'].ljust(9, '<')
+    birth = yymmdd(fields['date_of_birth'])
+    expiry = yymmdd(fields['date_of_expiry'])
+    personal = '<' * 14
+    line2 = (number + mrz_check_digit(number) + nationality_code + birth + mrz_check_digit(birth)
+             + fields['sex'] + expiry + mrz_check_digit(expiry) + personal + mrz_check_digit(personal))
+    composite = line2[0:10] + line2[13:20] + line2[21:43]
+    return line1, line2 + mrz_check_digit(composite)
+
+
+def random_fields(rng):
+    """Random ground truth in PassportParser output format (names title-cased, DD/MM/YYYY dates)"""
+    code, nationality = rng.choice(COUNTRIES)
+    birth = date(1960, 1, 1) + timedelta(days=rng.randrange(365 * 45))
+    issue = date(2016, 1, 1) + timedelta(days=rng.randrange(365 * 8))
+    # Ten years less a day (an issue date of 29 February counts from the 28th)
+    anniversary = issue.replace(day=28) if (issue.month, issue.day) == (2, 29) else issue
+    expiry = anniversary.replace(year=issue.year + 10) - timedelta(days=1)
+    fields = {
+        'passport_number': rng.choice('ABCEKLMNP') + ''.join(rng.choice('0123456789') for _ in range(7)),
+        'surname': rng.choice(SURNAMES),
+        'given_names': ' '.join(rng.sample(GIVEN_NAMES, rng.choice([1, 2]))),
+        'nationality': nationality,
+        'date_of_birth': birth.strftime('%d/%m/%Y'),
+        'place_of_birth': rng.choice(PLACES),
+        'sex': rng.choice('MF'),
+        'date_of_issue': issue.strftime('%d/%m/%Y'),
+        'date_of_expiry': expiry.strftime('%d/%m/%Y'),
+    }
+    return fields, code
+
+
+def _font(size, mono=False):
+    names = ['DejaVuSansMono.ttf', 'LiberationMono-Regular.ttf'] if mono else ['DejaVuSans.ttf', 'LiberationSans-Regular.ttf']
+    for name in names:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def _draw_words(draw, xy, text, font, fill, data):
+    """Draw one line of text; with ``data``, also record its word boxes in image_to_data form"""
+    draw.text(xy, text, fill=fill, font=font)
+    if data is None:
+        return
+    x, y = xy
+    line = len(set(data['line_num'])) + 1
+    for word_num, match in enumerate(re.finditer(r'\S+', text), 1):
+        left = x + draw.textlength(text[:match.start()], font=font)
+        box = draw.textbbox((left, y), match.group(), font=font)
+        values = (5, 1, 1, 1, line, word_num, int(box[0]), int(box[1]), int(box[2] - box[0]), int(box[3] - box[1]),
+                  96, match.group())
+        for key, value in zip(DATA_KEYS, values):
+            data[key].append(value)
+
+
+def render_page(fields, code, width=1800, data=None):
+    """Clean grayscale data page: photo, labelled visual zone and MRZ.
+
+    Pass ``data={key: [] for key in DATA_KEYS}`` to have the ideal
+    image_to_data output (every word's box) filled in.
+    """
+    height = int(width * 0.7)
+    unit = width / 1800.0
+    gradient = np.linspace(228, 245, width)[None, :] + np.linspace(0, 8, height)[:, None]
+    page = Image.fromarray(gradient.astype(np.uint8), mode='L')
+    draw = ImageDraw.Draw(page)
+
+    label_font, value_font, mrz_font = _font(int(22 * unit)), _font(int(34 * unit)), _font(int(60 * unit), mono=True)
+
+    # Photo: textured block on the left
+    photo = np.random.default_rng(len(fields['surname'])).normal(140, 30, (int(520 * unit), int(400 * unit)))
+    page.paste(Image.fromarray(np.clip(photo, 0, 255).astype(np.uint8), mode='L'), (int(70 * unit), int(180 * unit)))
+
+    _draw_words(draw, (int(70 * unit), int(50 * unit)), 'PASSPORT', _font(int(48 * unit)), 40, data)
+    rows = [
+        ('Type / Code / Passport No.', f"P   {code}   {fields['passport_number']}"),
+        ('Surname', fields['surname']),
+        ('Given Names', fields['given_names']),
+        ('Nationality', fields['nationality']),
+        ('Date of Birth', fields['date_of_birth']),
+        ('Sex   Place of Birth', f"{fields['sex']}   {fields['place_of_birth']}"),
+        ('Date of Issue', fields['date_of_issue']),
+        ('Date of Expiry', fields['date_of_expiry']),
+    ]
+    x, y = int(540 * unit), int(170 * unit)
+    for label, value in rows:
+        _draw_words(draw, (x, y), label, label_font, 90, data)
+        _draw_words(draw, (x, y + int(26 * unit)), value, value_font, 20, data)
+        y += int(85 * unit)
+
+    line1, line2 = td3_mrz(fields, code)
+    # 44 monospaced characters across ~92% of the page width, as on a real TD3 page
+    _draw_words(draw, (int(60 * unit), height - int(240 * unit)), line1, mrz_font, 15, data)
+    _draw_words(draw, (int(60 * unit), height - int(130 * unit)), line2, mrz_font, 15, data)
+
+    text = '\n'.join(f'{label}\n{value}' for label, value in rows) + f'\n{line1}\n{line2}'
+    return page, text
+
+
+def degrade(image, rng, noise=8.0, rotation=1.5, blur=0.6):
+    """Scanner-like damage: small rotation, blur and Gaussian sensor noise"""
+    if rotation:
+        image = image.rotate(rng.uniform(-rotation, rotation), resample=Image.BICUBIC, expand=True, fillcolor=235)
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    if noise:
+        noisy = np.asarray(image, dtype=np.float32) + np.random.default_rng(rng.randrange(2 ** 32)).normal(
+            0, noise, (image.size[1], image.size[0]))
+        image = Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8), mode='L')
+    return image.convert('RGB')
+
+
+def generate(count, seed=0, width=1800, noise=8.0, rotation=1.5, blur=0.6):
+    """Yield ``count`` reproducible synthetic passport samples"""
+    rng = random.Random(seed)
+    for index in range(count):
+        fields, code = random_fields(rng)
+        data = {key: [] for key in DATA_KEYS}
+        page, text = render_page(fields, code, width=width, data=data)
+        yield {
+            'id': f'synthetic-{seed}-{index}',
+            'fields': fields,
+            'nationality_code': code,
+            'text': text,
+            'layout': WordLayout.from_data(data),
+            'image': degrade(page, rng, noise=noise, rotation=rotation, blur=blur),
+        }
+
+
+def save_sample(sample, path, jpeg_quality=75, pdf_pages=1):
+    """Write a sample as .jpg/.png, or as a PDF whose first page is the data page"""
+    image = sample['image']
+    if path.endswith('.pdf'):
+        blank = Image.new('RGB', image.size, (240, 240, 240))
+        image.save(path, save_all=True, append_images=[blank] * (pdf_pages - 1), resolution=300)
+    elif path.endswith(('.jpg', '.jpeg')):
+        image.save(path, quality=jpeg_quality)
+    else:
+        image.save(path)
+    return path
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Run AI validation or enhancement over many PassportRecords at once.
+
+Records are selected by filter and packed several to a prompt (enhancement
+only while their OCR text stays under --max-prompt-chars). Prompts are sent
+from a thread pool under a requests-per-minute limit, and results are
+written back in batched transactions. The same runner backs the
+/api/ai/bulk background jobs.
+
+    python bulk_ai.py validate --since 2025-06-01 --unvalidated
+    python bulk_ai.py enhance --missing place_of_birth --only-empty --dry-run
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from passport_parser import PASSPORT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+MODES = ('validate', 'enhance')
+
+
+class RateLimiter:
+    """Spaces acquire() calls out to at most ``per_minute`` a minute, across threads (0 = unlimited)"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BulkAIRunner:
+    """Validates or enhances the records matched by a query, several per prompt, concurrently"""
+
+    def __init__(self, mode, records_per_prompt=10, max_prompt_chars=12000, workers=4, requests_per_minute=60,
+                 batch_size=100, dry_run=False, only_empty=False, fresh=False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown bulk AI mode: {mode}")
+        self.mode = mode
+        self.records_per_prompt = max(1, records_per_prompt)
+        self.max_prompt_chars = max_prompt_chars
+        self.workers = max(1, workers)
+        self.rate = RateLimiter(requests_per_minute)
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.only_empty = only_empty
+        self.fresh = fresh
+        self.stats = {'total': 0, 'processed': 0, 'changed': 0, 'failed': 0, 'requests': 0,
+                      'invalid': 0, 'changed_fields': {}}
+        self._stats_lock = threading.Lock()
+
+    def run(self, query, on_progress=None, on_change=None):
+        """Process every record matched by ``query`` (a PassportRecord query); returns stats.
+
+        ``on_progress(stats)`` is called after each prompt; ``on_change(record_id,
+        changes)`` with each record's result before it is written.
+        """
+        from openai_automation import OpenAIAutomation
+
+        ai = OpenAIAutomation()
+        if not ai.enabled:
+            raise RuntimeError('Bulk AI requires an OpenAI API key')
+
+        records = self._load(query)
+        self.stats['total'] = len(records)
+        pending = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._dispatch, ai, group): group for group in self.pack(records)}
+            for future in as_completed(futures):
+                group = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning(f"Bulk AI {self.mode} of records {[record[0] for record in group]} failed: {str(e)}")
+                    results = {}
+                for record in group:
+                    self._collect(record, results.get(record[0]), pending, on_change)
+                self.stats['processed'] += len(group)
+                if len(pending) >= self.batch_size:
+                    self._apply(pending)
+                if on_progress:
+                    on_progress(self.stats)
+
+        self._apply(pending)
+        return self.stats
+
+    @staticmethod
+    def _load(query):
+        """(id, raw_text, {field: value}) for every matched record, in id order"""
+        from models import PassportRecord
+
+        columns = [getattr(PassportRecord, field) for field in PASSPORT_FIELDS]
+        rows = query.with_entities(PassportRecord.id, PassportRecord.raw_text, *columns) \
+            .order_by(PassportRecord.id).all()
+        return [(row[0], row[1] or '', dict(zip(PASSPORT_FIELDS, row[2:]))) for row in rows]
+
+    def pack(self, records):
+        """Group records into prompts: up to records_per_prompt each, and for enhancement
+        only while the group's OCR text fits in max_prompt_chars (a longer document goes alone)"""
+        groups, group, chars = [], [], 0
+        for record in records:
+            size = len(record[1]) if self.mode == 'enhance' else 0
+            if group and (len(group) >= self.records_per_prompt or chars + size > self.max_prompt_chars):
+                groups.append(group)
+                group, chars = [], 0
+            group.append(record)
+            chars += size
+        if group:
+            groups.append(group)
+        return groups
+
+    def _dispatch(self, ai, group):
+        """Worker: one prompt for the group; records a packed answer left out are retried alone"""
+        results = self._request(ai, group)
+        if len(group) > 1:
+            for record in group:
+                if record[0] not in results:
+                    results.update(self._request(ai, [record]))
+        return results
+
+    def _request(self, ai, group):
+        self.rate.acquire()
+        with self._stats_lock:
+            self.stats['requests'] += 1
+        if self.mode == 'validate':
+            return ai.validate_passport_batch({record_id: data for record_id, _, data in group}, fresh=self.fresh)
+        return ai.enhance_passport_batch({record_id: (raw_text, data) for record_id, raw_text, data in group},
+                                         fresh=self.fresh)
+
+    def _collect(self, record, result, pending, on_change):
+        """Turn one record's AI result into a row for the batched UPDATE"""
+        from models import derived_columns
+
+        record_id, _, current = record
+        if result is None:
+            self.stats['failed'] += 1
+            return
+
+        if self.mode == 'validate':
+            if not isinstance(result.get('valid'), bool):
+                # An answer without a verdict must not stamp the record as validated
+                self.stats['failed'] += 1
+                return
+            validation = {
+                'valid': result['valid'],
+                'issues': list(result.get('issues') or []),
+                'suggestions': list(result.get('suggestions') or []),
+            }
+            if not validation['valid']:
+                self.stats['invalid'] += 1
+            if on_change:
+                on_change(record_id, validation)
+            self.stats['changed'] += 1
+            pending.append({'id': record_id, 'ai_validation': json.dumps(validation),
+                            'ai_validated_at': datetime.utcnow()})
+            return
+
+        row = {'id': record_id}
+        diff = {}
+        for field in PASSPORT_FIELDS:
+            old, new = current.get(field), result.get(field)
+            # Never blank a field, and leave filled ones alone with only_empty
+            if not new or not isinstance(new, str) or new == old or (self.only_empty and old):
+                continue
+            diff[field] = (old, new)
+            row[field] = new
+            # Bulk UPDATE bypasses the model's @validates hook, so keep the derived columns in step here
+            row.update(derived_columns(field, new))
+            self.stats['changed_fields'][field] = self.stats['changed_fields'].get(field, 0) + 1
+        if diff:
+            if on_change:
+                on_change(record_id, diff)
+            self.stats['changed'] += 1
+            pending.append(row)
+
+    def _apply(self, pending):
+        """Write one batch of results in a single transaction (nothing in dry-run mode)"""
+        from sqlalchemy import update
+        from app import db
+        from models import PassportRecord
+        from ai_usage import ai_usage
+
+        # Worker threads have no app context, so their AI call log rows are written from here
+        ai_usage.flush()
+        if not pending:
+            return
+
+        if not self.dry_run:
+            # One executemany per column set; enhancement rows differ in the fields they change
+            by_columns = {}
+            for row in pending:
+                by_columns.setdefault(tuple(sorted(row)), []).append(row)
+            for rows in by_columns.values():
+                db.session.execute(update(PassportRecord), rows)
+            db.session.commit()
+        pending.clear()
+
+
+def build_query(filters):
+    """PassportRecord query for a filter dict: ids, since/until (YYYY-MM-DD), missing, unvalidated"""
+    from models import PassportRecord
+
+    query = PassportRecord.query
+    if filters.get('ids'):
+        query = query.filter(PassportRecord.id.in_(filters['ids']))
+    if filters.get('since'):
+        query = query.filter(PassportRecord.created_at >= datetime.strptime(filters['since'], '%Y-%m-%d'))
+    if filters.get('until'):
+        query = query.filter(PassportRecord.created_at < datetime.strptime(filters['until'], '%Y-%m-%d'))
+    if filters.get('missing'):
+        if filters['missing'] not in PASSPORT_FIELDS:
+            raise ValueError(f"Unknown field: {filters['missing']}")
+        column = getattr(PassportRecord, filters['missing'])
+        query = query.filter(column.is_(None) | (column == ''))
+    if filters.get('unvalidated'):
+        query = query.filter(PassportRecord.ai_validated_at.is_(None))
+    return query
+
+
+def start_job(flask_app, job_id):
+    """Run a queued AIBulkJob on a background thread of this process"""
+    thread = threading.Thread(target=run_job, args=(flask_app, job_id), name=f'bulk-ai-{job_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def run_job(flask_app, job_id):
+    """Claim and run one AIBulkJob, saving its progress after every prompt"""
+    from app import db
+    from models import AIBulkJob
+
+    with flask_app.app_context():
+        # Conditional UPDATE so a job is never run twice
+        claimed = AIBulkJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(AIBulkJob, job_id)
+        try:
+            filters = json.loads(job.filters) if job.filters else {}
+            runner = BulkAIRunner(job.mode, **(json.loads(job.options) if job.options else {}))
+
+            def on_progress(stats):
+                for key in ('total', 'processed', 'changed', 'failed', 'requests'):
+                    setattr(job, key, stats[key])
+                db.session.commit()
+
+            on_progress(runner.run(build_query(filters), on_progress))
+            job.status = 'done'
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Bulk AI job {job_id} failed: {str(e)}")
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('--ids', nargs='+', type=int, help='only these record ids')
+    parser.add_argument('--since', help='only records created on or after YYYY-MM-DD')
+    parser.add_argument('--until', help='only records created before YYYY-MM-DD')
+    parser.add_argument('--missing', choices=PASSPORT_FIELDS, help='only records where this field is empty')
+    parser.add_argument('--unvalidated', action='store_true', help='only records never AI-validated')
+    parser.add_argument('--records-per-prompt', type=int, default=10, help='records packed into one prompt')
+    parser.add_argument('--max-prompt-chars', type=int, default=12000, help='OCR text packed into one enhance prompt')
+    parser.add_argument('--workers', type=int, default=4, help='prompts in flight at once')
+    parser.add_argument('--rpm', type=int, default=60, help='requests per minute (0 = unlimited)')
+    parser.add_argument('--batch-size', type=int, default=100, help='results written per transaction')
+    parser.add_argument('--only-empty', action='store_true', help='enhance: fill empty fields only')
+    parser.add_argument('--fresh', action='store_true', help='bypass the AI response cache')
+    parser.add_argument('--dry-run', action='store_true', help='report results without writing them')
+    parser.add_argument('--show', type=int, default=20, help='results to print')
+    args = parser.parse_args()
+
+    from app import app
+
+    shown = [0]
+    started = time.perf_counter()
+
+    def on_change(record_id, change):
+        if shown[0] < args.show:
+            print(f"#{record_id} {change}")
+            shown[0] += 1
+
+    def on_progress(stats):
+        print(f"\r{stats['processed']}/{stats['total']} records, {stats['requests']} requests, "
+              f"{stats['failed']} failed", end='', file=sys.stderr, flush=True)
+
+    filters = {key: getattr(args, key) for key in ('ids', 'since', 'until', 'missing', 'unvalidated')}
+    with app.app_context():
+        runner = BulkAIRunner(args.mode, records_per_prompt=args.records_per_prompt,
+                              max_prompt_chars=args.max_prompt_chars, workers=args.workers,
+                              requests_per_minute=args.rpm, batch_size=args.batch_size, dry_run=args.dry_run,
+                              only_empty=args.only_empty, fresh=args.fresh)
+        stats = runner.run(build_query(filters), on_progress, on_change)
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+
+    verb = 'would update' if args.dry_run else 'updated'
+    print(f"{args.mode}: {stats['processed']} records in {stats['requests']} requests, {elapsed:.1f}s; "
+          f"{verb} {stats['changed']}, {stats['failed']} failed")
+    if args.mode == 'validate':
+        print(f"  {stats['invalid']} flagged as having issues")
+    for field, count in stats['changed_fields'].items():
+        print(f"  {field:<18}{count:>8}")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
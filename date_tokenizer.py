@@ -0,0 +1,111 @@
+import re
+from datetime import date
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'june': 6, 'july': 7,
+    'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+
+# Issuing states that print numeric dates month first (ICAO codes and printed names, lower case)
+MONTH_FIRST_COUNTRIES = {
+    'usa', 'fsm', 'mhl', 'plw', 'united states', 'american', 'micronesia', 'marshall islands', 'palau',
+}
+
+# One token per date shape; the group names say which part is which
+DATE_TOKEN_RE = re.compile(r'''
+    (?P<iso>(?P<iy>[0-9]{4})[/\-.](?P<im>[0-9]{1,2})[/\-.](?P<id>[0-9]{1,2}))
+  | (?P<num>(?P<a>[0-9]{1,2})[/\-. ](?P<b>[0-9]{1,2})[/\-. ](?P<ny>[0-9]{4}|[0-9]{2}))
+  | (?P<dmy>(?P<dd>[0-9]{1,2})[\s\-/.]*(?P<dmon>[A-Za-z]{3,9})\.?(?:/[A-Za-z]{3,9})?[\s\-/.,]*(?P<dy>[0-9]{4}|[0-9]{2}))
+  | (?P<mdy>(?P<mmon>[A-Za-z]{3,9})\.?[\s\-/.]*(?P<md>[0-9]{1,2}),?[\s\-/.]+(?P<my>[0-9]{4}))
+  | (?P<yymmdd>(?<![0-9])[0-9]{6}(?![0-9]))
+''', re.VERBOSE)
+
+
+def _year(value, future=False):
+    year = int(value)
+    if len(value) == 4:
+        return year
+    # Two-digit years: expiry dates are always 20xx, others the most recent past century
+    if future or year <= date.today().year % 100:
+        return 2000 + year
+    return 1900 + year
+
+
+def _date(year, month, day):
+    if 1 <= month <= 12 and 1 <= day <= 31:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            return None
+    return None
+
+
+def month_first(country):
+    """True if the given issuing state/nationality writes numeric dates month first"""
+    return bool(country) and country.strip().lower() in MONTH_FIRST_COUNTRIES
+
+
+def candidates(text, future=False):
+    """Every calendar date the first date token in ``text`` can be read as, most likely first"""
+    match = DATE_TOKEN_RE.search(text or '')
+    if not match:
+        return []
+    group = match.group
+
+    if group('iso'):
+        found = [_date(int(group('iy')), int(group('im')), int(group('id')))]
+    elif group('num'):
+        a, b, year = int(group('a')), int(group('b')), _year(group('ny'), future)
+        found = [_date(year, b, a), _date(year, a, b)]  # day first, then month first
+    elif group('dmy'):
+        month = MONTHS.get(group('dmon').lower())
+        found = [_date(_year(group('dy'), future), month, int(group('dd')))] if month else []
+    elif group('mdy'):
+        month = MONTHS.get(group('mmon').lower())
+        found = [_date(int(group('my')), month, int(group('md')))] if month else []
+    else:
+        value = group('yymmdd')
+        found = [_date(_year(value[:2], future), int(value[2:4]), int(value[4:6]))]
+
+    unique = []
+    for value in found:
+        if value and value not in unique:
+            unique.append(value)
+    return unique
+
+
+def numeric_order(text):
+    """True/False if a numeric date in ``text`` can only be day/month first (a part above 12), else None"""
+    match = DATE_TOKEN_RE.search(text or '')
+    if not match or not match.group('num'):
+        return None
+    a, b = int(match.group('a')), int(match.group('b'))
+    if a > 12 >= b:
+        return True
+    if b > 12 >= a:
+        return False
+    return None
+
+
+def parse_date(text, day_first=True, hint=None, future=False):
+    """Resolve a printed date to a ``datetime.date`` (or None).
+
+    Numeric dates that read validly both ways are resolved by ``hint`` (the
+    same date from another source, e.g. the MRZ) when it matches one reading,
+    otherwise by ``day_first``. Two-digit years are 20xx when ``future``.
+    """
+    found = candidates(text, future)
+    if not found:
+        return None
+    if hint in found:
+        return hint
+    if len(found) > 1 and not day_first:
+        return found[1]
+    return found[0]
+
+
+def format_date(value):
+    """DD/MM/YYYY, the format dates are displayed and stored as text in"""
+    return value.strftime('%d/%m/%Y') if value else None
@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from sqlalchemy import or_
+from app import app, db
+from models import PassportRecord, ExpiryAlert, ExpiryScanState
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryWatch:
+    """Finds passports expiring soon with range scans on the indexed expiry_date column.
+
+    A daily scan raises an ExpiryAlert when a passport crosses one of the
+    EXPIRY_WATCH_DAYS thresholds (plus 0, expired). Only records whose
+    threshold date fell between the previous scan and today, and records
+    added or given a new expiry date since then, are examined; the first
+    scan covers everything.
+    """
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        days = os.environ.get('EXPIRY_WATCH_DAYS', '90,180')
+        self.thresholds = sorted({0} | {int(day) for day in days.split(',') if day.strip()})
+        self.check_interval = float(os.environ.get('EXPIRY_SCAN_CHECK_SECONDS', '3600'))
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the background thread that runs the scan once a day (idempotent)"""
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._loop, name='expiry-watch', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.scan_if_due()
+            except Exception as e:
+                logger.error(f"Expiry watch scan failed: {str(e)}")
+            time.sleep(self.check_interval)
+
+    @staticmethod
+    def expiring_between(start, end, limit=None):
+        """Records whose passport expires in [start, end], soonest first (at most ``limit`` of them)"""
+        query = PassportRecord.query.filter(
+            PassportRecord.expiry_date.between(start, end)
+        ).order_by(PassportRecord.expiry_date)
+        return query.limit(limit).all() if limit else query.all()
+
+    def expiring_within(self, days, today=None, limit=None):
+        today = today or date.today()
+        return self.expiring_between(today, today + timedelta(days=days), limit=limit)
+
+    def summary(self, today=None):
+        """Counts of expired passports and of those expiring within each threshold"""
+        today = today or date.today()
+        counts = {'expired': PassportRecord.query.filter(PassportRecord.expiry_date < today).count()}
+        for days in self.thresholds[1:]:
+            counts[f'within_{days}_days'] = PassportRecord.query.filter(
+                PassportRecord.expiry_date.between(today, today + timedelta(days=days))
+            ).count()
+        return counts
+
+    def scan_if_due(self, today=None):
+        """Run the scan unless this process or another one already ran it today"""
+        today = today or date.today()
+        state = ExpiryScanState.query.first()
+        if state is None:
+            state = ExpiryScanState()
+            db.session.add(state)
+            db.session.commit()
+        if state.last_scan_on and state.last_scan_on >= today:
+            return None
+
+        # Claim today's scan with a conditional UPDATE so only one gunicorn worker runs it
+        since_on, since_at = state.last_scan_on, state.last_scan_at
+        claimed = ExpiryScanState.query.filter(
+            ExpiryScanState.id == state.id,
+            or_(ExpiryScanState.last_scan_on.is_(None), ExpiryScanState.last_scan_on < today)
+        ).update({'last_scan_on': today, 'last_scan_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return None
+        return self.scan(since_on, since_at, today)
+
+    def scan(self, since_on=None, since_at=None, today=None):
+        """Raise alerts for threshold crossings after ``since_on`` up to ``today``; returns the new alert count"""
+        today = today or date.today()
+        candidates = {}  # record id -> (threshold, expiry date)
+
+        if since_on is None:
+            # First run: every passport already inside a window, at its most urgent threshold
+            horizon = today + timedelta(days=self.thresholds[-1])
+            rows = db.session.query(PassportRecord.id, PassportRecord.expiry_date).filter(
+                PassportRecord.expiry_date <= horizon).all()
+            self._add_urgent(candidates, rows, today)
+        else:
+            # Threshold T was crossed since the last run if expiry - T is in (since_on, today]
+            # Most urgent threshold last, so it wins when a long gap crossed several
+            for days in reversed(self.thresholds):
+                rows = db.session.query(PassportRecord.id, PassportRecord.expiry_date).filter(
+                    PassportRecord.expiry_date > since_on + timedelta(days=days),
+                    PassportRecord.expiry_date <= today + timedelta(days=days)
+                ).all()
+                for record_id, expiry in rows:
+                    candidates[record_id] = (days, expiry)
+
+            # Records added, or whose expiry was corrected, since the last run may already be inside a window
+            if since_at is not None:
+                rows = db.session.query(PassportRecord.id, PassportRecord.expiry_date).filter(
+                    or_(PassportRecord.created_at >= since_at, PassportRecord.expiry_changed_at >= since_at),
+                    PassportRecord.expiry_date <= today + timedelta(days=self.thresholds[-1])
+                ).all()
+                self._add_urgent(candidates, rows, today)
+
+        created = self._save_alerts(candidates)
+        logger.info(f"Expiry watch: examined {len(candidates)} records, raised {created} alerts")
+        return created
+
+    def _add_urgent(self, candidates, rows, today):
+        for record_id, expiry in rows:
+            days_left = (expiry - today).days
+            threshold = next(days for days in self.thresholds if days_left <= days)
+            candidates[record_id] = (threshold, expiry)
+
+    @staticmethod
+    def _save_alerts(candidates):
+        if not candidates:
+            return 0
+        existing = {
+            (alert.passport_record_id, alert.threshold_days, alert.expiry_date)
+            for alert in ExpiryAlert.query.filter(ExpiryAlert.passport_record_id.in_(candidates)).all()
+        }
+        created = 0
+        for record_id, (threshold, expiry) in candidates.items():
+            if (record_id, threshold, expiry) not in existing:
+                db.session.add(ExpiryAlert(passport_record_id=record_id, threshold_days=threshold, expiry_date=expiry))
+                created += 1
+        db.session.commit()
+        return created
+
+
+expiry_watch = ExpiryWatch(app)
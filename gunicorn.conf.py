@@ -0,0 +1,8 @@
+# Read by gunicorn from the working directory (gunicorn main:app)
+
+
+def post_worker_init(worker):
+    # Background services start once the worker has loaded the app, never at import time; the OCR pool
+    # is sized so all --workers web processes together use one OCR process per core
+    from main import start_services
+    start_services(web_workers=worker.cfg.workers)
@@ -3,11 +3,36 @@ import json
 import logging
 from datetime import datetime, timedelta
 from openai_automation import OpenAIAutomation
+from ai_breaker import AIUnavailable
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
 
 logger = logging.getLogger(__name__)
 
+# Advance notice (days) the rule-based leave decision expects for anything but sick leave
+LEAVE_MIN_NOTICE_DAYS = int(os.environ.get('LEAVE_MIN_NOTICE_DAYS', '14'))
+
+
+def rule_based_leave_decision(employee_data, leave_request):
+    """Leave recommendation from the balance and notice period alone, used when AI is unavailable.
+    
+    Its confidence stays below the auto-approval threshold, so it only ever recommends.
+    """
+    leave_type = (leave_request.get('type') or '').lower()
+    duration = leave_request.get('duration') or 0
+    notice_days = leave_request.get('notice_days') or 0
+    balance = employee_data.get(f'{leave_type}_leave_balance')
+    
+    if balance is None:
+        recommendation, reasons = 'manual_review', [f"No {leave_type or 'unknown'} leave balance to check against"]
+    elif duration > balance:
+        recommendation, reasons = 'reject', [f"{duration} days requested but only {balance} days of {leave_type} leave left"]
+    elif leave_type != 'sick' and notice_days < LEAVE_MIN_NOTICE_DAYS:
+        recommendation, reasons = 'conditional', [f"Only {notice_days} days notice (policy asks for {LEAVE_MIN_NOTICE_DAYS})"]
+    else:
+        recommendation, reasons = 'approve', [f"{duration} of {balance} days available with {notice_days} days notice"]
+    return {"recommendation": recommendation, "confidence": 0.5, "reasons": reasons, "source": "rules"}
+
 class HRAutomation:
     def __init__(self):
         self.ai = OpenAIAutomation()
@@ -77,7 +102,7 @@ class HRAutomation:
             return {"success": False, "error": str(e)}
     
     def process_query_response(self, query_text, context="hr"):
-        """Use AI to generate responses to HR queries"""
+        """Use AI to generate responses to HR queries; None if the call fails, so the query is left for HR staff"""
         if not self.ai.enabled:
             return "AI query processing requires OpenAI API key"
         
@@ -99,20 +124,23 @@ class HRAutomation:
             Keep the response concise but complete.
             """
             
-            response = self.ai.client.chat.completions.create(
-                model=self.ai.model,
+            content = self.ai.complete(
                 messages=[
                     {"role": "system", "content": "You are a professional HR assistant."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                cache=False
             )
             
-            return response.choices[0].message.content
+            return content
             
+        except AIUnavailable:
+            # Left open for HR staff rather than auto-resolved
+            return None
         except Exception as e:
             logger.error(f"Query processing failed: {str(e)}")
-            return "I apologize, but I'm unable to process your query at the moment. Please contact HR directly."
+            return None
     
     def evaluate_leave_request(self, employee_data, leave_request):
         """AI-powered leave request evaluation"""
@@ -156,22 +184,24 @@ class HRAutomation:
             }}
             """
             
-            response = self.ai.client.chat.completions.create(
-                model=self.ai.model,
+            content = self.ai.complete(
                 messages=[
                     {"role": "system", "content": "You are an HR policy assistant. Return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"},
-                temperature=0.2
+                temperature=0.2,
+                cache=False
             )
             
-            evaluation = json.loads(response.choices[0].message.content)
+            evaluation = json.loads(content)
             return evaluation
             
+        except AIUnavailable:
+            return rule_based_leave_decision(employee_data, leave_request)
         except Exception as e:
             logger.error(f"Leave evaluation failed: {str(e)}")
-            return {"recommendation": "manual_review", "reason": f"AI evaluation failed: {str(e)}"}
+            return dict(rule_based_leave_decision(employee_data, leave_request), reason=f"AI evaluation failed: {str(e)}")
     
     def generate_hr_report(self, report_type, data):
         """Generate various HR reports using AI"""
@@ -209,16 +239,16 @@ class HRAutomation:
             else:
                 prompt = f"Generate a {report_type} report with this data: {json.dumps(data, indent=2)}"
             
-            response = self.ai.client.chat.completions.create(
-                model=self.ai.model,
+            content = self.ai.complete(
                 messages=[
                     {"role": "system", "content": "You are an HR analytics specialist. Generate comprehensive, actionable reports."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                cache=False
             )
             
-            return response.choices[0].message.content
+            return content
             
         except Exception as e:
             logger.error(f"Report generation failed: {str(e)}")
@@ -273,17 +303,17 @@ class HRAutomation:
             }}
             """
             
-            response = self.ai.client.chat.completions.create(
-                model=self.ai.model,
+            content = self.ai.complete(
                 messages=[
                     {"role": "system", "content": "You are a document verification specialist. Return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"},
-                temperature=0.1
+                temperature=0.1,
+                cache=False
             )
             
-            verification = json.loads(response.choices[0].message.content)
+            verification = json.loads(content)
             return verification
             
         except Exception as e:
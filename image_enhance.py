@@ -0,0 +1,141 @@
+import numpy as np
+from PIL import Image
+
+# Minimum working resolution (roughly 300 DPI for a passport data page)
+MIN_WIDTH = 1200
+MIN_HEIGHT = 800
+
+# Contrast stretch: fraction of pixels clipped at each end of the histogram
+STRETCH_CUTOFF = 0.02
+
+# Sauvola parameters; R is the dynamic range of the standard deviation
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128.0
+
+# Target number of pixels per processing strip (bounds temporary memory)
+STRIP_PIXELS = 1 << 18
+
+
+def enhance_for_ocr(image, window=None, k=SAUVOLA_K):
+    """Prepare a page image for tesseract and return a binary 'L' image.
+
+    Works on one uint8 grayscale buffer: a LUT-based contrast stretch is
+    applied in place, then a Sauvola local threshold is computed strip by
+    strip from running box sums, comparing a 3x3-smoothed pixel against its
+    local threshold so isolated noise does not survive binarisation.
+    """
+    # Grayscale before resizing so the resample touches one channel instead of three
+    if image.mode != 'L':
+        image = image.convert('L')
+
+    width, height = image.size
+    if width < MIN_WIDTH or height < MIN_HEIGHT:
+        scale_factor = max(MIN_WIDTH / width, MIN_HEIGHT / height)
+        image = image.resize((int(width * scale_factor), int(height * scale_factor)), Image.LANCZOS)
+
+    gray = np.array(image, dtype=np.uint8)
+    stretch_contrast(gray)
+
+    if window is None:
+        # Roughly two to three character heights at the working resolution
+        window = max(15, (min(gray.shape) // 40) | 1)
+
+    binary = sauvola_binarize(gray, window, k)
+    del gray
+    # Share the result buffer with PIL rather than copying it
+    return Image.frombuffer('L', (binary.shape[1], binary.shape[0]), binary, 'raw', 'L', 0, 1)
+
+
+def stretch_contrast(gray, cutoff=STRETCH_CUTOFF):
+    """Linear histogram stretch with percentile clipping, applied in place"""
+    # bincount widens its input to intp, so histogram a strip at a time
+    # to keep temporaries proportional to the strip instead of the page
+    hist = np.zeros(256, dtype=np.int64)
+    step = max(1, STRIP_PIXELS // max(gray.shape[1], 1))
+    for top in range(0, gray.shape[0], step):
+        hist += np.bincount(gray[top:top + step].ravel(), minlength=256)
+
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    low = int(np.searchsorted(cdf, total * cutoff))
+    high = int(np.searchsorted(cdf, total * (1 - cutoff)))
+    if high <= low:
+        return gray
+
+    lut = np.arange(256, dtype=np.float32)
+    lut = np.clip((lut - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+    # Indexing widens uint8 indices to intp, so apply the LUT a strip at a time too
+    for top in range(0, gray.shape[0], step):
+        strip = gray[top:top + step]
+        strip[...] = lut[strip]
+    return gray
+
+
+def sauvola_binarize(gray, window, k=SAUVOLA_K, r=SAUVOLA_R):
+    """Sauvola threshold from separable running sums of I and I^2.
+
+    Text (dark) pixels become 0 and background 255. The page is processed
+    in horizontal strips padded by ``window // 2`` rows, so temporaries
+    scale with the strip rather than the page, and all window sums stay in
+    int32 (the strip height is capped so they cannot overflow).
+    """
+    height, width = gray.shape
+    window |= 1
+    half = window // 2
+    area = float(window * window)
+    out = np.empty_like(gray)
+
+    # Largest strip whose vertical I^2 running sum still fits in int32
+    max_rows = (2 ** 31 - 1) // (255 * 255 * window) - window
+    strip_rows = max(32, min(max_rows, STRIP_PIXELS // max(width, 1)))
+
+    for top in range(0, height, strip_rows):
+        bottom = min(height, top + strip_rows)
+        band_top = max(0, top - half)
+        band_bottom = min(height, bottom + half)
+
+        # Edge-replicate so every window is full size at the page borders
+        band = np.pad(
+            gray[band_top:band_bottom],
+            ((half - (top - band_top), half - (band_bottom - bottom)), (half, half)),
+            mode='edge'
+        ).astype(np.int32)
+
+        sums = _box_sums(band, window).astype(np.float32)
+        band *= band
+        mean = sums / area
+        variance = _box_sums(band, window).astype(np.float32)
+        variance /= area
+        variance -= mean * mean
+        np.maximum(variance, 0, out=variance)
+        std = np.sqrt(variance, out=variance)
+
+        # threshold = mean * (1 + k * (std / r - 1)), reusing the std buffer
+        std *= k / r
+        std += 1.0 - k
+        std *= mean
+        threshold = std
+
+        # Compare the 3x3 neighbourhood sum (noise suppression) against 9 * threshold
+        del band
+        core = np.pad(
+            gray[max(0, top - 1):min(height, bottom + 1)],
+            ((1 - (top - max(0, top - 1)), 1 - (min(height, bottom + 1) - bottom)), (1, 1)),
+            mode='edge'
+        ).astype(np.int16)
+        threshold *= 9.0
+        np.multiply(_box_sums(core, 3) > threshold, 255, out=out[top:bottom], casting='unsafe')
+
+    return out
+
+
+def _box_sums(values, window):
+    """Sums over every full ``window`` x ``window`` box of a padded array"""
+    acc = np.cumsum(values, axis=1, dtype=np.int32)
+    horizontal = acc[:, window - 1:].copy()
+    horizontal[:, 1:] -= acc[:, :-window]
+
+    acc = np.cumsum(horizontal, axis=0, dtype=np.int32)
+    boxes = acc[window - 1:].copy()
+    boxes[1:] -= acc[:-window]
+    return boxes
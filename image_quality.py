@@ -0,0 +1,141 @@
+import os
+import time
+import numpy as np
+
+# Long side of the copy sharpness and contrast are measured on: about the scale OCR works at
+SAMPLE_SIDE = 1024
+
+# Long side of the copy skew is estimated on, and the angles tried (degrees)
+SKEW_SAMPLE_SIDE = 400
+SKEW_ANGLES = np.arange(-15.0, 15.5, 1.0)
+
+
+class ImageQualityError(ValueError):
+    """A scan too poor to OCR; ``quality`` holds the metrics it was rejected on"""
+
+    def __init__(self, message, quality=None):
+        super().__init__(message)
+        self.quality = quality
+
+    def __reduce__(self):
+        # Raised inside OCR pool workers, so it has to survive pickling
+        return type(self), (str(self), self.quality)
+
+
+def _sample(gray, side):
+    """Box-downscaled copy of an 'L' image with its long side at most ``side``"""
+    factor = -(-max(gray.size) // side)
+    return gray.reduce(factor) if factor > 1 else gray
+
+
+def sharpness(pixels):
+    """Variance of the 4-neighbour Laplacian; low for blurred or out-of-focus text"""
+    pixels = pixels.astype(np.int16)
+    laplacian = (pixels[1:-1, :-2] + pixels[1:-1, 2:] + pixels[:-2, 1:-1] + pixels[2:, 1:-1]
+                 - 4 * pixels[1:-1, 1:-1])
+    return float(laplacian.var()) if laplacian.size else 0.0
+
+
+def contrast(pixels):
+    """Spread between the 2nd and 98th percentile grey levels, and their midpoint"""
+    cdf = np.cumsum(np.bincount(pixels.ravel(), minlength=256))
+    low = int(np.searchsorted(cdf, cdf[-1] * 0.02))
+    high = int(np.searchsorted(cdf, cdf[-1] * 0.98))
+    return high - low, (low + high) / 2
+
+
+def skew(pixels, threshold):
+    """Text angle in degrees from the projection profile of pixels darker than ``threshold``.
+
+    Every dark pixel is projected onto the vertical axis along each candidate
+    angle; text lines stack into the sharpest profile at the page's skew.
+    """
+    ys, xs = np.nonzero(pixels < threshold)
+    if len(ys) < 50:
+        return 0.0
+    best, best_score = 0.0, -1
+    for angles in (SKEW_ANGLES, None):
+        if angles is None:
+            # Refine around the coarse estimate
+            angles = best + np.arange(-0.75, 0.8, 0.25)
+        for angle in angles:
+            rows = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+            profile = np.bincount(rows - rows.min())
+            score = int(np.dot(profile, profile))
+            if score > best_score:
+                best, best_score = float(angle), score
+    return round(best, 2)
+
+
+class ImageQualityCheck:
+    """Pre-flight check of a page image before enhancement and OCR.
+
+    Sharpness, contrast and skew are measured on small downsampled copies,
+    around 10 ms even for a phone photo. A scan below QUALITY_MIN_SIDE,
+    QUALITY_MIN_SHARPNESS or QUALITY_MIN_CONTRAST is rejected when
+    OCR_QUALITY_MODE is 'reject' (default); 'flag' only records the issues
+    and 'off' skips the check. Skew beyond QUALITY_MAX_SKEW is only a warning.
+    """
+
+    def __init__(self):
+        self.mode = os.environ.get('OCR_QUALITY_MODE', 'reject').lower()
+        self.min_side = int(os.environ.get('QUALITY_MIN_SIDE', '500'))
+        self.min_sharpness = float(os.environ.get('QUALITY_MIN_SHARPNESS', '100'))
+        self.min_contrast = float(os.environ.get('QUALITY_MIN_CONTRAST', '40'))
+        self.max_skew = float(os.environ.get('QUALITY_MAX_SKEW', '5'))
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def assess(self, image):
+        """Quality metrics of a PIL image, the issues found and whether it would be rejected"""
+        start = time.perf_counter()
+        gray = image if image.mode == 'L' else image.convert('L')
+        width, height = gray.size
+
+        sample = _sample(gray, SAMPLE_SIDE)
+        pixels = np.asarray(sample)
+        spread, middle = contrast(pixels)
+        quality = {
+            'width': width,
+            'height': height,
+            'sharpness': round(sharpness(pixels), 1),
+            'contrast': spread,
+            'skew': skew(np.asarray(_sample(sample, SKEW_SAMPLE_SIDE)), middle) if spread else 0.0,
+        }
+
+        issues = []
+        if min(width, height) < self.min_side:
+            issues.append(f"resolution too low ({width}x{height} px, need at least {self.min_side} px on the short side)")
+        if spread < self.min_contrast:
+            issues.append(f"too little contrast ({spread} grey levels, need {self.min_contrast:g}); "
+                          f"the page may be blank, overexposed or too dark")
+        elif quality['sharpness'] < self.min_sharpness:
+            issues.append(f"too blurry (sharpness {quality['sharpness']:g}, need {self.min_sharpness:g})")
+        warnings = []
+        if abs(quality['skew']) > self.max_skew:
+            warnings.append(f"page is rotated by about {quality['skew']:g} degrees")
+
+        quality.update({
+            'issues': issues,
+            'warnings': warnings,
+            'rejected': bool(issues) and self.mode == 'reject',
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        })
+        return quality
+
+    def check(self, image):
+        """assess(), raising ImageQualityError for a rejected image; None when the check is off"""
+        if not self.enabled:
+            return None
+        quality = self.assess(image)
+        if quality['rejected']:
+            raise ImageQualityError(rejection_message(quality), quality)
+        return quality
+
+
+def rejection_message(quality):
+    """User-facing explanation of why a scan was rejected"""
+    return ("Scan rejected before OCR: " + '; '.join(quality['issues']) +
+            ". Please upload a sharper, larger or better lit scan of the passport data page.")
@@ -0,0 +1,171 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from app import app, db
+from models import ProcessingJob
+from ocr_executor import ocr_executor
+from image_quality import ImageQualityError
+from ocr_cache import ocr_cache
+from ocr_config_stats import ocr_config_stats
+from passport_pipeline import StageTimer, extract_passport_data, build_passport_record
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Persistent OCR job queue backed by the processing_job table.
+
+    Jobs are claimed with a conditional UPDATE so several gunicorn workers
+    can poll the same table without processing a job twice.
+    """
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        # One dispatcher thread per OCR process keeps the pool saturated (sized at start, once the pool is)
+        self.num_workers = int(os.environ.get('OCR_JOB_WORKERS', '0'))
+        self.poll_interval = float(os.environ.get('OCR_JOB_POLL_SECONDS', '2'))
+        self.stale_after = int(os.environ.get('OCR_JOB_STALE_SECONDS', '900'))
+        self.max_attempts = int(os.environ.get('OCR_JOB_MAX_ATTEMPTS', '3'))
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """Start the background worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            with self.app.app_context():
+                self._requeue_stale_jobs()
+                ocr_config_stats.apply()
+            self.num_workers = self.num_workers or ocr_executor.max_workers
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'ocr-job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.num_workers} OCR job workers")
+
+    def enqueue(self, filename, filepath, file_hash=None):
+        """Persist a new job and wake a worker; returns the ProcessingJob"""
+        job = ProcessingJob(filename=filename, filepath=filepath, file_hash=file_hash, status='queued')
+        db.session.add(job)
+        db.session.commit()
+        self.start()
+        self._wakeup.set()
+        return job
+
+    def enqueue_many(self, jobs):
+        """Persist several new ProcessingJobs in one transaction and wake the workers"""
+        if not jobs:
+            return
+        db.session.add_all(jobs)
+        db.session.commit()
+        self.start()
+        self._wakeup.set()
+
+    def _requeue_stale_jobs(self):
+        """Return jobs left 'running' by a crashed worker to the queue"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = ProcessingJob.query.filter(
+            ProcessingJob.status == 'running',
+            ProcessingJob.started_at < cutoff
+        ).update({'status': 'queued', 'current_stage': None}, synchronize_session=False)
+        db.session.commit()
+        if stale:
+            logger.warning(f"Re-queued {stale} stale OCR jobs")
+
+    def _claim_next_job(self):
+        """Atomically move the oldest queued job to running"""
+        job = ProcessingJob.query.filter_by(status='queued').order_by(ProcessingJob.id).first()
+        if not job:
+            return None
+
+        claimed = ProcessingJob.query.filter_by(id=job.id, status='queued').update({
+            'status': 'running',
+            'started_at': datetime.utcnow(),
+            'attempts': (job.attempts or 0) + 1
+        }, synchronize_session=False)
+        db.session.commit()
+
+        if not claimed:
+            return None
+        db.session.refresh(job)
+        return job
+
+    def _worker_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    job = self._claim_next_job()
+                    if job:
+                        self._run_job(job)
+                        continue
+            except Exception as e:
+                logger.error(f"OCR job worker error: {str(e)}")
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _run_job(self, job):
+        def on_stage(name):
+            job.current_stage = name
+            db.session.commit()
+
+        timer = StageTimer(on_stage=on_stage)
+
+        try:
+            with timer.stage('cache_lookup'):
+                if not job.file_hash:
+                    job.file_hash = ocr_cache.hash_file(job.filepath)
+                cached = ocr_cache.get(job.file_hash)
+                existing = ocr_cache.existing_record(cached)
+
+            if existing:
+                # Identical upload already processed; point at the existing record
+                job.passport_record_id = existing.id
+                job.duplicate = True
+            else:
+                if cached:
+                    ocr_result, passport_data = ocr_cache.cached_result(cached)
+                else:
+                    ocr_result, passport_data, ai_enhanced = extract_passport_data(job.filepath, timer,
+                                                                                   ai_enhance=job.ai_enhance is not False)
+                    ocr_config_stats.record(ocr_result)
+
+                with timer.stage('save'):
+                    record = build_passport_record(job.filename, ocr_result['text'], passport_data,
+                                                   ocr_result.get('layout'), ocr_result.get('quality'))
+                    db.session.add(record)
+                    db.session.flush()
+                    job.passport_record_id = record.id
+                    db.session.commit()
+                    ocr_cache.put(job.file_hash, ocr_result, passport_data, record.id)
+
+            job.status = 'done'
+            self._remove_upload(job.filepath)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"OCR job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            # Missing uploads and scans rejected as unreadable can never succeed, so do not retry them
+            retryable = job.filepath and os.path.exists(job.filepath) and job.attempts < self.max_attempts \
+                and not isinstance(e, ImageQualityError)
+            job.status = 'queued' if retryable else 'failed'
+            if not retryable:
+                self._remove_upload(job.filepath)
+
+        job.current_stage = None
+        job.stage_timings = json.dumps(timer.timings)
+        job.finished_at = datetime.utcnow() if job.status != 'queued' else None
+        db.session.commit()
+
+    @staticmethod
+    def _remove_upload(filepath):
+        if filepath and os.path.exists(filepath):
+            os.remove(filepath)
+
+
+job_queue = JobQueue(app)
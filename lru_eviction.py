@@ -0,0 +1,33 @@
+import logging
+from sqlalchemy import func
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def evict_lru(model, used_column, max_entries, max_bytes):
+    """Delete least-recently-used rows of a cache table until both size bounds hold.
+
+    ``model`` needs ``id`` and ``size_bytes`` columns; ``used_column`` is its
+    last-used timestamp. Returns (rows deleted, bytes freed).
+    """
+    count, total_bytes = db.session.query(func.count(model.id), func.coalesce(func.sum(model.size_bytes), 0)).one()
+    if count <= max_entries and total_bytes <= max_bytes:
+        return 0, 0
+
+    excess_entries = max(0, count - max_entries)
+    excess_bytes = max(0, total_bytes - max_bytes)
+    victims = []
+    freed = 0
+
+    oldest = db.session.query(model.id, model.size_bytes).order_by(used_column.asc()).all()
+    for entry_id, size in oldest:
+        if len(victims) >= excess_entries and freed >= excess_bytes:
+            break
+        victims.append(entry_id)
+        freed += size or 0
+
+    if victims:
+        model.query.filter(model.id.in_(victims)).delete(synchronize_session=False)
+        db.session.commit()
+    return len(victims), freed
@@ -1,4 +1,24 @@
+import os
 from app import app
+from job_queue import job_queue
+from ocr_executor import ocr_executor
+from expiry_watch import expiry_watch
+
+
+def start_services(web_workers=1):
+    """Pre-warm the OCR process pool and start the background OCR and expiry workers of this web process.
+
+    Never run at import: OCR pool processes are spawned and re-import this module. The dev server
+    calls it below, and gunicorn workers from the post_worker_init hook in gunicorn.conf.py.
+    """
+    ocr_executor.configure(web_workers)
+    ocr_executor.start()
+    job_queue.start()
+    expiry_watch.start()
+
 
 if __name__ == '__main__':
+    # With the reloader only the child process that serves requests starts them
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -5,7 +5,13 @@ Database migration script to add new columns to existing database
 
 import sqlite3
 import os
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
 from app import app, db
+from models import DERIVED_COLUMNS, derived_value, ProcessingJob, OCRCacheEntry
+
+# Tables whose foreign keys to passport_record gained ON DELETE SET NULL
+SET_NULL_TABLES = [ProcessingJob.__table__, OCRCacheEntry.__table__]
 
 def migrate_database():
     """Add missing columns to existing database"""
@@ -31,7 +37,16 @@ def migrate_database():
     columns_to_add = [
         ('emergency_contact', 'VARCHAR(200) DEFAULT ""'),
         ('phone_number', 'VARCHAR(50) DEFAULT ""'),
-        ('previous_passport', 'VARCHAR(50) DEFAULT ""')
+        ('previous_passport', 'VARCHAR(50) DEFAULT ""'),
+        ('birth_date', 'DATE'),
+        ('issue_date', 'DATE'),
+        ('expiry_date', 'DATE'),
+        ('nationality_code', 'VARCHAR(3)'),
+        ('word_boxes', 'BLOB'),
+        ('image_quality', 'TEXT'),
+        ('ai_validation', 'TEXT'),
+        ('ai_validated_at', 'DATETIME'),
+        ('expiry_changed_at', 'DATETIME')
     ]
     
     for column_name, column_def in columns_to_add:
@@ -42,6 +57,42 @@ def migrate_database():
             except sqlite3.OperationalError as e:
                 print(f"Error adding column {column_name}: {e}")
     
+    # OCR cache entries keep their word boxes and image metrics too (a new table is created by db.create_all below)
+    cursor.execute("PRAGMA table_info(ocr_cache_entry)")
+    cache_columns = [column[1] for column in cursor.fetchall()]
+    for column_name, column_def in [('word_boxes', 'BLOB'), ('image_quality', 'TEXT')]:
+        if cache_columns and column_name not in cache_columns:
+            cursor.execute(f'ALTER TABLE ocr_cache_entry ADD COLUMN {column_name} {column_def}')
+            print(f"Added column: ocr_cache_entry.{column_name}")
+    
+    # Jobs queued by a batch upload (processing_batch itself is created by db.create_all below)
+    cursor.execute("PRAGMA table_info(processing_job)")
+    job_columns = [column[1] for column in cursor.fetchall()]
+    for column_name, column_def in [('batch_id', 'INTEGER REFERENCES processing_batch (id)'),
+                                    ('original_filename', 'VARCHAR(255)'), ('ai_enhance', 'BOOLEAN DEFAULT 1')]:
+        if job_columns and column_name not in job_columns:
+            cursor.execute(f'ALTER TABLE processing_job ADD COLUMN {column_name} {column_def}')
+            print(f"Added column: processing_job.{column_name}")
+    if job_columns:
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_processing_job_batch_id ON processing_job (batch_id)')
+    
+    # Per-layout results on the pages where every PDF layout ran
+    cursor.execute("PRAGMA table_info(ocr_config_stat)")
+    stat_columns = [column[1] for column in cursor.fetchall()]
+    for column_name, column_def in [('trials', 'INTEGER DEFAULT 0'), ('trial_wins', 'INTEGER DEFAULT 0'),
+                                    ('confidence_sum', 'FLOAT DEFAULT 0')]:
+        if stat_columns and column_name not in stat_columns:
+            cursor.execute(f'ALTER TABLE ocr_config_stat ADD COLUMN {column_name} {column_def}')
+            print(f"Added column: ocr_config_stat.{column_name}")
+    
+    for column_name in [*DERIVED_COLUMNS.values(), 'expiry_changed_at']:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS ix_passport_record_{column_name} ON passport_record ({column_name})')
+    
+    backfill_derived_columns(cursor)
+    
+    for table in SET_NULL_TABLES:
+        rebuild_foreign_keys(cursor, table)
+    
     conn.commit()
     conn.close()
     
@@ -53,6 +104,52 @@ def migrate_database():
         except Exception as e:
             print(f"Error creating HR tables: {e}")
 
+def backfill_derived_columns(cursor):
+    """Fill the typed date and nationality code columns from the existing text fields"""
+    source_columns = list(DERIVED_COLUMNS)
+    cursor.execute(f"SELECT id, {', '.join(source_columns)} FROM passport_record")
+    updates = []
+    unparsed = 0
+    for row in cursor.fetchall():
+        values = []
+        for column, text in zip(source_columns, row[1:]):
+            derived = derived_value(column, text)
+            unparsed += bool(text) and derived is None
+            values.append(derived.isoformat() if hasattr(derived, 'isoformat') else derived)
+        updates.append(values + [row[0]])
+    
+    derived_columns = [DERIVED_COLUMNS[column] for column in source_columns]
+    cursor.executemany(
+        f"UPDATE passport_record SET {', '.join(f'{column} = ?' for column in derived_columns)} WHERE id = ?",
+        updates)
+    print(f"Backfilled dates and nationality codes for {len(updates)} records ({unparsed} values not recognised)")
+
+def rebuild_foreign_keys(cursor, table):
+    """Recreate a table whose passport_record foreign key lacks ON DELETE SET NULL.
+    
+    SQLite cannot alter a constraint, so the table is rebuilt from the model and the rows copied over.
+    """
+    cursor.execute(f"PRAGMA foreign_key_list({table.name})")
+    foreign_keys = cursor.fetchall()
+    # (id, seq, table, from, to, on_update, on_delete, match)
+    if not foreign_keys or all(fk[6] == 'SET NULL' for fk in foreign_keys if fk[2] == 'passport_record'):
+        return
+    
+    cursor.execute(f"PRAGMA table_info({table.name})")
+    existing = [column[1] for column in cursor.fetchall()]
+    copied = ', '.join(column.name for column in table.columns if column.name in existing)
+    old_name = f"{table.name}_old"
+    
+    cursor.execute(f"ALTER TABLE {table.name} RENAME TO {old_name}")
+    for index in table.indexes:
+        cursor.execute(f"DROP INDEX IF EXISTS {index.name}")
+    cursor.execute(str(CreateTable(table).compile(dialect=sqlite.dialect())))
+    for index in table.indexes:
+        cursor.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+    cursor.execute(f"INSERT INTO {table.name} ({copied}) SELECT {copied} FROM {old_name}")
+    cursor.execute(f"DROP TABLE {old_name}")
+    print(f"Rebuilt {table.name} with ON DELETE SET NULL")
+
 if __name__ == '__main__':
     migrate_database()
     print("Database migration completed!")
\ No newline at end of file
@@ -1,5 +1,34 @@
+import json
 from app import db
 from datetime import datetime
+from sqlalchemy.orm import validates, deferred
+from date_tokenizer import parse_date
+from nationalities import lookup as nationality_code
+
+# PassportRecord text field -> the indexed column derived from it
+DERIVED_COLUMNS = {
+    'date_of_birth': 'birth_date',
+    'date_of_issue': 'issue_date',
+    'date_of_expiry': 'expiry_date',
+    'nationality': 'nationality_code',
+}
+
+
+def derived_value(field, value):
+    """Typed date or canonical nationality code for a PassportRecord text field value"""
+    if not value:
+        return None
+    if field == 'nationality':
+        return nationality_code(value)
+    return parse_date(value, future=field == 'date_of_expiry')
+
+
+def derived_columns(field, value):
+    """Columns a bulk UPDATE of a PassportRecord text field must set too, as the model's @validates hook would"""
+    columns = {DERIVED_COLUMNS[field]: derived_value(field, value)} if field in DERIVED_COLUMNS else {}
+    if field == 'date_of_expiry':
+        columns['expiry_changed_at'] = datetime.utcnow()
+    return columns
 
 class PassportRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,6 +39,7 @@ class PassportRecord(db.Model):
     surname = db.Column(db.String(100))
     given_names = db.Column(db.String(200))
     nationality = db.Column(db.String(50))
+    nationality_code = db.Column(db.String(3), index=True)  # ICAO/ISO alpha-3, derived from nationality
     date_of_birth = db.Column(db.String(20))
     place_of_birth = db.Column(db.String(100))
     sex = db.Column(db.String(10))
@@ -22,14 +52,33 @@ class PassportRecord(db.Model):
     phone_number = db.Column(db.String(50))
     previous_passport = db.Column(db.String(50))
     
+    # Typed copies of the DD/MM/YYYY date strings, kept in sync on assignment, for indexed range queries
+    birth_date = db.Column(db.Date, index=True)
+    issue_date = db.Column(db.Date, index=True)
+    expiry_date = db.Column(db.Date, index=True)
+    # When expiry_date last changed, so the expiry watch also examines corrected records
+    expiry_changed_at = db.Column(db.DateTime, index=True)
+    
     # Metadata
     raw_text = db.Column(db.Text)
+    word_boxes = deferred(db.Column(db.LargeBinary))  # serialised WordLayout of the OCR words, see word_layout
+    image_quality = db.Column(db.Text)  # JSON string of the pre-OCR image metrics, see image_quality
+    ai_validation = db.Column(db.Text)  # JSON string of the last AI validation: {valid, issues, suggestions}
+    ai_validated_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     processing_status = db.Column(db.String(20), default='completed')
     
     def __repr__(self):
         return f'<PassportRecord {self.passport_number}>'
     
+    @validates(*DERIVED_COLUMNS)
+    def _sync_derived_column(self, key, value):
+        derived = derived_value(key, value)
+        if key == 'date_of_expiry' and derived != self.expiry_date:
+            self.expiry_changed_at = datetime.utcnow()
+        setattr(self, DERIVED_COLUMNS[key], derived)
+        return value
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -38,15 +87,228 @@ class PassportRecord(db.Model):
             'surname': self.surname,
             'given_names': self.given_names,
             'nationality': self.nationality,
+            'nationality_code': self.nationality_code,
             'date_of_birth': self.date_of_birth,
             'place_of_birth': self.place_of_birth,
             'sex': self.sex,
             'date_of_issue': self.date_of_issue,
             'date_of_expiry': self.date_of_expiry,
+            'birth_date': self.birth_date.isoformat() if self.birth_date else None,
+            'issue_date': self.issue_date.isoformat() if self.issue_date else None,
+            'expiry_date': self.expiry_date.isoformat() if self.expiry_date else None,
             'issuing_authority': self.issuing_authority,
             'emergency_contact': self.emergency_contact,
             'phone_number': self.phone_number,
             'previous_passport': self.previous_passport,
+            'image_quality': json.loads(self.image_quality) if self.image_quality else None,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'processing_status': self.processing_status
         }
+
+class ProcessingBatch(db.Model):
+    """A batch upload: one ProcessingJob per document, plus the entries that were never queued"""
+    id = db.Column(db.Integer, primary_key=True)
+    ai_enhance = db.Column(db.Boolean, default=False)
+    intake = db.Column(db.Text)  # JSON string of [{filename, status, error/record_id}] for skipped and duplicate entries
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ProcessingBatch {self.id}>'
+
+class ProcessingJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    filepath = db.Column(db.String(512))
+    file_hash = db.Column(db.String(64))
+    batch_id = db.Column(db.Integer, db.ForeignKey('processing_batch.id'), index=True)
+    original_filename = db.Column(db.String(255))  # name in the upload or ZIP archive, for batch reports
+    ai_enhance = db.Column(db.Boolean, default=True)
+    
+    # Queue state
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, done, failed
+    current_stage = db.Column(db.String(50))
+    stage_timings = db.Column(db.Text)  # JSON string of {stage: seconds}
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    
+    # Result (kept when the record is deleted, without the link)
+    passport_record_id = db.Column(db.Integer, db.ForeignKey('passport_record.id', ondelete='SET NULL'), nullable=True)
+    duplicate = db.Column(db.Boolean, default=False)  # True when the upload matched an existing record
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ProcessingJob {self.id} - {self.status}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'current_stage': self.current_stage,
+            'stage_timings': json.loads(self.stage_timings) if self.stage_timings else {},
+            'error': self.error,
+            'attempts': self.attempts,
+            'passport_record_id': self.passport_record_id,
+            'duplicate': bool(self.duplicate),
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+class OCRCacheEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Cache key: SHA-256 of the uploaded bytes plus the OCR pipeline version
+    file_hash = db.Column(db.String(64), nullable=False)
+    config_version = db.Column(db.String(20), nullable=False)
+    
+    # Cached results
+    raw_text = db.Column(db.Text)
+    word_confidences = db.Column(db.Text)  # JSON string of [[word, conf], ...]
+    word_boxes = db.Column(db.LargeBinary)  # serialised WordLayout
+    image_quality = db.Column(db.Text)  # JSON string of the pre-OCR image metrics
+    parsed_data = db.Column(db.Text)  # JSON string of parser output
+    passport_record_id = db.Column(db.Integer, db.ForeignKey('passport_record.id', ondelete='SET NULL'), nullable=True)
+    
+    # LRU bookkeeping
+    size_bytes = db.Column(db.Integer, default=0)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('file_hash', 'config_version', name='uq_ocr_cache_key'),
+    )
+    
+    def __repr__(self):
+        return f'<OCRCacheEntry {self.file_hash[:12]}>'
+
+class AIBulkJob(db.Model):
+    """A bulk AI validation or enhancement run over the records matching ``filters`` (see bulk_ai)"""
+    id = db.Column(db.Integer, primary_key=True)
+    mode = db.Column(db.String(20), nullable=False)  # validate, enhance
+    filters = db.Column(db.Text)  # JSON string of the record filters
+    options = db.Column(db.Text)  # JSON string of BulkAIRunner options
+    
+    # Progress
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, done, failed
+    total = db.Column(db.Integer, default=0)
+    processed = db.Column(db.Integer, default=0)
+    changed = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    requests = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<AIBulkJob {self.id} {self.mode} {self.status}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'filters': json.loads(self.filters) if self.filters else {},
+            'options': json.loads(self.options) if self.options else {},
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'changed': self.changed,
+            'failed': self.failed,
+            'requests': self.requests,
+            'error': self.error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+class AIResponseCacheEntry(db.Model):
+    """A cached OpenAI chat completion, keyed by the SHA-256 of the full request (model, temperature, messages, ...)"""
+    id = db.Column(db.Integer, primary_key=True)
+    request_hash = db.Column(db.String(64), unique=True, nullable=False)
+    model = db.Column(db.String(50))
+    response = db.Column(db.Text)  # message content of the completion
+    
+    # TTL and LRU bookkeeping
+    size_bytes = db.Column(db.Integer, default=0)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<AIResponseCacheEntry {self.request_hash[:12]}>'
+
+class AICallLog(db.Model):
+    """One OpenAI call (or AI cache hit): the feature that made it, tokens, latency, cost and outcome"""
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    feature = db.Column(db.String(60), index=True)  # calling function, e.g. enhance_passport_extraction
+    model = db.Column(db.String(50))
+    outcome = db.Column(db.String(20))  # ok, cached, short_circuited, deadline, error
+    elapsed_ms = db.Column(db.Float)
+    prompt_tokens = db.Column(db.Integer, default=0)
+    completion_tokens = db.Column(db.Integer, default=0)
+    cost_usd = db.Column(db.Float, default=0.0)
+    error = db.Column(db.String(200))
+    
+    def __repr__(self):
+        return f'<AICallLog {self.feature} {self.outcome}>'
+
+class OCRConfigStat(db.Model):
+    """How each tesseract layout does on scanned PDF pages.
+    
+    ``wins`` counts every page the layout was kept for; ``trials``,
+    ``trial_wins`` and ``confidence_sum`` only the sampled pages on which
+    every layout ran, which is what the layout order is learned from.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    config = db.Column(db.String(20), unique=True, nullable=False)
+    wins = db.Column(db.Integer, default=0)
+    last_won_at = db.Column(db.DateTime, default=datetime.utcnow)
+    trials = db.Column(db.Integer, default=0)
+    trial_wins = db.Column(db.Integer, default=0)
+    confidence_sum = db.Column(db.Float, default=0.0)
+    
+    def __repr__(self):
+        return f'<OCRConfigStat {self.config}: {self.wins}>'
+
+class ExpiryAlert(db.Model):
+    """A passport crossing one of the expiry-watch thresholds (days before expiry; 0 = expired)"""
+    id = db.Column(db.Integer, primary_key=True)
+    passport_record_id = db.Column(db.Integer, db.ForeignKey('passport_record.id', ondelete='CASCADE'), nullable=False)
+    threshold_days = db.Column(db.Integer, nullable=False)
+    expiry_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('passport_record_id', 'threshold_days', 'expiry_date', name='uq_expiry_alert'),
+    )
+    
+    def __repr__(self):
+        return f'<ExpiryAlert record {self.passport_record_id}: {self.threshold_days} days>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'passport_record_id': self.passport_record_id,
+            'threshold_days': self.threshold_days,
+            'expiry_date': self.expiry_date.isoformat(),
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
+
+class ExpiryScanState(db.Model):
+    """When the daily expiry-watch scan last ran (a single row)"""
+    id = db.Column(db.Integer, primary_key=True)
+    last_scan_on = db.Column(db.Date)
+    last_scan_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ExpiryScanState {self.last_scan_on}>'
@@ -0,0 +1,247 @@
+import re
+import itertools
+from datetime import datetime
+
+# Line count and length of each ICAO 9303 machine-readable zone format
+MRZ_FORMATS = {
+    'TD1': (3, 30),  # ID cards
+    'TD2': (2, 36),
+    'TD3': (2, 44),  # passports
+}
+
+# OCR confusions between letters and digits, in both directions
+TO_DIGIT = str.maketrans({'O': '0', 'Q': '0', 'D': '0', 'U': '0', 'I': '1', 'L': '1', 'Z': '2',
+                          'S': '5', 'B': '8', 'G': '6', 'T': '7'})
+TO_LETTER = str.maketrans({'0': 'O', '1': 'I', '2': 'Z', '5': 'S', '8': 'B', '6': 'G', '7': 'T'})
+AMBIGUOUS = {'O': '0', '0': 'O', 'I': '1', '1': 'I', 'B': '8', '8': 'B', 'S': '5', '5': 'S',
+             'Z': '2', '2': 'Z', 'G': '6', '6': 'G'}
+
+# Letter/digit swaps tried on a document number whose check digit fails. With one
+# chance in ten that a random reading passes, more swaps would "verify" most misreads
+MAX_SUBSTITUTIONS = 1
+
+_WEIGHTS = (7, 3, 1)
+_LINE_RE = re.compile(r'^[A-Z0-9<]+$')
+
+
+def check_digit(value):
+    """ICAO 9303 check digit: weights 7-3-1, A-Z = 10-35, '<' = 0"""
+    total = 0
+    for i, char in enumerate(value):
+        if char.isdigit():
+            digit = ord(char) - 48
+        elif 'A' <= char <= 'Z':
+            digit = ord(char) - 55
+        else:
+            digit = 0
+        total += digit * _WEIGHTS[i % 3]
+    return str(total % 10)
+
+
+def _check(value, digit):
+    # An all-filler optional field may carry '<' as its check digit
+    return check_digit(value) == (digit if digit != '<' else '0')
+
+
+def _normalise_line(line):
+    line = re.sub(r'\s+', '', line).upper()
+    # Common OCR renderings of the '<' filler
+    return line.replace('«', '<<').replace('‹', '<').replace('(', '<').replace('[', '<').replace('{', '<')
+
+
+def find_mrz(text):
+    """Locate an MRZ in OCR text; returns (format, [lines]) or None.
+
+    Consecutive lines made only of MRZ characters and within two characters
+    of a format's line length are taken as the zone; short lines are padded
+    and long lines trimmed with trailing fillers.
+    """
+    raw_lines = text.splitlines()
+    # Cheap prefilter: the first line of every format carries '<' fillers
+    starts = [i for i, line in enumerate(raw_lines) if '<' in line and len(line) >= 28]
+    normalised = {}
+
+    def line_at(i):
+        if i not in normalised:
+            normalised[i] = _normalise_line(raw_lines[i]) if i < len(raw_lines) else ''
+        return normalised[i]
+
+    for fmt in ('TD3', 'TD2', 'TD1'):
+        count, length = MRZ_FORMATS[fmt]
+        for i in starts:
+            block = [line_at(j) for j in range(i, i + count)]
+            if any(abs(len(line) - length) > 2 or not _LINE_RE.match(line) for line in block):
+                continue
+            block = [_fit(line, length) for line in block]
+            # Every format starts with a document type letter and has fillers on its first line
+            if block[0][0] in 'PIACV' and '<' in block[0]:
+                return fmt, block
+    return None
+
+
+def _fit(line, length):
+    if len(line) < length:
+        return line.ljust(length, '<')
+    if len(line) > length:
+        # Prefer dropping surplus fillers from the end
+        trimmed = line.rstrip('<')
+        return (trimmed + '<' * length)[:length] if len(trimmed) <= length else line[:length]
+    return line
+
+
+def _numeric(value):
+    return value.translate(TO_DIGIT)
+
+
+def _alpha(value):
+    return value.translate(TO_LETTER)
+
+
+def _document_number(value, digit):
+    """Correct OCR confusions in an alphanumeric document number using its check digit.
+
+    Only a reading that is the sole one to validate within MAX_SUBSTITUTIONS
+    swaps is accepted; otherwise the value is returned unverified.
+    """
+    digit = _numeric(digit)
+    if _check(value, digit):
+        return value, True
+
+    positions = [i for i, char in enumerate(value) if char in AMBIGUOUS]
+    # Fewest substitutions first, so the closest valid reading wins
+    for size in range(1, min(MAX_SUBSTITUTIONS, len(positions)) + 1):
+        valid = []
+        for combo in itertools.combinations(positions, size):
+            candidate = list(value)
+            for i in combo:
+                candidate[i] = AMBIGUOUS[candidate[i]]
+            candidate = ''.join(candidate)
+            if _check(candidate, digit):
+                valid.append(candidate)
+        if len(valid) == 1:
+            return valid[0], True
+        if valid:
+            # Several equally close readings validate; the check digit can't tell them apart
+            return value, False
+    return value, False
+
+
+def _names(value):
+    surname, _, given = _alpha(value).partition('<<')
+    return surname.replace('<', ' ').strip(), given.replace('<', ' ').strip()
+
+
+def _date(value, future):
+    """MRZ YYMMDD to DD/MM/YYYY; birth dates pick the century that is not in the future"""
+    try:
+        year = int(value[:2])
+        if future:
+            year += 2000
+        else:
+            year += 2000 if year <= datetime.now().year % 100 else 1900
+        return datetime(year, int(value[2:4]), int(value[4:6])).strftime('%d/%m/%Y')
+    except ValueError:
+        return None
+
+
+def parse_mrz(text):
+    """Decode the TD1/TD2/TD3 MRZ in OCR text, or None if there is none.
+
+    Returns the decoded fields together with ``checks`` (field -> check
+    digit valid) and ``valid`` (every check digit, including the composite,
+    passes). Letter/digit OCR confusions are corrected by field type, and
+    for the document number by trying substitutions against its check digit.
+    """
+    found = find_mrz(text)
+    if not found:
+        return None
+    fmt, lines = found
+
+    if fmt == 'TD1':
+        line1, line2, line3 = lines
+        number, number_digit = _document_number(line1[5:14], line1[14])
+        mrz = {
+            'document_type': line1[0:2].replace('<', ''),
+            'issuing_state': _alpha(line1[2:5]).replace('<', ''),
+            'document_number': number,
+            'optional_data': line1[15:30] + line2[18:29],
+            'date_of_birth': _numeric(line2[0:6]),
+            'sex': line2[7],
+            'date_of_expiry': _numeric(line2[8:14]),
+            'nationality': _alpha(line2[15:18]).replace('<', ''),
+            'names': line3,
+        }
+        digits = {'date_of_birth': _numeric(line2[6]), 'date_of_expiry': _numeric(line2[14])}
+        composite_value = number + _numeric(line1[14]) + line1[15:30] + mrz['date_of_birth'] + digits['date_of_birth'] \
+            + mrz['date_of_expiry'] + digits['date_of_expiry'] + line2[18:29]
+        composite_digit = _numeric(line2[29])
+        optional_ok = True
+    else:
+        line1, line2 = lines
+        length = len(line2)
+        number, number_digit = _document_number(line2[0:9], line2[9])
+        mrz = {
+            'document_type': line1[0:2].replace('<', ''),
+            'issuing_state': _alpha(line1[2:5]).replace('<', ''),
+            'document_number': number,
+            'nationality': _alpha(line2[10:13]).replace('<', ''),
+            'date_of_birth': _numeric(line2[13:19]),
+            'sex': line2[20],
+            'date_of_expiry': _numeric(line2[21:27]),
+            'optional_data': line2[28:length - 2] if fmt == 'TD3' else line2[28:35],
+            'names': line1[5:],
+        }
+        digits = {'date_of_birth': _numeric(line2[19]), 'date_of_expiry': _numeric(line2[27])}
+        tail = line2[28:length - 1]
+        composite_value = number + _numeric(line2[9]) + mrz['date_of_birth'] + digits['date_of_birth'] \
+            + mrz['date_of_expiry'] + digits['date_of_expiry'] + tail
+        composite_digit = _numeric(line2[length - 1])
+        # TD3 carries a separate check digit for the personal number
+        optional_ok = _check(mrz['optional_data'], _numeric(line2[42])) if fmt == 'TD3' else True
+
+    mrz['surname'], mrz['given_names'] = _names(mrz.pop('names'))
+    mrz['sex'] = mrz['sex'] if mrz['sex'] in ('M', 'F') else None
+
+    checks = {
+        'document_number': number_digit,
+        'date_of_birth': _check(mrz['date_of_birth'], digits['date_of_birth']),
+        'date_of_expiry': _check(mrz['date_of_expiry'], digits['date_of_expiry']),
+        'optional_data': optional_ok,
+        'composite': _check(composite_value, composite_digit),
+    }
+    mrz.update({
+        'format': fmt,
+        'lines': lines,
+        'checks': checks,
+        'valid': all(checks.values()),
+    })
+    return mrz
+
+
+def passport_fields(mrz):
+    """PassportParser-style fields from a decoded MRZ (only fields with a value)"""
+    fields = {
+        'surname': mrz['surname'] or None,
+        'given_names': mrz['given_names'] or None,
+        'passport_number': mrz['document_number'].replace('<', '') or None,
+        'nationality': mrz['nationality'] or None,
+        'date_of_birth': _date(mrz['date_of_birth'], future=False),
+        'sex': mrz['sex'],
+        'date_of_expiry': _date(mrz['date_of_expiry'], future=True),
+    }
+    return {field: value for field, value in fields.items() if value}
+
+
+def verified_fields(mrz):
+    """Fields whose value is backed by a passing check digit (or a fully valid MRZ)"""
+    if mrz['valid']:
+        return set(passport_fields(mrz))
+    checks = mrz['checks']
+    verified = set()
+    if checks['document_number']:
+        verified.add('passport_number')
+    if checks['date_of_birth']:
+        verified.add('date_of_birth')
+    if checks['date_of_expiry']:
+        verified.add('date_of_expiry')
+    return verified
@@ -0,0 +1,94 @@
+import re
+import numpy as np
+
+# Characters that can appear in an ICAO 9303 machine-readable zone
+MRZ_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<'
+
+# Single uniform block of text, restricted to MRZ characters
+MRZ_TESSERACT_CONFIG = f'--oem 3 --psm 6 -c tessedit_char_whitelist={MRZ_WHITELIST}'
+
+# An OCR'd MRZ line: 28+ MRZ characters containing at least one filler
+MRZ_LINE_RE = re.compile(r'^(?=[A-Z0-9<]*<)[A-Z0-9<]{28,46}$')
+
+
+def locate_mrz(binary, downscale=2, min_lines=2):
+    """Find the machine-readable zone in a binarised page.
+
+    ``binary`` is a 2-D uint8 array with dark text (< 128) on a light
+    background. Text is smeared horizontally so each printed line becomes
+    a bar; rows whose bar coverage is close to the widest line on the page
+    are grouped into bands, and the lowest group of two or three evenly
+    sized bands (TD3/TD2 or TD1) is returned as ``(left, top, right, bottom)``
+    in the coordinates of ``binary``. Returns None when no MRZ-like group
+    is found.
+    """
+    ink = np.asarray(binary) < 128
+    height, width = ink.shape
+    if height < 20 or width < 60:
+        return None
+
+    # Block-OR downscale keeps thin strokes while quartering the work
+    h2, w2 = height // downscale, width // downscale
+    ink = ink[:h2 * downscale, :w2 * downscale].reshape(h2, downscale, w2, downscale).any(axis=(1, 3))
+
+    # Horizontal smear: a pixel is "on" if ink lies within about one character width
+    gap = max(3, w2 // 60)
+    padded = np.zeros((h2, w2 + 2 * gap + 1), dtype=np.int32)
+    np.cumsum(ink, axis=1, dtype=np.int32, out=padded[:, gap + 1:w2 + gap + 1])
+    padded[:, w2 + gap + 1:] = padded[:, w2 + gap:w2 + gap + 1]
+    smeared = (padded[:, 2 * gap + 1:] - padded[:, :w2]) > 0
+
+    coverage = smeared.sum(axis=1)
+    widest = coverage.max()
+    if widest < w2 * 0.25:
+        return None
+
+    bands = _row_bands(coverage >= widest * 0.6, min_height=max(3, h2 // 200))
+    group = _lowest_line_group(bands, min_lines)
+    if group is None:
+        return None
+
+    top, bottom = group[0][0], group[-1][1]
+    line_height = max(b - t for t, b in group)
+    columns = np.flatnonzero(smeared[top:bottom].any(axis=0))
+    margin = line_height // 2 + 1
+
+    left = max(0, int(columns[0]) - margin) * downscale
+    right = min(w2, int(columns[-1]) + margin) * downscale
+    top = max(0, top - margin) * downscale
+    bottom = min(h2, bottom + margin) * downscale
+    return left, top, right, bottom
+
+
+def looks_like_mrz(text, min_lines=2):
+    """True when OCR output contains at least ``min_lines`` MRZ-shaped lines"""
+    lines = [line.replace(' ', '') for line in text.splitlines()]
+    return sum(1 for line in lines if MRZ_LINE_RE.match(line)) >= min_lines
+
+
+def _row_bands(mask, min_height):
+    """(top, bottom) spans of consecutive True rows at least min_height tall"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return [(int(top), int(bottom)) for top, bottom in zip(edges[::2], edges[1::2]) if bottom - top >= min_height]
+
+
+def _lowest_line_group(bands, min_lines):
+    """Bottom-most run of 2-3 bands with similar heights and tight spacing"""
+    best = None
+    group = []
+    for band in bands:
+        if group:
+            prev_top, prev_bottom = group[-1]
+            prev_height = prev_bottom - prev_top
+            height = band[1] - band[0]
+            similar = max(height, prev_height) <= 1.6 * min(height, prev_height)
+            close = band[0] - prev_bottom <= 3 * max(height, prev_height)
+            if not (similar and close):
+                if min_lines <= len(group) <= 3:
+                    best = group
+                group = []
+        group.append(band)
+
+    if min_lines <= len(group) <= 3:
+        best = group
+    return best
@@ -0,0 +1,377 @@
+import re
+from difflib import SequenceMatcher
+
+# ISO 3166-1 alpha-3 codes plus the ICAO 9303 specials, as "CODE|Canonical name|other names and demonyms"
+_COUNTRY_DATA = """
+AFG|Afghanistan|Afghan
+ALA|Aland Islands|
+ALB|Albania|Albanian
+DZA|Algeria|Algerian
+ASM|American Samoa|
+AND|Andorra|Andorran
+AGO|Angola|Angolan
+AIA|Anguilla|
+ATA|Antarctica|
+ATG|Antigua and Barbuda|Antiguan
+ARG|Argentina|Argentine;Argentinian
+ARM|Armenia|Armenian
+ABW|Aruba|
+AUS|Australia|Australian
+AUT|Austria|Austrian
+AZE|Azerbaijan|Azerbaijani
+BHS|Bahamas|Bahamian
+BHR|Bahrain|Bahraini
+BGD|Bangladesh|Bangladeshi;Peoples Republic of Bangladesh
+BRB|Barbados|Barbadian
+BLR|Belarus|Belarusian
+BEL|Belgium|Belgian
+BLZ|Belize|Belizean
+BEN|Benin|Beninese
+BMU|Bermuda|
+BTN|Bhutan|Bhutanese
+BOL|Bolivia|Bolivian
+BES|Bonaire, Sint Eustatius and Saba|
+BIH|Bosnia and Herzegovina|Bosnian
+BWA|Botswana|Motswana;Batswana
+BVT|Bouvet Island|
+BRA|Brazil|Brazilian
+IOT|British Indian Ocean Territory|
+BRN|Brunei|Bruneian;Brunei Darussalam
+BGR|Bulgaria|Bulgarian
+BFA|Burkina Faso|Burkinabe
+BDI|Burundi|Burundian
+CPV|Cabo Verde|Cape Verde;Cape Verdean
+KHM|Cambodia|Cambodian
+CMR|Cameroon|Cameroonian
+CAN|Canada|Canadian
+CYM|Cayman Islands|
+CAF|Central African Republic|
+TCD|Chad|Chadian
+CHL|Chile|Chilean
+CHN|China|Chinese;Peoples Republic of China
+CXR|Christmas Island|
+CCK|Cocos (Keeling) Islands|
+COL|Colombia|Colombian
+COM|Comoros|Comoran;Comorian
+COG|Congo|Congolese;Republic of the Congo
+COD|Democratic Republic of the Congo|DR Congo
+COK|Cook Islands|
+CRI|Costa Rica|Costa Rican
+CIV|Cote d'Ivoire|Ivory Coast;Ivorian
+HRV|Croatia|Croatian
+CUB|Cuba|Cuban
+CUW|Curacao|
+CYP|Cyprus|Cypriot
+CZE|Czechia|Czech;Czech Republic
+DNK|Denmark|Danish
+DJI|Djibouti|Djiboutian
+DMA|Dominica|Dominican (Dominica)
+DOM|Dominican Republic|Dominican
+ECU|Ecuador|Ecuadorian
+EGY|Egypt|Egyptian
+SLV|El Salvador|Salvadoran
+GNQ|Equatorial Guinea|Equatoguinean
+ERI|Eritrea|Eritrean
+EST|Estonia|Estonian
+SWZ|Eswatini|Swaziland;Swazi
+ETH|Ethiopia|Ethiopian
+FLK|Falkland Islands|
+FRO|Faroe Islands|
+FJI|Fiji|Fijian
+FIN|Finland|Finnish
+FRA|France|French
+GUF|French Guiana|
+PYF|French Polynesia|
+ATF|French Southern Territories|
+GAB|Gabon|Gabonese
+GMB|Gambia|Gambian
+GEO|Georgia|Georgian
+D|Germany|German;Deutsch;Deutschland;Bundesrepublik Deutschland
+DEU|Germany|
+GHA|Ghana|Ghanaian
+GIB|Gibraltar|
+GRC|Greece|Greek;Hellenic Republic
+GRL|Greenland|
+GRD|Grenada|Grenadian
+GLP|Guadeloupe|
+GUM|Guam|
+GTM|Guatemala|Guatemalan
+GGY|Guernsey|
+GIN|Guinea|Guinean
+GNB|Guinea-Bissau|Bissau-Guinean
+GUY|Guyana|Guyanese
+HTI|Haiti|Haitian
+HMD|Heard Island and McDonald Islands|
+VAT|Holy See|Vatican;Vatican City
+HND|Honduras|Honduran
+HKG|Hong Kong|Hong Konger;Hong Kong SAR
+HUN|Hungary|Hungarian
+ISL|Iceland|Icelandic
+IND|India|Indian;Republic of India
+IDN|Indonesia|Indonesian
+IRN|Iran|Iranian;Islamic Republic of Iran
+IRQ|Iraq|Iraqi
+IRL|Ireland|Irish
+IMN|Isle of Man|
+ISR|Israel|Israeli
+ITA|Italy|Italian
+JAM|Jamaica|Jamaican
+JPN|Japan|Japanese
+JEY|Jersey|
+JOR|Jordan|Jordanian
+KAZ|Kazakhstan|Kazakh;Kazakhstani
+KEN|Kenya|Kenyan
+KIR|Kiribati|I-Kiribati
+PRK|North Korea|Democratic Peoples Republic of Korea
+KOR|South Korea|Korean;Republic of Korea;Korea
+RKS|Kosovo|Kosovar
+KWT|Kuwait|Kuwaiti
+KGZ|Kyrgyzstan|Kyrgyz
+LAO|Laos|Lao;Laotian
+LVA|Latvia|Latvian
+LBN|Lebanon|Lebanese
+LSO|Lesotho|Basotho;Mosotho
+LBR|Liberia|Liberian
+LBY|Libya|Libyan
+LIE|Liechtenstein|Liechtensteiner
+LTU|Lithuania|Lithuanian
+LUX|Luxembourg|Luxembourgish;Luxembourger
+MAC|Macao|Macau;Macanese
+MDG|Madagascar|Malagasy
+MWI|Malawi|Malawian
+MYS|Malaysia|Malaysian
+MDV|Maldives|Maldivian;Republic of Maldives;Dhivehi
+MLI|Mali|Malian
+MLT|Malta|Maltese
+MHL|Marshall Islands|Marshallese
+MTQ|Martinique|
+MRT|Mauritania|Mauritanian
+MUS|Mauritius|Mauritian
+MYT|Mayotte|
+MEX|Mexico|Mexican
+FSM|Micronesia|Micronesian
+MDA|Moldova|Moldovan
+MCO|Monaco|Monegasque
+MNG|Mongolia|Mongolian
+MNE|Montenegro|Montenegrin
+MSR|Montserrat|
+MAR|Morocco|Moroccan
+MOZ|Mozambique|Mozambican
+MMR|Myanmar|Burmese;Burma
+NAM|Namibia|Namibian
+NRU|Nauru|Nauruan
+NPL|Nepal|Nepalese;Nepali;Federal Democratic Republic of Nepal
+NLD|Netherlands|Dutch;Holland;Nederland
+NCL|New Caledonia|
+NZL|New Zealand|New Zealander
+NIC|Nicaragua|Nicaraguan
+NER|Niger|Nigerien
+NGA|Nigeria|Nigerian
+NIU|Niue|
+NFK|Norfolk Island|
+MKD|North Macedonia|Macedonian;Macedonia
+MNP|Northern Mariana Islands|
+NOR|Norway|Norwegian
+OMN|Oman|Omani
+PAK|Pakistan|Pakistani;Islamic Republic of Pakistan
+PLW|Palau|Palauan
+PSE|Palestine|Palestinian
+PAN|Panama|Panamanian
+PNG|Papua New Guinea|Papua New Guinean
+PRY|Paraguay|Paraguayan
+PER|Peru|Peruvian
+PHL|Philippines|Filipino;Philippine
+PCN|Pitcairn|
+POL|Poland|Polish
+PRT|Portugal|Portuguese
+PRI|Puerto Rico|Puerto Rican
+QAT|Qatar|Qatari
+REU|Reunion|
+ROU|Romania|Romanian
+RUS|Russia|Russian;Russian Federation
+RWA|Rwanda|Rwandan
+BLM|Saint Barthelemy|
+SHN|Saint Helena|
+KNA|Saint Kitts and Nevis|Kittitian
+LCA|Saint Lucia|Saint Lucian
+MAF|Saint Martin|
+SPM|Saint Pierre and Miquelon|
+VCT|Saint Vincent and the Grenadines|Vincentian
+WSM|Samoa|Samoan
+SMR|San Marino|Sammarinese
+STP|Sao Tome and Principe|Santomean
+SAU|Saudi Arabia|Saudi;Saudi Arabian;Kingdom of Saudi Arabia
+SEN|Senegal|Senegalese
+SRB|Serbia|Serbian
+SYC|Seychelles|Seychellois
+SLE|Sierra Leone|Sierra Leonean
+SGP|Singapore|Singaporean
+SXM|Sint Maarten|
+SVK|Slovakia|Slovak
+SVN|Slovenia|Slovenian;Slovene
+SLB|Solomon Islands|Solomon Islander
+SOM|Somalia|Somali
+ZAF|South Africa|South African
+SGS|South Georgia and the South Sandwich Islands|
+SSD|South Sudan|South Sudanese
+ESP|Spain|Spanish
+LKA|Sri Lanka|Sri Lankan;Ceylon;Democratic Socialist Republic of Sri Lanka
+SDN|Sudan|Sudanese
+SUR|Suriname|Surinamese
+SJM|Svalbard and Jan Mayen|
+SWE|Sweden|Swedish
+CHE|Switzerland|Swiss
+SYR|Syria|Syrian
+TWN|Taiwan|Taiwanese
+TJK|Tajikistan|Tajik
+TZA|Tanzania|Tanzanian
+THA|Thailand|Thai
+TLS|Timor-Leste|East Timor;Timorese
+TGO|Togo|Togolese
+TKL|Tokelau|
+TON|Tonga|Tongan
+TTO|Trinidad and Tobago|Trinidadian;Tobagonian
+TUN|Tunisia|Tunisian
+TUR|Turkey|Turkish;Turkiye
+TKM|Turkmenistan|Turkmen
+TCA|Turks and Caicos Islands|
+TUV|Tuvalu|Tuvaluan
+UGA|Uganda|Ugandan
+UKR|Ukraine|Ukrainian
+ARE|United Arab Emirates|Emirati;UAE
+GBR|United Kingdom|British;UK;Great Britain;British Citizen;United Kingdom of Great Britain and Northern Ireland
+GBD|British Overseas Territories|British Overseas Territories Citizen
+GBN|British National (Overseas)|
+GBO|British Overseas Citizen|
+GBP|British Protected Person|
+GBS|British Subject|
+UMI|United States Minor Outlying Islands|
+USA|United States|American;US;USA;United States of America
+URY|Uruguay|Uruguayan
+UZB|Uzbekistan|Uzbek
+VUT|Vanuatu|Ni-Vanuatu
+VEN|Venezuela|Venezuelan
+VNM|Viet Nam|Vietnam;Vietnamese
+VGB|British Virgin Islands|
+VIR|US Virgin Islands|
+WLF|Wallis and Futuna|
+ESH|Western Sahara|Sahrawi
+YEM|Yemen|Yemeni
+ZMB|Zambia|Zambian
+ZWE|Zimbabwe|Zimbabwean
+EUE|European Union|
+UNO|United Nations Organization|
+UNA|United Nations Specialized Agency|
+UNK|Kosovo (UN Interim Administration)|
+XXA|Stateless Person|Stateless
+XXB|Refugee (1951 Convention)|Refugee
+XXC|Refugee (other)|
+XXX|Unspecified Nationality|
+"""
+
+# OCR letter confusions used to precompute mangled spellings of the three-letter codes
+_CODE_CONFUSIONS = {
+    'O': 'D0Q', 'D': 'O0', 'Q': 'O', 'I': 'L1', 'L': 'I1', 'B': '8', 'S': '5', 'G': '6C',
+    'C': 'G', 'Z': '2', 'U': 'V', 'V': 'U', 'N': 'H', 'H': 'N', 'M': 'N', 'E': 'F', 'F': 'E',
+}
+# Digits read in place of code letters
+_DIGIT_LETTERS = str.maketrans({'0': 'O', '1': 'I', '2': 'Z', '5': 'S', '6': 'G', '8': 'B'})
+
+_NON_LETTERS = re.compile(r'[^A-Z0-9 ]+')
+
+# Fuzzy matching: trigram Dice similarity shortlists candidates, edit similarity decides
+FUZZY_SHORTLIST_DICE = 0.4
+FUZZY_SHORTLIST_SIZE = 5
+FUZZY_MIN_RATIO = 0.8
+
+
+def normalise(text):
+    """Upper case, letters/digits/single spaces only - the form every index key is stored in"""
+    return ' '.join(_NON_LETTERS.sub(' ', text.upper()).split())
+
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _build_indexes():
+    names = {}    # code -> canonical name
+    exact = {}    # normalised code/name/alias/demonym -> code
+    for line in _COUNTRY_DATA.strip().splitlines():
+        code, name, others = line.split('|')
+        names.setdefault(code, name)
+        # 'D' shares Germany with 'DEU'; the three-letter code is canonical
+        canonical = 'DEU' if code == 'D' else code
+        for key in [code, name] + [other for other in others.split(';') if other]:
+            exact.setdefault(normalise(key), canonical)
+
+    # Mangled code spellings that do not collide with a real code (or with each other)
+    mangled = {}
+    for code in names:
+        if len(code) != 3:
+            continue
+        for i, char in enumerate(code):
+            for replacement in _CODE_CONFUSIONS.get(char, ''):
+                variant = code[:i] + replacement + code[i + 1:]
+                if variant in exact:
+                    continue
+                mangled[variant] = code if mangled.get(variant, code) == code else None
+    for variant, code in mangled.items():
+        if code:
+            exact[variant] = code
+
+    # Trigram index over the longer keys (names and demonyms) for fuzzy lookups
+    grams = {}
+    fuzzy_keys = [key for key in exact if len(key) > 3]
+    for key in fuzzy_keys:
+        for gram in _trigrams(key):
+            grams.setdefault(gram, []).append(key)
+
+    return names, exact, grams
+
+
+COUNTRY_NAMES, EXACT_INDEX, TRIGRAM_INDEX = _build_indexes()
+
+
+def lookup(text, fuzzy=True):
+    """Canonical ICAO/ISO alpha-3 code for a nationality, country name, demonym or code (or None).
+
+    Exact and precomputed OCR-mangled spellings are one dict lookup; otherwise
+    the trigram index proposes the closest name when ``fuzzy`` is set.
+    """
+    if not text:
+        return None
+    key = normalise(text)
+    code = EXACT_INDEX.get(key)
+    if code or not key:
+        return code
+
+    if len(key) <= 3:
+        return EXACT_INDEX.get(key.translate(_DIGIT_LETTERS))
+    if not fuzzy:
+        return None
+
+    query = _trigrams(key)
+    shared = {}
+    for gram in query:
+        for candidate in TRIGRAM_INDEX.get(gram, ()):
+            shared[candidate] = shared.get(candidate, 0) + 1
+
+    # Dice coefficient; a key's trigram count is len + 1 with the padding used above
+    shortlist = sorted(((2.0 * count / (len(query) + len(candidate) + 1), candidate)
+                        for candidate, count in shared.items()), reverse=True)[:FUZZY_SHORTLIST_SIZE]
+
+    best, best_ratio = None, FUZZY_MIN_RATIO
+    for dice, candidate in shortlist:
+        if dice < FUZZY_SHORTLIST_DICE:
+            break
+        ratio = SequenceMatcher(None, key, candidate).ratio()
+        if ratio > best_ratio:
+            best, best_ratio = candidate, ratio
+    return EXACT_INDEX[best] if best else None
+
+
+def country_name(code):
+    """Canonical English name for a code returned by lookup"""
+    return COUNTRY_NAMES.get(code)
@@ -0,0 +1,151 @@
+import os
+import re
+import logging
+import threading
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+# Keys of pytesseract's image_to_data(output_type=DICT); every backend returns these
+DATA_KEYS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+             'left', 'top', 'width', 'height', 'conf', 'text']
+
+
+def parse_tesseract_config(config):
+    """Split a tesseract CLI config string into (oem, psm, {variable: value})"""
+    oem = re.search(r'--oem\s+(\d+)', config or '')
+    psm = re.search(r'--psm\s+(\d+)', config or '')
+    variables = dict(re.findall(r'-c\s+([A-Za-z_]+)=(\S+)', config or ''))
+    return (int(oem.group(1)) if oem else 3), (int(psm.group(1)) if psm else 3), variables
+
+
+class OCRBackend:
+    """Interface every OCR engine binding implements.
+
+    ``image_to_data`` returns the same dict-of-lists shape as
+    ``pytesseract.image_to_data(..., output_type=Output.DICT)`` and
+    ``image_to_string`` plain text, so OCRProcessor is engine-agnostic.
+    Config strings use tesseract CLI syntax (``--oem``, ``--psm``, ``-c``).
+    """
+
+    name = 'base'
+
+    def image_to_data(self, image, config='', lang='eng'):
+        raise NotImplementedError
+
+    def image_to_string(self, image, config='', lang='eng'):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load whatever the engine needs so the first real call is not slower"""
+
+
+class TesseractCLIBackend(OCRBackend):
+    """pytesseract: one tesseract subprocess (and temp image file) per call"""
+
+    name = 'cli'
+
+    def image_to_data(self, image, config='', lang='eng'):
+        return pytesseract.image_to_data(image, config=config, lang=lang, output_type=pytesseract.Output.DICT)
+
+    def image_to_string(self, image, config='', lang='eng'):
+        return pytesseract.image_to_string(image, config=config, lang=lang)
+
+    def warm_up(self):
+        pytesseract.get_tesseract_version()
+
+
+class TesserocrBackend(OCRBackend):
+    """In-process tesseract through the tesserocr C API binding.
+
+    An initialised engine is kept per (thread, lang, config) and reused, so
+    the language model is loaded once and images are handed over in memory
+    instead of being written to disk for a subprocess.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        # TessBaseAPI instances are not thread-safe; each thread gets its own
+        self._local = threading.local()
+
+    def _api(self, config, lang):
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+
+        key = (lang, config)
+        api = apis.get(key)
+        if api is None:
+            oem, psm, variables = parse_tesseract_config(config)
+            api = self._tesserocr.PyTessBaseAPI(lang=lang, psm=psm, oem=oem)
+            for name, value in variables.items():
+                if not api.SetVariable(name, value):
+                    logger.warning(f"tesserocr ignored unknown variable {name}")
+            apis[key] = api
+        return api
+
+    def image_to_data(self, image, config='', lang='eng'):
+        RIL = self._tesserocr.RIL
+        api = self._api(config, lang)
+        api.SetImage(image)
+        api.Recognize()
+
+        data = {key: [] for key in DATA_KEYS}
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+
+        block = par = line = word = 0
+        for item in self._tesserocr.iterate_level(iterator, RIL.WORD):
+            if item.IsAtBeginningOf(RIL.BLOCK):
+                block, par, line = block + 1, 0, 0
+            if item.IsAtBeginningOf(RIL.PARA):
+                par, line = par + 1, 0
+            if item.IsAtBeginningOf(RIL.TEXTLINE):
+                line, word = line + 1, 0
+            word += 1
+
+            text = item.GetUTF8Text(RIL.WORD)
+            box = item.BoundingBox(RIL.WORD)
+            if text is None or box is None:
+                continue
+            left, top, right, bottom = box
+            for key, value in zip(DATA_KEYS, (5, 1, block, par, line, word, left, top, right - left,
+                                              bottom - top, item.Confidence(RIL.WORD), text)):
+                data[key].append(value)
+        return data
+
+    def image_to_string(self, image, config='', lang='eng'):
+        api = self._api(config, lang)
+        api.SetImage(image)
+        return api.GetUTF8Text()
+
+    def warm_up(self):
+        self._api('--oem 3 --psm 3', 'eng')
+
+
+BACKENDS = {
+    TesseractCLIBackend.name: TesseractCLIBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+
+def get_backend(name=None):
+    """Build the OCR backend named by ``name`` or OCR_BACKEND (default 'cli').
+
+    Falls back to the CLI backend when the requested binding is unavailable.
+    """
+    name = (name or os.environ.get('OCR_BACKEND', 'cli')).lower()
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        logger.warning(f"Unknown OCR backend '{name}', using tesseract CLI")
+        return TesseractCLIBackend()
+
+    try:
+        return backend_class()
+    except ImportError as e:
+        logger.warning(f"OCR backend '{name}' unavailable ({str(e)}), using tesseract CLI")
+        return TesseractCLIBackend()
@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import OCRCacheEntry, PassportRecord
+from ocr_processor import OCR_CONFIG_VERSION
+from word_layout import WordLayout
+from lru_eviction import evict_lru
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """Content-addressed cache of OCR and parse results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus
+    OCR_CONFIG_VERSION and evicted least-recently-used once the cache
+    exceeds OCR_CACHE_MAX_ENTRIES entries or OCR_CACHE_MAX_BYTES of text.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get('OCR_CACHE_ENABLED', '1') != '0'
+        self.max_entries = int(os.environ.get('OCR_CACHE_MAX_ENTRIES', '10000'))
+        self.max_bytes = int(os.environ.get('OCR_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        self.version = OCR_CONFIG_VERSION
+
+    @staticmethod
+    def hash_bytes(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(filepath):
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, file_hash):
+        """Return the cache entry for a file hash (marking it used) or None"""
+        if not self.enabled or not file_hash:
+            return None
+
+        entry = OCRCacheEntry.query.filter_by(file_hash=file_hash, config_version=self.version).first()
+        if entry:
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_used_at = datetime.utcnow()
+            db.session.commit()
+        return entry
+
+    def existing_record(self, entry):
+        """The PassportRecord a cache entry was saved as, if it still exists"""
+        if entry is None or not entry.passport_record_id:
+            return None
+        return db.session.get(PassportRecord, entry.passport_record_id)
+
+    def put(self, file_hash, ocr_result, parsed_data, record_id=None):
+        """Store (or refresh) the results for a file hash"""
+        if not self.enabled or not file_hash:
+            return
+
+        raw_text = ocr_result.get('text') or ''
+        words = json.dumps(ocr_result.get('words') or [])
+        boxes = ocr_result['layout'].to_bytes() if ocr_result.get('layout') else None
+        quality = json.dumps(ocr_result['quality']) if ocr_result.get('quality') else None
+        parsed = json.dumps(parsed_data or {})
+
+        entry = OCRCacheEntry.query.filter_by(file_hash=file_hash, config_version=self.version).first()
+        if entry is None:
+            entry = OCRCacheEntry(file_hash=file_hash, config_version=self.version)
+            db.session.add(entry)
+
+        entry.raw_text = raw_text
+        entry.word_confidences = words
+        entry.word_boxes = boxes
+        entry.image_quality = quality
+        entry.parsed_data = parsed
+        entry.passport_record_id = record_id
+        entry.size_bytes = len(raw_text) + len(words) + len(boxes or b'') + len(parsed)
+        entry.last_used_at = datetime.utcnow()
+
+        try:
+            db.session.commit()
+            self._evict()
+        except IntegrityError:
+            # Another worker cached the same file first
+            db.session.rollback()
+        except Exception as e:
+            # The record is saved by now; a lost entry only means this file is OCR'd again next time
+            db.session.rollback()
+            logger.warning(f"Failed to store OCR cache entry: {str(e)}")
+
+    @staticmethod
+    def cached_result(entry):
+        """Rebuild (ocr_result, parsed_data) from a cache entry"""
+        ocr_result = {
+            'text': entry.raw_text or '',
+            'words': json.loads(entry.word_confidences) if entry.word_confidences else [],
+            'layout': WordLayout.from_bytes(entry.word_boxes),
+            'quality': json.loads(entry.image_quality) if entry.image_quality else None
+        }
+        parsed_data = json.loads(entry.parsed_data) if entry.parsed_data else {}
+        return ocr_result, parsed_data
+
+    def _evict(self):
+        """Drop least-recently-used entries until both size bounds hold"""
+        evicted, freed = evict_lru(OCRCacheEntry, OCRCacheEntry.last_used_at, self.max_entries, self.max_bytes)
+        if evicted:
+            logger.info(f"Evicted {evicted} OCR cache entries ({freed} bytes)")
+
+
+ocr_cache = OCRResultCache()
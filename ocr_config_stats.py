@@ -0,0 +1,69 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from app import db
+from models import OCRConfigStat
+from ocr_executor import ocr_executor
+
+logger = logging.getLogger(__name__)
+
+
+class OCRConfigStats:
+    """Learns which tesseract layout does best on scanned PDF pages.
+
+    Every merged PDF result carries the layout kept for each page, and for
+    the pages sampled by OCR_CONFIG_SAMPLE_EVERY the confidence every layout
+    reached. Both are kept in the ocr_config_stat table. The OCR executor is
+    told to try first the layout with the best win rate on sampled pages;
+    plain wins are not used for ordering, as the layout tried first keeps
+    nearly every page once it is confident enough.
+    """
+
+    def record(self, ocr_result):
+        """Count the layouts kept and sampled in an OCR result and refresh the order"""
+        wins = Counter(ocr_result.get('configs') or [])
+        trials = ocr_result.get('config_trials') or []
+        if not wins and not trials:
+            return
+
+        try:
+            names = set(wins).union(*trials)
+            stats = {stat.config: stat for stat in OCRConfigStat.query.filter(OCRConfigStat.config.in_(names)).all()}
+            for config in names:
+                if config not in stats:
+                    stats[config] = OCRConfigStat(config=config, wins=0, trials=0, trial_wins=0, confidence_sum=0.0)
+                    db.session.add(stats[config])
+
+            now = datetime.utcnow()
+            for config, count in wins.items():
+                stats[config].wins = (stats[config].wins or 0) + count
+                stats[config].last_won_at = now
+            for trial in trials:
+                winner = max(trial, key=trial.get)
+                for config, confidence in trial.items():
+                    stat = stats[config]
+                    stat.trials = (stat.trials or 0) + 1
+                    stat.confidence_sum = (stat.confidence_sum or 0.0) + confidence
+                    if config == winner:
+                        stat.trial_wins = (stat.trial_wins or 0) + 1
+            db.session.commit()
+            if trials:
+                self.apply()
+        except Exception as e:
+            # A page that can't be counted still has its text; the order just learns a little later
+            db.session.rollback()
+            logger.warning(f"Failed to record OCR config stats: {str(e)}")
+
+    def apply(self):
+        """Push the learned order (best win rate on sampled pages first) to the OCR executor"""
+        stats = OCRConfigStat.query.filter(OCRConfigStat.trials > 0).all()
+        # Mean confidence breaks win-rate ties
+        stats.sort(key=lambda stat: ((stat.trial_wins or 0) / stat.trials, (stat.confidence_sum or 0.0) / stat.trials),
+                   reverse=True)
+        order = [stat.config for stat in stats]
+        if order:
+            ocr_executor.set_config_order(order)
+        return ocr_executor.config_order
+
+
+ocr_config_stats = OCRConfigStats()
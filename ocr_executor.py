@@ -0,0 +1,214 @@
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from ocr_processor import OCRProcessor, pdf_rendering_available
+from image_quality import ImageQualityError
+
+logger = logging.getLogger(__name__)
+
+# Per-process OCRProcessor, created once when a pool worker starts
+_worker_processor = None
+
+
+class OCRWorkerError(RuntimeError):
+    """Picklable stand-in for errors raised inside a pool worker"""
+
+
+def _init_worker():
+    """Pool initializer: import the OCR stack and warm up tesseract once"""
+    global _worker_processor
+    _worker_processor = OCRProcessor()
+    try:
+        _worker_processor.backend.warm_up()
+    except Exception as e:
+        logger.warning(f"Tesseract warm-up failed: {str(e)}")
+
+
+def _warmup():
+    return os.getpid()
+
+
+def _run_in_worker(method, config_order, *args):
+    # Some library exceptions (e.g. pytesseract's) cannot be unpickled in the
+    # parent, which would mark the whole pool as broken
+    try:
+        _worker_processor.set_config_order(config_order)
+        return getattr(_worker_processor, method)(*args)
+    except ImageQualityError:
+        # Picklable, and callers need its metrics and message as-is
+        raise
+    except Exception as e:
+        raise OCRWorkerError(f"{type(e).__name__}: {str(e)}") from None
+
+
+def _ocr_image(filepath, config_order):
+    return _run_in_worker('extract_file', config_order, filepath)
+
+
+def _ocr_bytes(data, filename, config_order):
+    return _run_in_worker('extract_bytes', config_order, data, filename)
+
+
+def _ocr_pdf_page(pdf_path, page_number, dpi, config_order):
+    return _run_in_worker('process_pdf_page', config_order, pdf_path, page_number, dpi)
+
+
+class OCRExecutor:
+    """Runs OCR work items on a pool of long-lived worker processes.
+
+    Images are OCR'd as a single work item; scanned PDFs are split into one
+    work item per page so a multi-page document uses several cores.
+    """
+
+    def __init__(self, max_workers=None):
+        self._fixed_size = max_workers or int(os.environ.get('OCR_POOL_SIZE', '0'))
+        # Every web worker has its own pool, so by default the cores are shared between them
+        # (WEB_CONCURRENCY is also gunicorn's default --workers)
+        self.max_workers = self._fixed_size or self.default_size(int(os.environ.get('WEB_CONCURRENCY', '1')))
+        self.enabled = os.environ.get('OCR_POOL_ENABLED', '1') != '0'
+        self._pool = None
+        self._lock = threading.Lock()
+        self._processor = OCRProcessor()
+        # PDF page layout order sent with every work item (learned by ocr_config_stats)
+        self.config_order = list(self._processor.config_order)
+
+    @staticmethod
+    def default_size(web_workers):
+        """Pool size giving ``web_workers`` web processes one OCR process per core between them"""
+        return max(1, (os.cpu_count() or 1) // max(1, web_workers))
+
+    def configure(self, web_workers):
+        """Size the pool for the number of web workers it shares the machine with (unless OCR_POOL_SIZE is set)"""
+        with self._lock:
+            if self._pool is None and not self._fixed_size:
+                self.max_workers = self.default_size(web_workers)
+
+    def start(self):
+        """Create the pool and pre-warm every worker process (otherwise done on the first submit)"""
+        with self._lock:
+            if self._pool is not None or not self.enabled:
+                return self._pool
+            # spawn avoids forking a process that already holds DB connections and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            warmups = [self._pool.submit(_warmup) for _ in range(self.max_workers)]
+            pids = {future.result() for future in warmups}
+            logger.info(f"OCR pool started with {len(pids)} worker processes")
+            return self._pool
+
+    def set_config_order(self, order):
+        """Change the PDF page layout order used for subsequent work items"""
+        self._processor.set_config_order(order)
+        self.config_order = list(self._processor.config_order)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def submit_file(self, filepath):
+        """Submit an image or PDF for OCR; returns a Future of an OCR result dict"""
+        try:
+            return self._submit(filepath)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool and retry once
+            logger.warning("OCR pool broken, restarting worker processes")
+            self.shutdown()
+            return self._submit(filepath)
+
+    def _submit(self, filepath):
+        file_ext = os.path.splitext(filepath)[1].lower()
+        pool = self.start()
+
+        if pool is None:
+            return self._completed(self._processor.extract_file, filepath)
+
+        if file_ext == '.pdf':
+            return self._submit_pdf(pool, filepath)
+        elif file_ext in ['.png', '.jpg', '.jpeg']:
+            return pool.submit(_ocr_image, filepath, self.config_order)
+        else:
+            raise ValueError(f"Unsupported file type: {file_ext}")
+
+    def extract_file(self, filepath):
+        """Blocking convenience wrapper around submit_file"""
+        return self.submit_file(filepath).result()
+
+    def submit_bytes(self, data, filename):
+        """Submit an in-memory image or PDF as a single work item"""
+        try:
+            return self._submit_bytes(data, filename)
+        except BrokenProcessPool:
+            logger.warning("OCR pool broken, restarting worker processes")
+            self.shutdown()
+            return self._submit_bytes(data, filename)
+
+    def _submit_bytes(self, data, filename):
+        pool = self.start()
+        if pool is None:
+            return self._completed(self._processor.extract_bytes, data, filename)
+        return pool.submit(_ocr_bytes, data, filename, self.config_order)
+
+    def _submit_pdf(self, pool, pdf_path):
+        if not pdf_rendering_available():
+            # Checked here: the ImportError would reach us from a worker only as an OCRWorkerError
+            return self._completed(self._processor.text_layer_result, pdf_path)
+
+        # Pages with a usable text layer need no OCR; each scanned page is its own work item
+        page_futures = [
+            self._resolved({'text': text, 'words': []}) if text
+            else pool.submit(_ocr_pdf_page, pdf_path, page_number, dpi, self.config_order)
+            for page_number, text, dpi in self._processor.plan_pdf_pages(pdf_path)
+        ]
+        return self._gather_pages(page_futures)
+
+    @staticmethod
+    def _gather_pages(page_futures):
+        """Combine per-page futures into one Future of the merged OCR result"""
+        result = Future()
+        remaining = [len(page_futures)]
+        lock = threading.Lock()
+
+        def on_page_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                pages = [future.result() for future in page_futures]
+                result.set_result(OCRProcessor.merge_page_results(pages))
+            except Exception as e:
+                result.set_exception(e)
+
+        if not page_futures:
+            result.set_result({'text': '', 'words': []})
+        for future in page_futures:
+            future.add_done_callback(on_page_done)
+        return result
+
+    @staticmethod
+    def _resolved(value):
+        future = Future()
+        future.set_result(value)
+        return future
+
+    @staticmethod
+    def _completed(func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+ocr_executor = OCRExecutor()
+atexit.register(ocr_executor.shutdown)
@@ -1,21 +1,91 @@
 import os
-import pytesseract
 from PIL import Image
 import PyPDF2
 import io
+import importlib.util
 import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from image_enhance import enhance_for_ocr
+from image_quality import ImageQualityCheck, ImageQualityError, rejection_message
+from ocr_backends import get_backend
+from mrz_locator import locate_mrz, looks_like_mrz, MRZ_TESSERACT_CONFIG
+from word_layout import WordLayout
 
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever preprocessing or tesseract settings change so cached OCR
+# results produced by an older pipeline are not reused
+OCR_CONFIG_VERSION = '4'
+
+# Tesseract layouts tried on scanned PDF pages, in default order (cheapest/most likely first)
+PDF_PAGE_CONFIGS = {
+    'psm6': r'--oem 3 --psm 6',
+    'psm4': r'--oem 3 --psm 4',
+    'psm3': r'--oem 3 --psm 3',
+}
+
+# A PDF page whose embedded text layer is longer than this is used as-is instead of OCR'd
+MIN_TEXT_LAYER_CHARS = 50
+
+def pdf_rendering_available():
+    """Whether scanned PDF pages can be rendered for OCR (pdf2image is installed)"""
+    return importlib.util.find_spec('pdf2image') is not None
+
+
 class OCRProcessor:
     def __init__(self):
         # Configure Tesseract path if needed (for Raspberry Pi)
         # pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
-        pass
+        
+        # Tesseract binding: subprocess CLI (default) or in-process tesserocr, see ocr_backends
+        self.backend = get_backend()
+        
+        # Blur/contrast/resolution/skew check run on each page before it is enhanced and OCR'd
+        self.preflight = ImageQualityCheck()
+        
+        # 'off' always reads the full page. 'targeted' (opt-in) OCRs only the MRZ band when one is found,
+        # which is faster but leaves the non-MRZ fields unread and raw_text too short to reparse later
+        self.mrz_mode = os.environ.get('OCR_MRZ_MODE', 'off').lower()
+        
+        # A PDF page layout whose average word confidence reaches this is accepted without trying the rest
+        self.confidence_threshold = float(os.environ.get('OCR_CONFIDENCE_THRESHOLD', '80'))
+        # Run the remaining layouts concurrently once the first one misses the threshold
+        self.parallel_configs = os.environ.get('OCR_PARALLEL_CONFIGS', '0') == '1'
+        self.config_order = list(PDF_PAGE_CONFIGS)
+        # Every Nth scanned page runs all layouts, so the learned order is based on how each one does on the
+        # same pages and not on the early stop handing nearly every page to whichever layout is tried first
+        self.config_sample_every = int(os.environ.get('OCR_CONFIG_SAMPLE_EVERY', '20'))
+        self._pages_seen = 0
+        
+        # PDF rendering: DPI is chosen so the page's long side is about PDF_TARGET_LONG_SIDE pixels
+        self.pdf_min_dpi = int(os.environ.get('PDF_MIN_DPI', '150'))
+        self.pdf_max_dpi = int(os.environ.get('PDF_MAX_DPI', '300'))
+        self.pdf_target_long_side = int(os.environ.get('PDF_TARGET_LONG_SIDE', '3000'))
+        # Pages rendered per pdf2image call; peak memory grows with this
+        self.pdf_render_batch = max(1, int(os.environ.get('PDF_RENDER_BATCH_PAGES', '1')))
+    
+    def set_config_order(self, order):
+        """Try PDF page layouts in this order (unknown names dropped, missing ones appended)"""
+        order = [name for name in (order or []) if name in PDF_PAGE_CONFIGS]
+        self.config_order = order + [name for name in PDF_PAGE_CONFIGS if name not in order]
     
     def process_file(self, filepath):
         """Process a file and extract text using OCR"""
+        return self.extract_file(filepath)['text']
+    
+    def process_bytes(self, data, filename):
+        """Process an in-memory upload (e.g. a ZIP entry) without writing it to disk"""
+        return self.extract_bytes(data, filename)['text']
+    
+    def extract_file(self, filepath):
+        """Process a file and return an OCR result: {'text': str, 'words': [[word, conf], ...], 'layout': WordLayout}
+        
+        ``layout`` (word boxes) is missing for PDF text layers. ``quality`` holds
+        the pre-flight image metrics (per page for PDFs); an image too poor to
+        OCR raises ImageQualityError instead.
+        """
         try:
             file_ext = os.path.splitext(filepath)[1].lower()
             
@@ -26,154 +96,315 @@ class OCRProcessor:
             else:
                 raise ValueError(f"Unsupported file type: {file_ext}")
                 
+        except ImageQualityError as e:
+            logger.info(f"Rejected {filepath}: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Error processing file {filepath}: {str(e)}")
             raise
     
+    def extract_bytes(self, data, filename):
+        """Same as extract_file for in-memory image or PDF bytes"""
+        try:
+            file_ext = os.path.splitext(filename)[1].lower()
+            
+            if file_ext == '.pdf':
+                return self._process_pdf(data)
+            elif file_ext in ['.png', '.jpg', '.jpeg']:
+                return self._process_image(io.BytesIO(data))
+            else:
+                raise ValueError(f"Unsupported file type: {file_ext}")
+                
+        except ImageQualityError as e:
+            logger.info(f"Rejected {filename}: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error processing {filename}: {str(e)}")
+            raise
+    
     def _process_image(self, image_path):
-        """Extract text from image using enhanced Tesseract OCR"""
+        """Extract text from an image path or file object using enhanced Tesseract OCR"""
         try:
-            # Open and preprocess image
+            # Open the image as grayscale once; both the quality check and the enhancement work on it
             image = Image.open(image_path)
+            if image.mode != 'L':
+                image = image.convert('L')
             
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            # Reject hopeless scans before spending seconds of OCR on them
+            quality = self.preflight.check(image)
             
             # Enhance image for better OCR results
             enhanced_image = self._enhance_image(image)
             
-            # Use optimized Tesseract configuration for passport documents
-            config = r'--oem 3 --psm 3 -c preserve_interword_spaces=1'
+            # In targeted mode read just the MRZ band when we can find it
+            result = self._ocr_mrz_band(enhanced_image) if self.mrz_mode == 'targeted' else None
             
-            # Extract text using optimized Tesseract
-            text = pytesseract.image_to_string(enhanced_image, config=config, lang='eng')
+            if not result:
+                # Use optimized Tesseract configuration for passport documents
+                config = r'--oem 3 --psm 3 -c preserve_interword_spaces=1'
+                
+                # Extract words with confidences; text lines are rebuilt from the same call
+                data = self.backend.image_to_data(enhanced_image, config=config, lang='eng')
+                result = self._result_from_data(data)
+                logger.debug(f"Tesseract OCR result: {result['text'][:200]}...")
             
-            logger.debug(f"Tesseract OCR result: {text[:200]}...")
-            return text.strip()
+            if quality:
+                result['quality'] = quality
+            return result
             
+        except ImageQualityError:
+            raise
         except Exception as e:
-            logger.error(f"Error processing image {image_path}: {str(e)}")
+            logger.error(f"Error processing image {self._describe(image_path)}: {str(e)}")
             raise
     
+    def _ocr_mrz_band(self, enhanced_image):
+        """OCR only the machine-readable zone; None if it can't be located or read"""
+        if enhanced_image.mode != 'L':
+            return None
+        
+        box = locate_mrz(np.asarray(enhanced_image))
+        if box is None:
+            logger.debug("No MRZ band found, using full-page OCR")
+            return None
+        
+        data = self.backend.image_to_data(enhanced_image.crop(box), config=MRZ_TESSERACT_CONFIG, lang='eng')
+        result = self._result_from_data(data, offset=box[:2])
+        if not looks_like_mrz(result['text']):
+            logger.debug(f"MRZ band {box} did not read as MRZ, using full-page OCR")
+            return None
+        
+        logger.debug(f"MRZ OCR result: {result['text']}")
+        return result
+    
+    @staticmethod
+    def _result_from_data(data, offset=(0, 0)):
+        """Rebuild line-broken text, the word confidence list and the word layout from image_to_data output"""
+        lines = {}
+        words = []
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            if not word:
+                continue
+            conf = float(data['conf'][i])
+            if conf < 0:
+                continue
+            key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+            words.append([word, conf])
+        
+        text = '\n'.join(' '.join(line) for line in lines.values())
+        return {'text': text.strip(), 'words': words, 'layout': WordLayout.from_data(data, offset=offset)}
+    
     def _process_pdf(self, pdf_path):
-        """Extract text from PDF by converting to images first"""
+        """Extract text from a PDF path or PDF bytes, OCR'ing only pages without a usable text layer"""
         try:
-            # Try to extract text directly first (for text-based PDFs)
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                
-                # If we got meaningful text, return it
-                if len(text.strip()) > 50:
-                    return text.strip()
-            
-            # If direct text extraction failed, convert to images and use OCR
             try:
-                from pdf2image import convert_from_path
-                images = convert_from_path(pdf_path, dpi=300)
-                
-                extracted_text = ""
-                for i, image in enumerate(images):
-                    # Enhance image for better OCR
-                    enhanced_image = self._enhance_image(image)
-                    
-                    # Use enhanced OCR processing for each page
-                    # Try multiple configurations to get best results
-                    configs = [
-                        r'--oem 3 --psm 6',
-                        r'--oem 3 --psm 4',
-                        r'--oem 3 --psm 3'
-                    ]
-                    
-                    best_page_text = ""
-                    max_conf = 0
-                    
-                    for config in configs:
-                        try:
-                            data = pytesseract.image_to_data(enhanced_image, config=config, output_type=pytesseract.Output.DICT)
-                            text_parts = []
-                            total_conf = 0
-                            word_count = 0
-                            
-                            for j, conf in enumerate(data['conf']):
-                                if int(conf) > 30:
-                                    word = data['text'][j].strip()
-                                    if word:
-                                        text_parts.append(word)
-                                        total_conf += int(conf)
-                                        word_count += 1
-                            
-                            if word_count > 0:
-                                avg_conf = total_conf / word_count
-                                current_text = ' '.join(text_parts)
-                                if avg_conf > max_conf:
-                                    max_conf = avg_conf
-                                    best_page_text = current_text
-                                    
-                        except Exception:
-                            continue
-                    
-                    page_text = best_page_text or pytesseract.image_to_string(enhanced_image)
-                    extracted_text += page_text + "\n"
-                
-                return extracted_text.strip()
+                # Pages are rendered and OCR'd as the generator is consumed, so only
+                # pdf_render_batch page images are ever held in memory at once
+                return self.merge_page_results(list(self.iter_pdf_pages(pdf_path)))
                 
             except ImportError:
-                logger.error("pdf2image not available, falling back to PyPDF2 only")
-                return text.strip() if text.strip() else "No text could be extracted from PDF"
+                return self.text_layer_result(pdf_path)
             
+        except ImageQualityError:
+            raise
         except Exception as e:
-            logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
+            logger.error(f"Error processing PDF {self._describe(pdf_path)}: {str(e)}")
             raise
     
+    def iter_pdf_pages(self, pdf_path):
+        """Yield one OCR result per PDF page, rendering at most pdf_render_batch pages at a time"""
+        plan = self.plan_pdf_pages(pdf_path)
+        i = 0
+        while i < len(plan):
+            page_number, text, dpi = plan[i]
+            if text:
+                yield {'text': text, 'words': []}
+                i += 1
+                continue
+            
+            # Render a run of consecutive scanned pages in one call
+            chunk = [plan[i]]
+            while len(chunk) < self.pdf_render_batch and i + len(chunk) < len(plan) \
+                    and not plan[i + len(chunk)][1]:
+                chunk.append(plan[i + len(chunk)])
+            i += len(chunk)
+            
+            images = self._render_pdf(pdf_path, dpi=min(page[2] for page in chunk), grayscale=True,
+                                      first_page=chunk[0][0], last_page=chunk[-1][0])
+            images.reverse()
+            while images:
+                # Drop each page image before the consumer sees its result
+                result = self._ocr_pdf_page_image(images.pop())
+                yield result
+    
+    def plan_pdf_pages(self, pdf_path):
+        """Per page (page_number, usable text layer or None, render DPI) for a PDF path or bytes"""
+        source = io.BytesIO(pdf_path) if isinstance(pdf_path, bytes) else pdf_path
+        plan = []
+        for page_number, page in enumerate(PyPDF2.PdfReader(source).pages, start=1):
+            text = (page.extract_text() or '').strip()
+            plan.append((page_number, text if len(text) > MIN_TEXT_LAYER_CHARS else None, self._page_dpi(page)))
+        return plan
+    
+    def _page_dpi(self, page):
+        """Render DPI for a PyPDF2 page from its physical size (points are 1/72 inch)"""
+        try:
+            long_side = max(float(page.mediabox.width), float(page.mediabox.height)) / 72.0
+        except Exception:
+            return self.pdf_max_dpi
+        if long_side <= 0:
+            return self.pdf_max_dpi
+        return int(min(self.pdf_max_dpi, max(self.pdf_min_dpi, self.pdf_target_long_side / long_side)))
+    
+    @staticmethod
+    def merge_page_results(pages):
+        """Join per-page OCR results into a single document result.
+        
+        Raises ImageQualityError when no page produced text and at least one
+        was rejected by the quality check.
+        """
+        layouts = [page['layout'] for page in pages if page.get('layout')]
+        result = {
+            'text': '\n'.join(page['text'] for page in pages).strip(),
+            'words': [word for page in pages for word in page['words']],
+            'layout': WordLayout.merge(layouts) if layouts else None,
+            # Winning layout per OCR'd page, and every layout's confidence on the sampled pages;
+            # ocr_config_stats orders the layouts from the latter
+            'configs': [page['config'] for page in pages if page.get('config')],
+            'config_trials': [page['trials'] for page in pages if page.get('trials')]
+        }
+        
+        # Pre-flight metrics per page, None for text-layer pages
+        qualities = [page.get('quality') for page in pages]
+        if any(qualities):
+            result['quality'] = {'pages': qualities}
+        
+        rejected = [quality for quality in qualities if quality and quality['rejected']]
+        if rejected and not result['text']:
+            raise ImageQualityError(rejection_message(rejected[0]), result['quality'])
+        return result
+    
+    def text_layer_result(self, pdf_path):
+        """OCR result from the PDF text layer alone, used when pages can't be rendered (no pdf2image)"""
+        logger.error("pdf2image not available, falling back to PyPDF2 only")
+        text = self.extract_pdf_text_layer(pdf_path)
+        return {'text': text.strip() if text.strip() else "No text could be extracted from PDF", 'words': []}
+    
+    def extract_pdf_text_layer(self, pdf_path):
+        """Return the embedded text layer of a PDF path or PDF bytes (empty for scanned PDFs)"""
+        if isinstance(pdf_path, bytes):
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_path))
+            return "".join(page.extract_text() for page in pdf_reader.pages)
+        
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            text = ""
+            for page in pdf_reader.pages:
+                text += page.extract_text()
+        return text
+    
+    @staticmethod
+    def _render_pdf(pdf_path, **kwargs):
+        """Render PDF pages to PIL images from a path or from PDF bytes"""
+        from pdf2image import convert_from_path, convert_from_bytes
+        if isinstance(pdf_path, bytes):
+            return convert_from_bytes(pdf_path, **kwargs)
+        return convert_from_path(pdf_path, **kwargs)
+    
+    @staticmethod
+    def _describe(source):
+        if isinstance(source, bytes):
+            return f"<{len(source)} bytes>"
+        return source if isinstance(source, str) else '<stream>'
+    
+    def process_pdf_page(self, pdf_path, page_number, dpi=None):
+        """Render and OCR a single 1-based page of a scanned PDF"""
+        if dpi is None:
+            source = io.BytesIO(pdf_path) if isinstance(pdf_path, bytes) else pdf_path
+            dpi = self._page_dpi(PyPDF2.PdfReader(source).pages[page_number - 1])
+        images = self._render_pdf(pdf_path, dpi=dpi, grayscale=True, first_page=page_number, last_page=page_number)
+        return self._ocr_pdf_page_image(images[0]) if images else {'text': '', 'words': []}
+    
+    def _ocr_pdf_page_image(self, image):
+        """OCR one rendered PDF page, stopping at the first layout that is confident enough"""
+        # A rejected page (often a blank back page) is skipped rather than failing the whole document
+        quality = self.preflight.assess(image) if self.preflight.enabled else None
+        if quality and quality['rejected']:
+            logger.info(f"Skipping PDF page: {'; '.join(quality['issues'])}")
+            return {'text': '', 'words': [], 'quality': quality}
+        
+        # Enhance image for better OCR
+        enhanced_image = self._enhance_image(image)
+        
+        first, remaining = self.config_order[0], self.config_order[1:]
+        candidates = [self._ocr_with_config(enhanced_image, first)]
+        self._pages_seen += 1
+        sample = self.config_sample_every > 0 and self._pages_seen % self.config_sample_every == 0
+        
+        if (sample or not self._confident(candidates[0])) and remaining:
+            # Only the CLI backend gains from threads, each call being its own tesseract process. tesserocr runs
+            # in-process with an engine per thread, so short-lived pool threads would each load a new one
+            if self.parallel_configs and self.backend.name == 'cli':
+                with ThreadPoolExecutor(max_workers=len(remaining)) as pool:
+                    candidates += pool.map(lambda name: self._ocr_with_config(enhanced_image, name), remaining)
+            else:
+                for name in remaining:
+                    candidates.append(self._ocr_with_config(enhanced_image, name))
+                    if self._confident(candidates[-1]) and not sample:
+                        break
+        
+        best = None
+        for candidate in candidates:
+            if candidate and (best is None or candidate['confidence'] > best['confidence']):
+                best = candidate
+        
+        if best:
+            result = {'text': best['text'], 'words': best['words'], 'layout': best['layout'], 'config': best['config']}
+        else:
+            result = {'text': self.backend.image_to_string(enhanced_image).strip(), 'words': []}
+        if sample and remaining:
+            # A layout that read nothing scores 0
+            result['trials'] = {name: candidate['confidence'] if candidate else 0.0
+                                for name, candidate in zip(self.config_order, candidates)}
+        if quality:
+            result['quality'] = quality
+        return result
+    
+    def _ocr_with_config(self, enhanced_image, name):
+        """Run one page layout; returns text, words, average confidence and config name, or None"""
+        try:
+            data = self.backend.image_to_data(enhanced_image, config=PDF_PAGE_CONFIGS[name])
+        except Exception as e:
+            logger.debug(f"OCR config {name} failed: {str(e)}")
+            return None
+        
+        words = []
+        for j, conf in enumerate(data['conf']):
+            conf = float(conf)
+            if conf > 30:
+                word = data['text'][j].strip()
+                if word:
+                    words.append([word, conf])
+        
+        if not words:
+            return None
+        return {
+            'text': ' '.join(word for word, _ in words),
+            'words': words,
+            'layout': WordLayout.from_data(data, min_conf=30),
+            'confidence': sum(conf for _, conf in words) / len(words),
+            'config': name
+        }
+    
+    def _confident(self, candidate):
+        return candidate is not None and candidate['confidence'] >= self.confidence_threshold
+    
     def _enhance_image(self, image):
         """Enhance image for better OCR results with advanced preprocessing"""
         try:
-            from PIL import ImageEnhance, ImageFilter, ImageOps
-            import numpy as np
-            
-            # Resize image if too small (minimum 300 DPI equivalent)
-            width, height = image.size
-            if width < 1200 or height < 800:
-                scale_factor = max(1200 / width, 800 / height)
-                new_size = (int(width * scale_factor), int(height * scale_factor))
-                image = image.resize(new_size, Image.LANCZOS)
-            
-            # Convert to grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Apply Gaussian blur to reduce noise
-            image = image.filter(ImageFilter.GaussianBlur(radius=0.5))
-            
-            # Enhance contrast more aggressively
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.5)
-            
-            # Auto-level (histogram equalization)
-            image = ImageOps.autocontrast(image, cutoff=2)
-            
-            # Sharpen the image
-            enhancer = ImageEnhance.Sharpness(image)
-            image = enhancer.enhance(1.5)
-            
-            # Apply unsharp mask filter for better text clarity
-            image = image.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=3))
-            
-            # Convert to numpy array for morphological operations
-            img_array = np.array(image)
-            
-            # Apply threshold to create binary image
-            threshold = np.percentile(img_array, 60)  # Adaptive threshold
-            img_array = np.where(img_array > threshold, 255, 0).astype(np.uint8)
-            
-            # Convert back to PIL Image
-            image = Image.fromarray(img_array, mode='L')
-            
-            return image
+            return enhance_for_ocr(image)
             
         except Exception as e:
             logger.warning(f"Error enhancing image: {str(e)}")
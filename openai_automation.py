@@ -1,30 +1,90 @@
-import os
+import sys
 import json
+import time
 import logging
-from openai import OpenAI
+from openai_client import openai_client
+from ai_cache import ai_cache
+from ai_usage import ai_usage, timed_call
+from ai_breaker import ai_breaker, AIUnavailable
 
 logger = logging.getLogger(__name__)
 
+# Passport fields the enhancement prompt can ask for, with the description given to the model
+FIELD_DESCRIPTIONS = {
+    'passport_number': 'string (passport document number)',
+    'surname': 'string (family name/last name)',
+    'given_names': 'string (first and middle names)',
+    'nationality': 'string (country of citizenship)',
+    'date_of_birth': 'string (DD/MM/YYYY format)',
+    'place_of_birth': 'string (city, country)',
+    'sex': 'string (M or F)',
+    'date_of_issue': 'string (DD/MM/YYYY format)',
+    'date_of_expiry': 'string (DD/MM/YYYY format)',
+    'issuing_authority': 'string (government department that issued passport)',
+    'emergency_contact': 'string (emergency contact person name)',
+    'phone_number': 'string (contact phone number)',
+    'previous_passport': 'string (old passport number if mentioned)',
+}
+
 class OpenAIAutomation:
     def __init__(self):
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
         self.model = "gpt-4o"
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if api_key:
-            self.client = OpenAI(api_key=api_key)
-            self.enabled = True
-        else:
-            self.client = None
-            self.enabled = False
-            logger.warning("OpenAI API key not found. AI automation features disabled.")
+        # Cheap to construct: every instance shares the process-wide client (connection pool, retries, deadline)
+        self.client = openai_client
+        self.enabled = openai_client.enabled
+    
+    def complete(self, messages, temperature, fresh=False, feature=None, cache=True, **params):
+        """Message content of a chat completion; identical requests are answered from ai_cache unless ``fresh``.
+        
+        ``cache=False`` keeps the call out of ai_cache altogether, for answers
+        that depend on state outside the prompt or must not be stored. Every
+        call, cache hits included, is recorded with ai_usage under ``feature``
+        (default: the name of the calling method), and runs within that
+        feature's latency budget behind the ai_breaker circuit breaker.
+        """
+        feature = feature or sys._getframe(1).f_code.co_name
+        request = dict(model=self.model, messages=messages, temperature=temperature, **params)
+        key = ai_cache.request_hash(request) if cache else None
+        if cache and fresh:
+            ai_cache.bypass()
+        elif cache:
+            start = time.perf_counter()
+            cached = ai_cache.get(key)
+            if cached is not None:
+                ai_usage.record(feature, self.model, 'cached', time.perf_counter() - start)
+                return cached
+        
+        # Interactive features get a short deadline; while the breaker is open this raises AIUnavailable at once
+        budget = ai_breaker.budget(feature)
+        try:
+            response = ai_breaker.call(
+                lambda: timed_call(feature, self.model, lambda: self.client.chat(timeout=budget, **request)))
+        except AIUnavailable:
+            ai_usage.record(feature, self.model, 'short_circuited', 0.0)
+            raise
+        content = response.choices[0].message.content
+        if cache:
+            # A fresh response replaces the cached one
+            ai_cache.put(key, self.model, content)
+        return content
     
-    def enhance_passport_extraction(self, raw_text, extracted_data):
-        """Use OpenAI to improve passport data extraction accuracy"""
+    def enhance_passport_extraction(self, raw_text, extracted_data, fields=None, fresh=False):
+        """Use OpenAI to improve passport data extraction accuracy.
+        
+        With ``fields`` only those fields are asked for and returned. ``fresh``
+        skips the response cache (as for every method here). Raises
+        AIUnavailable, or the error of a failed call, rather than handing
+        back ``extracted_data`` as if it had been enhanced.
+        """
         if not self.enabled:
             return extracted_data
         
         try:
+            fields = fields or list(FIELD_DESCRIPTIONS)
+            current = {field: extracted_data.get(field) for field in fields}
+            field_list = '\n'.join(f"            - {field}: {FIELD_DESCRIPTIONS[field]}" for field in fields)
             prompt = f"""
             You are an expert passport data extraction assistant. Analyze the OCR text below and extract accurate passport information.
             
@@ -32,22 +92,10 @@ class OpenAIAutomation:
             {raw_text}
             
             Current extracted data:
-            {json.dumps(extracted_data, indent=2)}
+            {json.dumps(current, indent=2)}
             
             Please provide improved extraction in JSON format with these exact fields:
-            - passport_number: string (passport document number)
-            - surname: string (family name/last name)
-            - given_names: string (first and middle names)
-            - nationality: string (country of citizenship)
-            - date_of_birth: string (DD/MM/YYYY format)
-            - place_of_birth: string (city, country)
-            - sex: string (M or F)
-            - date_of_issue: string (DD/MM/YYYY format)
-            - date_of_expiry: string (DD/MM/YYYY format)
-            - issuing_authority: string (government department that issued passport)
-            - emergency_contact: string (emergency contact person name)
-            - phone_number: string (contact phone number)
-            - previous_passport: string (old passport number if mentioned)
+{field_list}
             
             Rules:
             1. Only extract information that is clearly visible in the text
@@ -57,26 +105,33 @@ class OpenAIAutomation:
             5. Preserve original spelling of proper names
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            content = self.complete(
                 messages=[
                     {"role": "system", "content": "You are a passport data extraction expert. Return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"},
-                temperature=0.1
+                temperature=0.1,
+                fresh=fresh
             )
             
-            enhanced_data = json.loads(response.choices[0].message.content)
-            logger.info("OpenAI enhanced passport data extraction completed")
-            return enhanced_data
+            enhanced_data = json.loads(content)
+            logger.info(f"OpenAI enhanced passport data extraction completed ({len(fields)} fields)")
+            return {field: enhanced_data.get(field) for field in fields if field in enhanced_data}
             
+        except AIUnavailable:
+            # OpenAI is degraded; the caller keeps its regex parse without waiting on it
+            raise
         except Exception as e:
             logger.error(f"OpenAI enhancement failed: {str(e)}")
-            return extracted_data
+            raise
     
-    def validate_passport_data(self, data):
-        """Use OpenAI to validate passport data for consistency and errors"""
+    def validate_passport_data(self, data, fresh=False):
+        """Use OpenAI to validate passport data for consistency and errors.
+        
+        Raises AIUnavailable, the error of a failed call, or ValueError for an
+        answer without a verdict; only a real verdict is ever returned.
+        """
         if not self.enabled:
             return {"valid": True, "issues": []}
         
@@ -100,24 +155,118 @@ class OpenAIAutomation:
             - suggestions: array of strings with improvement recommendations
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            content = self.complete(
                 messages=[
                     {"role": "system", "content": "You are a passport data validator. Return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"},
-                temperature=0.1
+                temperature=0.1,
+                fresh=fresh
             )
             
-            validation = json.loads(response.choices[0].message.content)
+            validation = json.loads(content)
+            if not isinstance(validation, dict) or not isinstance(validation.get('valid'), bool):
+                raise ValueError('AI validation answer has no valid/invalid verdict')
             return validation
             
+        except AIUnavailable:
+            # Not a verdict; never report the data as valid because the API is down
+            raise
         except Exception as e:
             logger.error(f"OpenAI validation failed: {str(e)}")
-            return {"valid": True, "issues": []}
+            raise
     
-    def generate_document_content(self, passport_data, document_type="job_offer"):
+    def validate_passport_batch(self, records, fresh=False):
+        """Validate several records in one call.
+        
+        ``records`` maps record id to passport data. Returns {id: {valid, issues,
+        suggestions}} for the ids the model answered; failures are raised to
+        the caller.
+        """
+        prompt = f"""
+            Analyze each passport record below for consistency and potential errors.
+            The records belong to different people and are keyed by record id:
+            
+            {json.dumps({str(record_id): data for record_id, data in records.items()}, indent=2)}
+            
+            Check each record for:
+            1. Date format consistency (should be DD/MM/YYYY)
+            2. Logical date relationships (birth < issue < expiry)
+            3. Name format consistency
+            4. Passport number format validity
+            5. Missing critical information
+            6. OCR errors or suspicious values
+            
+            Return JSON with a "results" object keyed by the same record ids, each with:
+            - valid: boolean (true if data appears correct)
+            - issues: array of strings describing any problems found
+            - suggestions: array of strings with improvement recommendations
+            """
+        
+        content = self.complete(
+            messages=[
+                {"role": "system", "content": "You are a passport data validator. Return only valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.1,
+            fresh=fresh
+        )
+        return self._batch_results(content, records)
+    
+    def enhance_passport_batch(self, documents, fields=None, fresh=False):
+        """Improve the extraction of several documents in one call.
+        
+        ``documents`` maps record id to (raw_text, extracted_data). Returns
+        {id: {field: value}} for the ids the model answered; failures are raised.
+        """
+        fields = fields or list(FIELD_DESCRIPTIONS)
+        sections = []
+        for record_id, (raw_text, extracted_data) in documents.items():
+            current = {field: extracted_data.get(field) for field in fields}
+            sections.append(f"--- Document {record_id} ---\nOCR Text:\n{raw_text}\n\n"
+                            f"Current extracted data:\n{json.dumps(current, indent=2)}")
+        field_list = '\n'.join(f"            - {field}: {FIELD_DESCRIPTIONS[field]}" for field in fields)
+        prompt = f"""
+            You are an expert passport data extraction assistant. Each document below is the OCR text of a
+            different passport with the data extracted from it so far. Analyze each document on its own.
+            
+{chr(10).join(sections)}
+            
+            Return JSON with a "results" object keyed by document id, each with these exact fields:
+{field_list}
+            
+            Rules:
+            1. Only extract information that is clearly visible in that document's text
+            2. Use null for missing information
+            3. Standardize dates to DD/MM/YYYY format
+            4. Clean up OCR errors in names and text
+            5. Preserve original spelling of proper names
+            6. Never carry information over from one document to another
+            """
+        
+        content = self.complete(
+            messages=[
+                {"role": "system", "content": "You are a passport data extraction expert. Return only valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.1,
+            fresh=fresh
+        )
+        results = self._batch_results(content, documents)
+        return {record_id: {field: result.get(field) for field in fields if field in result}
+                for record_id, result in results.items()}
+    
+    @staticmethod
+    def _batch_results(content, ids):
+        """The per-id objects of a batch response's "results", ignoring ids that were not asked about"""
+        results = json.loads(content).get('results') or {}
+        by_key = {str(record_id): record_id for record_id in ids}
+        return {by_key[key]: value for key, value in results.items() if key in by_key and isinstance(value, dict)}
+    
+    def generate_document_content(self, passport_data, document_type="job_offer", fresh=False):
         """Generate document content using passport data"""
         if not self.enabled:
             return None
@@ -141,22 +290,20 @@ class OpenAIAutomation:
             else:
                 prompt = f"Generate a {document_type} document using passport data: {json.dumps(passport_data, indent=2)}"
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return self.complete(
                 messages=[
                     {"role": "system", "content": "You are a professional document generator. Create formal business documents."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                fresh=fresh
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             logger.error(f"OpenAI document generation failed: {str(e)}")
             return None
     
-    def smart_field_correction(self, field_name, current_value, context):
+    def smart_field_correction(self, field_name, current_value, context, fresh=False):
         """Use OpenAI to suggest corrections for specific fields"""
         if not self.enabled:
             return current_value
@@ -177,17 +324,17 @@ class OpenAIAutomation:
             Return only the corrected value, nothing else.
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            content = self.complete(
                 messages=[
                     {"role": "system", "content": "You are a data correction specialist. Return only the corrected value."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=100
+                max_tokens=100,
+                fresh=fresh
             )
             
-            corrected = response.choices[0].message.content.strip()
+            corrected = (content or '').strip()
             return corrected if corrected else current_value
             
         except Exception as e:
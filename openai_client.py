@@ -0,0 +1,177 @@
+import os
+import time
+import atexit
+import random
+import logging
+import threading
+
+import httpx
+import openai
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+
+class AIDeadlineExceeded(TimeoutError):
+    """An OpenAI call ran out of its deadline, waiting for a slot or across retries"""
+
+
+class OpenAIClientManager:
+    """One OpenAI client per process, shared by every caller.
+
+    The client keeps a keep-alive HTTP connection pool (OPENAI_POOL_SIZE
+    connections), so calls after the first skip the TCP/TLS handshake. Each
+    call gets a deadline of OPENAI_TIMEOUT seconds covering the wait for a
+    concurrency slot (OPENAI_MAX_CONCURRENCY in flight), every attempt and the
+    backoff between them. 429s, 5xx and connection errors are retried up to
+    OPENAI_MAX_RETRIES times with full-jitter exponential backoff
+    (OPENAI_BACKOFF doubling up to OPENAI_MAX_BACKOFF seconds), honouring
+    Retry-After. OPENAI_BASE_URL points the client at another server, such as
+    the local stand-in in benchmarks/bench_openai_client.py.
+    """
+
+    def __init__(self):
+        self.api_key = os.environ.get('OPENAI_API_KEY')
+        self.base_url = os.environ.get('OPENAI_BASE_URL') or None
+        self.timeout = float(os.environ.get('OPENAI_TIMEOUT', '30'))
+        self.connect_timeout = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', '5'))
+        self.max_retries = int(os.environ.get('OPENAI_MAX_RETRIES', '3'))
+        self.backoff = float(os.environ.get('OPENAI_BACKOFF', '0.5'))
+        self.max_backoff = float(os.environ.get('OPENAI_MAX_BACKOFF', '8'))
+        self.max_concurrency = max(1, int(os.environ.get('OPENAI_MAX_CONCURRENCY', '4')))
+        self.pool_size = max(self.max_concurrency, int(os.environ.get('OPENAI_POOL_SIZE', '8')))
+
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._counters = {
+            'calls': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'retries': 0,
+            'deadline_exceeded': 0,
+            'slot_wait_seconds': 0.0,
+            'in_flight': 0,
+        }
+
+        if not self.api_key:
+            logger.warning("OpenAI API key not found. AI automation features disabled.")
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        """The shared OpenAI client, created on first use (and again in a forked child)"""
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    # A pool inherited over fork would share sockets with the parent, so never reuse it
+                    self._client = self._build_client()
+                    self._pid = pid
+        return self._client
+
+    def _build_client(self):
+        http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                                keepalive_expiry=60),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+        # Retries are done here instead of by the SDK so they share the call's deadline
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=http_client)
+
+    def chat(self, timeout=None, **kwargs):
+        """chat.completions.create with the deadline, retries and concurrency limit applied.
+
+        ``timeout`` overrides OPENAI_TIMEOUT for this call. Raises
+        AIDeadlineExceeded when the deadline runs out, or the last OpenAI error.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._count('calls')
+        attempt = 0
+        while True:
+            try:
+                response = self._attempt(deadline, kwargs)
+            except AIDeadlineExceeded:
+                self._count('failed')
+                self._count('deadline_exceeded')
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or time.monotonic() + delay >= deadline:
+                    self._count('failed')
+                    if isinstance(e, openai.APITimeoutError):
+                        self._count('deadline_exceeded')
+                        raise AIDeadlineExceeded(f"OpenAI call deadline exceeded after {attempt + 1} attempts") from e
+                    raise
+                attempt += 1
+                self._count('retries')
+                logger.info(f"OpenAI call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} "
+                            f"in {delay:.2f}s")
+                # The concurrency slot is not held while backing off
+                time.sleep(delay)
+                continue
+            self._count('succeeded')
+            return response
+
+    def _attempt(self, deadline, kwargs):
+        """One request, holding a concurrency slot only while it is in flight"""
+        waited = time.monotonic()
+        if not self._slots.acquire(timeout=max(0.0, deadline - waited)):
+            raise AIDeadlineExceeded(f"No OpenAI call slot free before the deadline "
+                                     f"({self.max_concurrency} calls already in flight)")
+        self._count('slot_wait_seconds', time.monotonic() - waited)
+        self._count('in_flight')
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise AIDeadlineExceeded("OpenAI call deadline exceeded")
+            return self.client.chat.completions.create(
+                timeout=httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining)), **kwargs)
+        finally:
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying after ``error``, or None if it should not be retried"""
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, openai.APIStatusError):
+            status = error.status_code
+            # An exhausted quota also comes back as 429 but will not clear up by retrying
+            if not (status == 429 or status >= 500) or getattr(error, 'code', None) == 'insufficient_quota':
+                return None
+            retry_after = error.response.headers.get('retry-after')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.max_backoff)
+                except ValueError:
+                    pass
+        elif not isinstance(error, openai.APIConnectionError):
+            return None
+        # Full jitter keeps workers that failed together from retrying together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['slot_wait_seconds'] = round(stats['slot_wait_seconds'], 3)
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+
+
+openai_client = OpenAIClientManager()
+atexit.register(openai_client.close)
@@ -1,117 +1,243 @@
+import os
 import re
+import time
+import string
 import logging
-from datetime import datetime
+from bisect import bisect_right
+from mrz import parse_mrz, passport_fields, verified_fields
+from nationalities import lookup as nationality_code, country_name
+from date_tokenizer import DATE_TOKEN_RE, candidates, numeric_order, parse_date, format_date, month_first
 
 logger = logging.getLogger(__name__)
 
+# Field labels printed on passport data pages (lower case, single-spaced)
+FIELD_LABELS = {
+    'previous_passport': ['old passport no', 'old passport number', 'previous passport', 'previous passport no',
+                          'last passport', 'last passport no'],
+    'passport_number': ['passport no', 'passport number', 'document no', 'document number'],
+    'surname': ['surname', 'family name', 'last name'],
+    'given_names': ['given name', 'given names', 'first name', 'first names'],
+    'place_of_birth': ['place of birth', 'birth place', 'born in'],
+    'date_of_birth': ['date of birth', 'birth date', 'dob', 'born'],
+    'date_of_issue': ['date of issue', 'issue date', 'issued', 'issued on'],
+    'date_of_expiry': ['date of expiry', 'expiry date', 'expiry', 'expires', 'valid until'],
+    'issuing_authority': ['issuing authority', 'authority'],
+    'emergency_contact': ['emergency contact', 'in case of emergency'],
+    'phone_number': ['phone', 'tel', 'mobile'],
+    'nationality': ['nationality', 'citizenship'],
+    'sex': ['sex', 'gender'],
+    'full_name': ['name'],
+}
+
+LABEL_FIELDS = {label: field for field, labels in FIELD_LABELS.items() for label in labels}
+
+
+def _trie_pattern(phrases):
+    """Regex for a set of phrases, factored by common prefix so each position costs one branch test"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        # Greedy '?' prefers the longest label, e.g. "passport no" inside "old passport no"
+        return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')
+
+    return build(trie)
+
+
+# Every label in one prefix-factored alternation, run once over a lower-cased copy of the text
+LABEL_RE = re.compile(r'\b' + _trie_pattern(LABEL_FIELDS) + r'\b')
+
+# Value shapes, searched only inside the short span that belongs to a label
+_ID = re.compile(r'\b(?=[A-Z]{0,3}[0-9])[A-Z0-9]{6,15}\b', re.IGNORECASE)
+_NAME = re.compile(r"[A-Z][A-Z' \-]{0,40}", re.IGNORECASE)
+_PLACE = re.compile(r"[A-Z][A-Z ,.'/\-]{1,50}", re.IGNORECASE)
+_DATE = DATE_TOKEN_RE
+_SEX = re.compile(r'\b(?:MALE|FEMALE|M|F)\b', re.IGNORECASE)
+_PHONE = re.compile(r'\+?[0-9][0-9\-() ]{6,18}[0-9]')
+
+FIELD_VALUES = {
+    'passport_number': _ID,
+    'previous_passport': _ID,
+    'surname': _NAME,
+    'given_names': _NAME,
+    'full_name': _NAME,
+    'nationality': _NAME,
+    'date_of_birth': _DATE,
+    'date_of_issue': _DATE,
+    'date_of_expiry': _DATE,
+    'place_of_birth': _PLACE,
+    'issuing_authority': _PLACE,
+    'emergency_contact': _PLACE,
+    'phone_number': _PHONE,
+    'sex': _SEX,
+}
+
+# Unlabelled fallbacks, searched (first occurrence only) for fields with no labelled
+# value. Patterns run on the lower-cased text and start with a character class
+# rather than \b so the regex engine can skip ahead; word boundaries on the left
+# are checked in _extract_fallbacks.
+FALLBACK_PATTERNS = {
+    'date_of_birth': re.compile(r'[0-9]{1,2}[/\-.][0-9]{1,2}[/\-.][0-9]{4}(?![0-9])'),
+    'phone_number': re.compile(r'\+[0-9]{1,3}[\-\s]?[0-9]{8,12}'),
+    'passport_number': re.compile(r'[a-z]{1,3}[0-9]{6,10}\b'),
+    'nationality': re.compile(_trie_pattern([
+        'bangladesh', 'india', 'pakistan', 'sri lanka', 'nepal', 'united states', 'canada', 'australia'
+    ]) + r'\b'),
+    'sex': re.compile(r'male\b'),  # also matches the tail of "female"
+}
+
+# Lower-cases ASCII only, so offsets in the lowered copy are valid in the original text
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Fields returned by parse_passport_text, in order
+PASSPORT_FIELDS = [
+    'passport_number', 'surname', 'given_names', 'nationality', 'date_of_birth',
+    'place_of_birth', 'sex', 'date_of_issue', 'date_of_expiry', 'issuing_authority',
+    'emergency_contact', 'phone_number', 'previous_passport'
+]
+
+# MRZ fields protected by their own check digit
+MRZ_CHECKED_FIELDS = {'passport_number', 'date_of_birth', 'date_of_expiry'}
+
+# Base confidence of a field value by where it was read from
+SOURCE_CONFIDENCE = {
+    'mrz_verified': 1.0,  # MRZ field whose check digit passed
+    'layout': 0.95,       # value found beside or under its label on the page (word boxes)
+    'label': 0.9,         # value next to a printed field label in the text
+    'mrz': 0.8,           # MRZ field without a passing check digit
+    'fallback': 0.6,      # unlabelled pattern match somewhere in the text
+}
+
+# Expected shape of post-processed values; a value that does not fit halves its confidence
+FIELD_FORMATS = {
+    'passport_number': re.compile(r'^[A-Z0-9]{6,15}$', re.IGNORECASE),
+    'previous_passport': re.compile(r'^[A-Z0-9]{6,15}$', re.IGNORECASE),
+    'date_of_birth': re.compile(r'^[0-9]{2}/[0-9]{2}/[0-9]{4}$'),
+    'date_of_issue': re.compile(r'^[0-9]{2}/[0-9]{2}/[0-9]{4}$'),
+    'date_of_expiry': re.compile(r'^[0-9]{2}/[0-9]{2}/[0-9]{4}$'),
+    'sex': re.compile(r'^[MF]$'),
+    'phone_number': re.compile(r'^\+?[0-9][0-9\-() ]{6,18}[0-9]$'),
+}
+
+_TOKEN = re.compile(r'[A-Za-z0-9]+')
+
+# Characters between a label and its value
+_SEPARATORS = ' \t:-/.|'
+
+# A value printed under its label starts within this many label heights below it
+LAYOUT_VALUE_GAP = 2.5
+
+# Longest span after a label that a value is searched in; values are a few words,
+# and the cap keeps value patterns off megabyte-long single-line OCR output
+MAX_VALUE_SPAN = 120
+
+
+def expiry_after(expiry, *earlier):
+    """Whether an expiry date falls after each of the ``earlier`` (birth, issue) dates.
+    
+    Dates that are missing or unreadable are not compared.
+    """
+    end = parse_date(expiry) if expiry else None
+    if not end:
+        return True
+    return all(end > start for start in (parse_date(value) for value in earlier if value) if start)
+
+
+class ParseBudgetExceeded(Exception):
+    """A parse ran past its time budget; ``pattern`` names the pattern that had just run"""
+
+    def __init__(self, pattern, elapsed):
+        super().__init__(f"{pattern} after {elapsed * 1000:.0f} ms")
+        self.pattern = pattern
+        self.elapsed = elapsed
+
+
 class PassportParser:
-    def __init__(self):
-        # Define regex patterns for passport fields
-        self.patterns = {
-            'passport_number': [
-                r'Passport\s+No\.?\s*[:\-]?\s*([A-Z0-9]{6,15})',
-                r'Document\s+No\.?\s*[:\-]?\s*([A-Z0-9]{6,15})',
-                r'P<[A-Z]{3}([A-Z0-9]{9})',
-                r'([A-Z]{1,3}[0-9]{6,10})',
-                r'No\.?\s*[:\-]?\s*([A-Z0-9]{6,15})',
-                r'Number[:\-\s]*([A-Z0-9]{6,15})',
-                r'([0-9]{8,12})',
-                r'OLD\s+PASSPORT\s+NO\.?\s*[:\-]?\s*([A-Z0-9]{6,15})',  # Previous passport
-            ],
-            'surname': [
-                r'Surname[:\-\s]*([A-Z][A-Z\s]{1,30})(?:\s*\n|\s+[A-Z][a-z]|\s+GIVEN|\s+NAME)',
-                r'Family\s+Name[:\-\s]*([A-Z][A-Z\s]{1,30})(?:\s*\n|\s+GIVEN)',
-                r'([A-Z]{2,20}),\s*([A-Z\s]{2,30})',  # "SURNAME, GIVEN NAMES" format
-                r'NAME[:\-\s]*([A-Z]{2,20})\s+([A-Z\s]{2,30})',
-                r'([A-Z]{2,20})\s+[A-Z]{2,20}\s+[A-Z]{2,20}',  # First word of full name
-            ],
-            'given_names': [
-                r'Given\s+Names?[:\-\s]*([A-Z][A-Z\s]{1,40})(?:\s*\n|\s+DATE|\s+NATIONALITY)',
-                r'First\s+Name[:\-\s]*([A-Z][A-Z\s]{1,30})(?:\s*\n)',
-                r'([A-Z]{2,20}),\s*([A-Z\s]{2,30})',  # Extract given names from "SURNAME, GIVEN" format
-                r'NAME[:\-\s]*[A-Z]{2,20}\s+([A-Z\s]{2,30})',  # Second part of full name
-                r'Father.*?Name[:\-\s]*([A-Z][A-Z\s]{1,30})(?:\s*\n)',
-            ],
-            'nationality': [
-                r'Nationality[:\-\s]*([A-Z]{3,20})(?:\s*\n|\s+DATE)',
-                r'Country[:\-\s]*([A-Z]{3,20})',
-                r'P<([A-Z]{3})',
-                r'([A-Z]{3})\s+NATIONALITY',
-                r'BANGLADESH|INDIA|PAKISTAN|SRI\s+LANKA|NEPAL|UNITED\s+STATES|CANADA|AUSTRALIA',
-            ],
-            'date_of_birth': [
-                r'Date\s+of\s+Birth[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'DOB[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'Born[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'Birth[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',  # Any date format
-                r'([0-9]{2})\s*([0-9]{2})\s*([0-9]{4})',  # Spaced date format
-            ],
-            'place_of_birth': [
-                r'Place\s+of\s+Birth[:\-\s]*([A-Z][A-Z\s,]{2,40})(?:\s*\n|\s+SEX|\s+DATE)',
-                r'Born\s+in[:\-\s]*([A-Z][A-Z\s,]{2,40})(?:\s*\n)',
-                r'Birth\s+Place[:\-\s]*([A-Z][A-Z\s,]{2,40})(?:\s*\n)',
-            ],
-            'sex': [
-                r'Sex[:\-\s]*([MF])',
-                r'Gender[:\-\s]*([MF])',
-                r'([MF])\s*[0-9]{6}',
-                r'MALE|FEMALE',
-            ],
-            'date_of_issue': [
-                r'Date\s+of\s+Issue[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'Issue[d]?[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})\s*ISSUE',
-            ],
-            'date_of_expiry': [
-                r'Date\s+of\s+Expiry[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'Expir[yies]*[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'Valid\s+until[:\-\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})',
-                r'([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{4})\s*EXPIRY',
-            ],
-            'issuing_authority': [
-                r'Issuing\s+Authority[:\-\s]*([A-Z][A-Z\s,]{5,50})(?:\s*\n|\s+DATE)',
-                r'Authority[:\-\s]*([A-Z][A-Z\s,]{5,50})(?:\s*\n)',
-                r'Department[:\-\s]*([A-Z][A-Z\s,]{5,50})(?:\s*\n)',
-                r'DEPARTMENT\s+OF\s+PASSPORTS[A-Z\s,]*',
-            ],
-            'emergency_contact': [
-                r'Emergency\s+Contact[:\-\s]*([A-Z][A-Z\s,]{5,50})(?:\s*\n|\s+[0-9])',
-                r'Contact[:\-\s]*([A-Z][A-Z\s,]{5,50})(?:\s*\n)',
-                r'In\s+case\s+of\s+emergency[:\-\s]*([A-Z][A-Z\s,]{5,50})(?:\s*\n)',
-            ],
-            'phone_number': [
-                r'Phone[:\-\s]*([0-9\+\-\(\)\s]{8,20})',
-                r'Tel[:\-\s]*([0-9\+\-\(\)\s]{8,20})',
-                r'Mobile[:\-\s]*([0-9\+\-\(\)\s]{8,20})',
-                r'([0-9]{3,4}[\-\s]?[0-9]{3,4}[\-\s]?[0-9]{3,6})',
-                r'(\+[0-9]{1,3}[\-\s]?[0-9]{8,12})',
-            ],
-            'previous_passport': [
-                r'Old\s+Passport\s+No[:\-\s]*([A-Z0-9]{6,15})',
-                r'Previous\s+Passport[:\-\s]*([A-Z0-9]{6,15})',
-                r'Last\s+Passport[:\-\s]*([A-Z0-9]{6,15})',
-            ]
-        }
+    def __init__(self, time_budget=None):
+        # Seconds a single parse may take before it stops and keeps what it has (0 disables)
+        if time_budget is None:
+            time_budget = float(os.environ.get('PARSE_TIME_BUDGET_MS', '1000')) / 1000
+        self.time_budget = time_budget
+        # Read labelled values from word boxes when the OCR result has them
+        self.use_layout = os.environ.get('PARSER_USE_LAYOUT', '1') != '0'
+        self._started = None
     
-    def parse_passport_text(self, text):
-        """Parse extracted text and return structured passport data"""
+    def parse_passport_text(self, text, words=None, layout=None):
+        """Parse extracted text and return structured passport data.
+        
+        ``words`` is the OCR word list (``[[word, conf], ...]``); when given,
+        tesseract's confidence in a value's words feeds its field confidence.
+        ``layout`` is the OCR WordLayout; labelled values are then located by
+        their position relative to the label, and the text is only used for
+        fields the layout did not resolve.
+        
+        Extraction checks the time budget after every pattern it runs. Past the
+        budget it stops, logs the pattern that was running and post-processes the
+        fields found so far; ``parse_aborted`` then names that pattern.
+        """
         try:
             logger.debug(f"Parsing text: {text[:200]}...")
+            self._started = time.perf_counter()
             
-            # Clean and normalize text
-            cleaned_text = self._clean_text(text)
-            
-            result = {}
+            result = dict.fromkeys(PASSPORT_FIELDS)
+            result['mrz'] = None
+            sources = {}
+            decoded = None
+            date_hints = {}
+            printed_dates = {}
+            layout_confidence = {}
+            try:
+                if layout and self.use_layout:
+                    layout_confidence = self._extract_layout_fields(layout, result)
+                    sources = dict.fromkeys(layout_confidence, 'layout')
+                
+                # One scan for labels, then each value is read from the span after its label
+                self._extract_labelled_fields(text, result)
+                sources.update({field: 'label' for field in PASSPORT_FIELDS if result.get(field) and field not in sources})
+                
+                missing = [field for field in FALLBACK_PATTERNS if not result.get(field)]
+                if missing:
+                    fallbacks = self._extract_fallbacks(text, missing)
+                    result.update(fallbacks)
+                    sources.update(dict.fromkeys(fallbacks, 'fallback'))
+                
+                for field in PASSPORT_FIELDS:
+                    logger.debug(f"Extracted {field}: {result.get(field)}")
+                
+                # Values read from the machine-readable zone beat free-text matches
+                printed_dates = {field: result.get(field) for field in ('date_of_birth', 'date_of_issue', 'date_of_expiry')}
+                decoded = parse_mrz(text)
+                self._checkpoint('mrz')
+                if decoded:
+                    date_hints = self._apply_mrz(result, decoded, sources)
+            except ParseBudgetExceeded as e:
+                logger.warning(f"Parse stopped after {e.elapsed * 1000:.0f} ms in {e.pattern} "
+                               f"({len(text)} characters); keeping the fields found so far")
+                result['parse_aborted'] = e.pattern
+                sources.update({field: 'label' for field in PASSPORT_FIELDS if result.get(field) and field not in sources})
             
-            # Extract each field using regex patterns
-            for field, patterns in self.patterns.items():
-                value = self._extract_field(cleaned_text, patterns)
-                result[field] = value
-                logger.debug(f"Extracted {field}: {value}")
+            # Values read from word boxes already have their words' confidence
+            text_sources = {field: source for field, source in sources.items() if source != 'layout'}
+            if words is None and layout and text_sources:
+                words = layout.words()
+            ocr_confidence = self._ocr_confidences(result, text_sources, words) if words else {}
+            ocr_confidence.update(layout_confidence)
             
             # Post-process and validate extracted data
-            result = self._post_process_data(result)
+            country = decoded['issuing_state'] if decoded else result.get('nationality')
+            day_first = self._day_first(printed_dates, date_hints, country)
+            result = self._post_process_data(result, day_first=day_first, date_hints=date_hints)
+            result['confidence'] = self._field_confidences(result, sources, ocr_confidence)
             
             return result
             
@@ -119,32 +245,196 @@ class PassportParser:
             logger.error(f"Error parsing passport text: {str(e)}")
             return {}
     
-    def _clean_text(self, text):
-        """Clean and normalize the extracted text"""
-        # Remove extra whitespace and normalize line breaks
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n+', '\n', text)
+    def _checkpoint(self, pattern):
+        """Raise ParseBudgetExceeded once the parse has run past its budget"""
+        if self.time_budget and self._started is not None:
+            elapsed = time.perf_counter() - self._started
+            if elapsed > self.time_budget:
+                raise ParseBudgetExceeded(pattern, elapsed)
+    
+    def _extract_layout_fields(self, layout, result):
+        """Resolve labelled fields into ``result`` from OCR word boxes.
+        
+        A value is the words right of its label in the label's row, up to the
+        next label, or else the words in the label's column on the nearest row
+        below (labels sharing a row split it into columns halfway between them).
+        Returns the mean OCR confidence (0-1) of the words each value was read from.
+        """
+        rows = layout.rows()
+        
+        # One LABEL_RE pass over every row's lines; word start offsets map matches back to words
+        order = []
+        starts = []
+        row_of = []
+        position = 0
+        for number, (_, _, _, lines) in enumerate(rows):
+            for line in lines:
+                for i in line:
+                    order.append(i)
+                    starts.append(position)
+                    row_of.append(number)
+                    position += len(layout.text[i]) + 1
+        text = '\n'.join(' '.join(layout.text[i] for i in line) for _, _, _, lines in rows for line in lines)
+        
+        by_row = {}  # row number -> [(field, box), ...]
+        label_words = set()
+        for match in LABEL_RE.finditer(text.translate(_ASCII_LOWER)):
+            first = bisect_right(starts, match.start()) - 1
+            indices = order[first:bisect_right(starts, match.end() - 1)]
+            label_words.update(indices)
+            by_row.setdefault(row_of[first], []).append(
+                (LABEL_FIELDS[' '.join(match.group().split())], layout.box(indices)))
+        self._checkpoint('LABEL_RE')
+        
+        confidence = {}
+        full_name = None
+        for number, labels in by_row.items():
+            labels.sort(key=lambda label: label[1][0])
+            page = rows[number][0]
+            row_words = [i for line in rows[number][3] for i in line if i not in label_words]
+            for position, (field, (left, top, right, bottom)) in enumerate(labels):
+                if field != 'full_name' and result.get(field):
+                    continue
+                height = max(bottom - top, 1)
+                previous = labels[position - 1][1] if position else None
+                following = labels[position + 1][1] if position + 1 < len(labels) else None
+                next_label = following[0] if following else float('inf')
+                
+                # Same row, right of the label
+                chosen = [i for i in row_words if right - height / 2 <= layout.left[i] < next_label]
+                value = self._match_value(field, self._layout_text(layout, chosen))
+                
+                if not value:
+                    # The nearest row below with words in the label's column
+                    column_left = (previous[2] + left) / 2 if previous else left - 2 * height
+                    column_right = (right + following[0]) / 2 if following else float('inf')
+                    for row_page, row_top, _, lines in rows[number + 1:]:
+                        if row_page != page or row_top - bottom > LAYOUT_VALUE_GAP * height:
+                            break
+                        chosen = [i for line in lines for i in line if i not in label_words
+                                  and column_left <= layout.left[i] + layout.width[i] / 2 < column_right]
+                        if chosen:
+                            value = self._match_value(field, self._layout_text(layout, chosen))
+                            break
+                
+                if not value:
+                    continue
+                if field == 'full_name':
+                    full_name = full_name or value
+                else:
+                    result[field] = value
+                    confidence[field] = sum(layout.conf[i] for i in chosen) / len(chosen) / 100.0
+        
+        if full_name and not (result['surname'] or result['given_names']):
+            parts = full_name.split(' ', 1)
+            result['surname'] = parts[0]
+            result['given_names'] = parts[1] if len(parts) > 1 else None
+        return confidence
+    
+    @staticmethod
+    def _layout_text(layout, indices):
+        text = ' '.join(layout.text[i] for i in sorted(indices, key=layout.left.__getitem__))
+        return text.strip(_SEPARATORS)[:MAX_VALUE_SPAN]
+    
+    def _extract_labelled_fields(self, text, result):
+        """Resolve every labelled field into ``result`` from a single pass of LABEL_RE over the text"""
+        by_line = {}  # line number -> [(field, label start, label end), ...] in text order
+        line = 0
+        position = 0
+        for match in LABEL_RE.finditer(text.translate(_ASCII_LOWER)):
+            start = match.start()
+            line += text.count('\n', position, start)
+            position = start
+            by_line.setdefault(line, []).append((LABEL_FIELDS[' '.join(match.group().split())], start, match.end()))
+        self._checkpoint('LABEL_RE')
         
-        # Fix common OCR errors for specific contexts
-        # Don't replace numbers in passport numbers, dates, etc.
-        # text = text.replace('0', 'O').replace('1', 'I')  # Disabled to preserve numbers
+        lines = text.split('\n')
+        full_name = None
         
-        return text.strip()
+        for line_no, header in by_line.items():
+            columns = None  # the next line split into len(header) columns, when a value is read from it
+            for column, (field, start, end) in enumerate(header):
+                if field != 'full_name' and result.get(field):
+                    continue
+                
+                # Same-line value: up to the next label on this line or the end of the line
+                if column + 1 < len(header):
+                    span_end = header[column + 1][1]
+                else:
+                    span_end = text.find('\n', end)
+                    span_end = span_end if span_end != -1 else len(text)
+                span = text[end:min(span_end, end + MAX_VALUE_SPAN)].strip(_SEPARATORS)
+                
+                if not span and line_no + 1 < len(lines):
+                    # Label-above-value layout; several labels on one line share the next line by column
+                    if columns is None:
+                        columns = self._columns(lines[line_no + 1], len(header))
+                    span = columns[column][:MAX_VALUE_SPAN] if column < len(columns) else ''
+                
+                value = self._match_value(field, span)
+                if not value:
+                    continue
+                if field == 'full_name':
+                    full_name = full_name or value
+                else:
+                    result[field] = value
+        
+        if full_name and not (result['surname'] or result['given_names']):
+            # "Name: SURNAME GIVEN NAMES"
+            parts = full_name.split(' ', 1)
+            result['surname'] = parts[0]
+            result['given_names'] = parts[1] if len(parts) > 1 else None
+        
+        return result
     
-    def _extract_field(self, text, patterns):
-        """Extract a field using multiple regex patterns"""
-        for pattern in patterns:
-            try:
-                match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    value = match.group(1).strip()
-                    if value and len(value) > 1:  # Basic validation
-                        return self._clean_field_value(value)
-            except Exception as e:
-                logger.warning(f"Error with pattern {pattern}: {str(e)}")
+    @staticmethod
+    def _columns(line, count):
+        """The count values printed under a shared header line"""
+        line = line.strip()
+        if count <= 1:
+            return [line]
+        columns = [part for part in re.split(r'\s{2,}|\t', line) if part]
+        if len(columns) != count:
+            # Single-spaced OCR output: one word per column, the rest goes to the last one
+            words = line.split()
+            columns = words[:count - 1] + [' '.join(words[count - 1:])]
+        return columns
+    
+    def _match_value(self, field, span):
+        if not span:
+            return None
+        match = FIELD_VALUES[field].search(span)
+        self._checkpoint(f'FIELD_VALUES[{field}]')
+        if not match:
+            return None
+        value = match.group(0).strip(_SEPARATORS + ',')
+        if field == 'sex':
+            return value[0].upper()
+        return self._clean_field_value(value) if len(value) > 1 else None
+    
+    def _extract_fallbacks(self, text, fields):
+        """First unlabelled, word-aligned occurrence of each of the given fields"""
+        lowered = text.translate(_ASCII_LOWER)
+        found = {}
+        for field in fields:
+            pattern = FALLBACK_PATTERNS[field]
+            match = pattern.search(lowered)
+            while match:
+                start = match.start()
+                if field == 'sex' and lowered[start - 2:start] == 'fe':
+                    start -= 2
+                if start == 0 or not lowered[start - 1].isalnum():
+                    break
+                match = pattern.search(lowered, match.start() + 1)
+            self._checkpoint(f'FALLBACK_PATTERNS[{field}]')
+            if not match:
                 continue
-        
-        return None
+            
+            if field == 'sex':
+                found[field] = 'F' if start < match.start() else 'M'
+            else:
+                found[field] = self._clean_field_value(text[start:match.end()])
+        return found
     
     def _clean_field_value(self, value):
         """Clean individual field values"""
@@ -155,8 +445,86 @@ class PassportParser:
         
         return value if value else None
     
-    def _post_process_data(self, data):
-        """Post-process and validate extracted data"""
+    def _apply_mrz(self, result, decoded, sources=None):
+        """Merge decoded MRZ fields into the result and record their check-digit validity"""
+        mrz_fields = passport_fields(decoded)
+        verified = verified_fields(decoded)
+        logger.debug(f"MRZ {decoded['format']} fields: {mrz_fields} (valid: {decoded['valid']})")
+        
+        for field, value in mrz_fields.items():
+            # A check-digit field that failed its check only fills a gap
+            if field in verified or field not in MRZ_CHECKED_FIELDS or not result.get(field):
+                result[field] = value
+                if sources is not None:
+                    sources[field] = 'mrz_verified' if field in verified else 'mrz'
+        
+        result['mrz'] = {
+            'format': decoded['format'],
+            'valid': decoded['valid'],
+            'checks': decoded['checks'],
+            'verified_fields': sorted(verified),
+        }
+        
+        # MRZ dates disambiguate printed dates that were kept over them
+        return {field: parse_date(mrz_fields[field]) for field in ('date_of_birth', 'date_of_expiry')
+                if field in mrz_fields}
+    
+    @staticmethod
+    def _day_first(printed_dates, date_hints, country):
+        """Numeric date order of this document, from the first evidence available: a printed date
+        matching its MRZ date in only one reading, a printed date with a part above 12, or the
+        issuing country's convention"""
+        for field, hint in date_hints.items():
+            readings = candidates(printed_dates.get(field))
+            if len(readings) == 2 and hint in readings:
+                return readings.index(hint) == 0
+        for value in printed_dates.values():
+            order = numeric_order(value)
+            if order is not None:
+                return order
+        return not month_first(country)
+    
+    @staticmethod
+    def _ocr_confidences(result, sources, words):
+        """Mean tesseract confidence (0-1) of the OCR words making up each free-text value"""
+        word_conf = {}
+        for word, conf in words:
+            for token in _TOKEN.findall(word.upper()):
+                word_conf[token] = max(conf, word_conf.get(token, 0.0))
+        
+        confidences = {}
+        for field, source in sources.items():
+            if source == 'mrz_verified' or not result.get(field):
+                continue
+            found = [word_conf[token] for token in _TOKEN.findall(str(result[field]).upper()) if token in word_conf]
+            if found:
+                confidences[field] = sum(found) / len(found) / 100.0
+        return confidences
+    
+    @staticmethod
+    def _field_confidences(result, sources, ocr_confidence):
+        """Confidence (0-1) per field: source, scaled by OCR word confidence and format validity"""
+        confidence = {}
+        for field in PASSPORT_FIELDS:
+            value = result.get(field)
+            if not value:
+                confidence[field] = 0.0
+                continue
+            score = SOURCE_CONFIDENCE[sources.get(field, 'fallback')] * ocr_confidence.get(field, 1.0)
+            pattern = FIELD_FORMATS.get(field)
+            if pattern and not pattern.match(str(value)):
+                score *= 0.5
+            confidence[field] = round(score, 2)
+        return confidence
+    
+    def _post_process_data(self, data, day_first=True, date_hints=None):
+        """Post-process and validate extracted data.
+        
+        ``day_first`` is the issuing country's numeric date order and
+        ``date_hints`` maps date fields to the same date read elsewhere (the MRZ);
+        both only decide between readings of an ambiguous date like 05/03/2030.
+        """
+        date_hints = date_hints or {}
         # Clean names
         if data.get('surname'):
             data['surname'] = self._clean_name(data['surname'])
@@ -167,11 +535,19 @@ class PassportParser:
         # Standardize dates
         for date_field in ['date_of_birth', 'date_of_issue', 'date_of_expiry']:
             if data.get(date_field):
-                data[date_field] = self._standardize_date(data[date_field])
+                data[date_field] = self._standardize_date(data[date_field], day_first, date_hints.get(date_field),
+                                                          future=date_field == 'date_of_expiry')
+        
+        # An expiry on or before the birth or issue date is a misread (often the birth date itself)
+        if not expiry_after(data.get('date_of_expiry'), data.get('date_of_birth'), data.get('date_of_issue')):
+            logger.debug(f"Dropped date of expiry {data['date_of_expiry']}: not after birth/issue date")
+            data['date_of_expiry'] = None
         
-        # Clean nationality
+        # Clean nationality; the code is what records are grouped and deduplicated by
+        data['nationality_code'] = nationality_code(data['nationality']) if data.get('nationality') else None
         if data.get('nationality'):
-            data['nationality'] = self._clean_nationality(data['nationality'])
+            verified = 'nationality' in ((data.get('mrz') or {}).get('verified_fields') or [])
+            data['nationality'] = self._clean_nationality(data['nationality'], verified=verified)
         
         # Validate sex
         if data.get('sex'):
@@ -193,60 +569,25 @@ class PassportParser:
         
         return name.strip() if name.strip() else None
     
-    def _standardize_date(self, date_str):
-        """Standardize date format"""
+    def _standardize_date(self, date_str, day_first=True, hint=None, future=False):
+        """Standardize a date to DD/MM/YYYY (returned unchanged if it is not a date)"""
         if not date_str:
             return None
         
-        # Try different date formats
-        formats = ['%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y', '%Y-%m-%d', '%Y/%m/%d']
-        
-        for fmt in formats:
-            try:
-                parsed_date = datetime.strptime(date_str, fmt)
-                return parsed_date.strftime('%d/%m/%Y')
-            except ValueError:
-                continue
-        
-        # If it's 6 digits (YYMMDD format common in MRZ)
-        if len(date_str) == 6 and date_str.isdigit():
-            try:
-                year = int(date_str[:2])
-                # Assume 20xx for years 00-30, 19xx for years 31-99
-                year = 2000 + year if year <= 30 else 1900 + year
-                month = int(date_str[2:4])
-                day = int(date_str[4:6])
-                
-                parsed_date = datetime(year, month, day)
-                return parsed_date.strftime('%d/%m/%Y')
-            except ValueError:
-                pass
-        
-        return date_str  # Return original if cannot parse
+        parsed = parse_date(date_str, day_first=day_first, hint=hint, future=future)
+        return format_date(parsed) if parsed else date_str
     
-    def _clean_nationality(self, nationality):
-        """Clean nationality field"""
+    def _clean_nationality(self, nationality, verified=False):
+        """Canonical country name for a nationality, demonym or code.
+        
+        Unresolvable free text is a misread value or a neighbouring label and
+        becomes None. A code from a checksum-valid MRZ (``verified``) is kept
+        as printed even when the index doesn't know it (e.g. the specimen UTO).
+        """
         if not nationality:
             return None
         
-        # Common nationality codes and their full names
-        country_codes = {
-            'USA': 'United States',
-            'GBR': 'United Kingdom', 
-            'CAN': 'Canada',
-            'AUS': 'Australia',
-            'DEU': 'Germany',
-            'FRA': 'France',
-            'IND': 'India',
-            'CHN': 'China',
-            'JPN': 'Japan',
-            'RUS': 'Russia'
-        }
-        
-        nationality = nationality.strip().upper()
-        
-        # If it's a 3-letter code, try to expand it
-        if len(nationality) == 3 and nationality in country_codes:
-            return country_codes[nationality]
-        
-        return nationality.title()
+        code = nationality_code(nationality)
+        if code:
+            return country_name(code)
+        return nationality if verified and re.fullmatch(r'[A-Z]{3}', nationality) else None
@@ -0,0 +1,109 @@
+import time
+import json
+import logging
+from contextlib import contextmanager
+from models import PassportRecord
+from ocr_executor import ocr_executor
+from passport_parser import PassportParser
+from openai_automation import OpenAIAutomation
+from ai_policy import ai_policy
+from ai_breaker import AIUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Passport fields copied from parser output onto a PassportRecord
+RECORD_FIELDS = [
+    'passport_number', 'surname', 'given_names', 'nationality', 'date_of_birth',
+    'place_of_birth', 'sex', 'date_of_issue', 'date_of_expiry', 'issuing_authority',
+    'emergency_contact', 'phone_number', 'previous_passport'
+]
+
+
+class StageTimer:
+    """Collects wall-clock durations for each named pipeline stage"""
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_stage:
+            self.on_stage(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+
+
+def extract_passport_data(filepath, timer=None, ai_enhance=True):
+    """Run OCR, regex parsing and optional AI enhancement on a saved upload.
+
+    Returns a tuple of (ocr_result, passport_data, ai_enhanced).
+    """
+    timer = timer or StageTimer()
+
+    with timer.stage('ocr'):
+        ocr_result = ocr_executor.extract_file(filepath)
+
+    passport_data, ai_enhanced = parse_passport_data(ocr_result['text'], timer, ai_enhance=ai_enhance,
+                                                     words=ocr_result.get('words'), layout=ocr_result.get('layout'))
+    return ocr_result, passport_data, ai_enhanced
+
+
+def parse_passport_data(raw_text, timer=None, ai_enhance=True, words=None, layout=None):
+    """Parse OCR text and optionally enhance it with OpenAI.
+
+    Only low-confidence or missing required fields are sent to the AI, and the
+    call is skipped when there are none (see ai_policy). ``words`` are the OCR
+    word confidences used for field confidence and ``layout`` the OCR word
+    boxes labelled values are located by.
+
+    Returns a tuple of (passport_data, ai_enhanced).
+    """
+    timer = timer or StageTimer()
+
+    if not raw_text:
+        raise ValueError('Failed to extract text from the document')
+
+    with timer.stage('parse'):
+        passport_data = PassportParser().parse_passport_text(raw_text, words, layout)
+
+    ai_enhanced = False
+    ai_automation = OpenAIAutomation() if ai_enhance else None
+    fields = []
+    if ai_automation and ai_automation.enabled:
+        fields = ai_policy.fields_to_enhance(passport_data)
+        ai_policy.record(passport_data, fields)
+        if not fields:
+            logger.info("Passport fields confident enough, skipping AI enhancement")
+
+    if fields:
+        with timer.stage('ai_enhance'):
+            try:
+                enhanced_data = ai_automation.enhance_passport_extraction(raw_text, passport_data, fields)
+                ai_policy.record_call(fields, 'made')
+                # AI suggestions never override MRZ fields backed by a passing check digit
+                verified = set((passport_data.get('mrz') or {}).get('verified_fields', []))
+                for field in fields:
+                    if field in enhanced_data and field not in verified:
+                        passport_data[field] = enhanced_data[field]
+                ai_enhanced = True
+            except AIUnavailable as e:
+                ai_policy.record_call(fields, 'short_circuited')
+                logger.info(f"AI enhancement skipped: {str(e)}")
+            except Exception as e:
+                ai_policy.record_call(fields, 'failed')
+                logger.warning(f"AI enhancement failed: {str(e)}")
+
+    return passport_data, ai_enhanced
+
+
+def build_passport_record(filename, raw_text, passport_data, layout=None, quality=None):
+    """Create an unsaved PassportRecord from parsed passport data, keeping the OCR word boxes and image metrics"""
+    record = PassportRecord(filename=filename, raw_text=raw_text, word_boxes=layout.to_bytes() if layout else None,
+                            image_quality=json.dumps(quality) if quality else None)
+    for field in RECORD_FIELDS:
+        setattr(record, field, passport_data.get(field))
+    return record
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Re-run PassportParser over the raw_text (and OCR word boxes, when stored) of existing PassportRecords.
+
+Records are read in primary-key pages, parsed in parallel worker processes
+and changed fields are written back in batched transactions. Only fields
+the parser now reads differently are touched, and a field is never blanked.
+A new expiry date that is not after the record's birth and issue dates is
+ignored.
+
+    python reparse_records.py --dry-run --report changes.csv
+    python reparse_records.py --since 2025-01-01 --fields date_of_issue date_of_expiry
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+
+from passport_parser import PassportParser, PASSPORT_FIELDS, expiry_after
+from word_layout import WordLayout
+
+_parser = None
+
+
+def _init_worker():
+    # Per-record debug lines from the parser would dominate a bulk run
+    logging.getLogger('passport_parser').setLevel(logging.WARNING)
+
+
+def parse_chunk(rows, fields, only_empty):
+    """Worker: re-parse (id, raw_text, word_boxes, current values) rows and return only the changes.
+
+    Returns [(record_id, {field: (old, new)}, parsed), ...].
+    """
+    global _parser
+    _parser = _parser or PassportParser()
+
+    changes = []
+    for record_id, raw_text, word_boxes, current in rows:
+        parsed = _parser.parse_passport_text(raw_text or '', layout=WordLayout.from_bytes(word_boxes))
+        diff = {}
+        for field in fields:
+            old, new = current.get(field), parsed.get(field)
+            if not new or new == old or (only_empty and old):
+                continue
+            diff[field] = (old, new)
+        if 'date_of_expiry' in diff:
+            # The parser only compares against the dates it read; the record's own dates count too
+            birth, issue = (diff[field][1] if field in diff else current.get(field)
+                            for field in ('date_of_birth', 'date_of_issue'))
+            if not expiry_after(diff['date_of_expiry'][1], birth, issue):
+                parsed['date_of_expiry'] = diff.pop('date_of_expiry')[0]
+        if diff:
+            parsed.pop('confidence', None)
+            changes.append((record_id, diff, parsed))
+    return changes
+
+
+class Reparser:
+    """Streams records through a process pool and applies the changed fields in batches"""
+
+    def __init__(self, fields, workers=None, page_size=500, batch_size=1000, dry_run=False, only_empty=False):
+        self.fields = fields
+        self.workers = workers or os.cpu_count() or 1
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.only_empty = only_empty
+        self.stats = {'examined': 0, 'changed_records': 0, 'changed_fields': {field: 0 for field in fields}}
+
+    def run(self, query, on_change=None):
+        """Re-parse every record matched by ``query`` (a PassportRecord query); returns stats"""
+        in_flight = set()
+        pending = []
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            for page in self._pages(query):
+                self.stats['examined'] += len(page)
+                # Bounded in-flight pages keep memory flat however many records there are
+                if len(in_flight) >= self.workers * 2:
+                    in_flight = self._collect(in_flight, pending, on_change, FIRST_COMPLETED)
+                in_flight.add(pool.submit(parse_chunk, page, self.fields, self.only_empty))
+                if len(pending) >= self.batch_size:
+                    self._apply(pending)
+            self._collect(in_flight, pending, on_change, ALL_COMPLETED)
+
+        self._apply(pending)
+        return self.stats
+
+    def _pages(self, query):
+        """Keyset pagination on the primary key: each page is an index range scan, and
+        writes can be committed between pages without invalidating an open cursor"""
+        from models import PassportRecord
+
+        # Birth and issue dates are always read, to check new expiry dates against
+        read = list(self.fields) + [field for field in ('date_of_birth', 'date_of_issue') if field not in self.fields]
+        columns = [getattr(PassportRecord, field) for field in read]
+        last_id = 0
+        while True:
+            rows = query.with_entities(PassportRecord.id, PassportRecord.raw_text, PassportRecord.word_boxes, *columns) \
+                .filter(PassportRecord.id > last_id) \
+                .order_by(PassportRecord.id) \
+                .limit(self.page_size) \
+                .all()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [(row[0], row[1], row[2], dict(zip(read, row[3:]))) for row in rows]
+
+    def _collect(self, in_flight, pending, on_change, return_when):
+        done, still_running = wait(in_flight, return_when=return_when)
+        for future in done:
+            for record_id, diff, parsed in future.result():
+                self.stats['changed_records'] += 1
+                for field in diff:
+                    self.stats['changed_fields'][field] += 1
+                if on_change:
+                    on_change(record_id, diff)
+                pending.append((record_id, diff, parsed))
+        return still_running
+
+    def _apply(self, pending):
+        """Write one batch of changes in a single transaction (nothing in dry-run mode)"""
+        if not pending:
+            return
+        from sqlalchemy import update
+        from app import db
+        from models import PassportRecord, OCRCacheEntry, derived_columns
+
+        if not self.dry_run:
+            rows = []
+            for record_id, diff, _ in pending:
+                row = {'id': record_id}
+                for field, (_, new) in diff.items():
+                    row[field] = new
+                    # Bulk UPDATE bypasses the model's @validates hook, so keep the derived columns in step here
+                    row.update(derived_columns(field, new))
+                rows.append(row)
+            db.session.execute(update(PassportRecord), rows)
+
+            # Cached parses of these uploads would otherwise bring the old values back
+            parsed_by_record = {record_id: parsed for record_id, _, parsed in pending}
+            for entry in OCRCacheEntry.query.filter(OCRCacheEntry.passport_record_id.in_(parsed_by_record)).all():
+                entry.parsed_data = json.dumps(parsed_by_record[entry.passport_record_id])
+            db.session.commit()
+        pending.clear()
+
+
+def build_query(args):
+    from models import PassportRecord
+
+    query = PassportRecord.query.filter(PassportRecord.raw_text.isnot(None))
+    if args.ids:
+        query = query.filter(PassportRecord.id.in_(args.ids))
+    if args.since:
+        query = query.filter(PassportRecord.created_at >= datetime.strptime(args.since, '%Y-%m-%d'))
+    if args.missing:
+        query = query.filter((getattr(PassportRecord, args.missing).is_(None)) | (getattr(PassportRecord, args.missing) == ''))
+    return query
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fields', nargs='+', default=PASSPORT_FIELDS, choices=PASSPORT_FIELDS,
+                        help='fields to re-parse (default: all)')
+    parser.add_argument('--ids', nargs='+', type=int, help='only these record ids')
+    parser.add_argument('--since', help='only records created on or after YYYY-MM-DD')
+    parser.add_argument('--missing', choices=PASSPORT_FIELDS, help='only records where this field is empty')
+    parser.add_argument('--only-empty', action='store_true', help='fill empty fields, never change existing values')
+    parser.add_argument('--workers', type=int, default=0, help='parser processes (default: one per core)')
+    parser.add_argument('--page-size', type=int, default=500, help='records read and parsed per work item')
+    parser.add_argument('--batch-size', type=int, default=1000, help='changed records written per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='report changes without writing them')
+    parser.add_argument('--report', help='write every change to this CSV file (id, field, old, new)')
+    parser.add_argument('--show', type=int, default=20, help='changes to print (dry run)')
+    args = parser.parse_args()
+
+    from app import app
+
+    report_file = open(args.report, 'w', newline='') if args.report else None
+    report = csv.writer(report_file) if report_file else None
+    if report:
+        report.writerow(['record_id', 'field', 'old', 'new'])
+    shown = [0]
+
+    def on_change(record_id, diff):
+        for field, (old, new) in diff.items():
+            if report:
+                report.writerow([record_id, field, old, new])
+            if args.dry_run and shown[0] < args.show:
+                print(f"#{record_id} {field}: {old!r} -> {new!r}")
+                shown[0] += 1
+
+    started = time.perf_counter()
+    with app.app_context():
+        reparser = Reparser(args.fields, workers=args.workers, page_size=args.page_size,
+                            batch_size=args.batch_size, dry_run=args.dry_run, only_empty=args.only_empty)
+        stats = reparser.run(build_query(args), on_change)
+    elapsed = time.perf_counter() - started
+
+    if report_file:
+        report_file.close()
+
+    verb = 'would change' if args.dry_run else 'changed'
+    print(f"Examined {stats['examined']} records in {elapsed:.1f}s "
+          f"({stats['examined'] / elapsed if elapsed else 0:.0f}/s); {verb} {stats['changed_records']}")
+    for field, count in stats['changed_fields'].items():
+        if count:
+            print(f"  {field:<18}{count:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
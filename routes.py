@@ -1,15 +1,23 @@
 import os
 from flask import render_template, request, flash, redirect, url_for, jsonify, send_file, make_response
 import json
-from datetime import datetime
+from datetime import datetime, date
 from werkzeug.utils import secure_filename
 from app import app, db
-from models import PassportRecord
+from models import PassportRecord, ProcessingJob, ProcessingBatch, OCRCacheEntry, ExpiryAlert, AIBulkJob
 from models_hr import Employee, LeaveRequest, HRQuery, JobOffer
-from ocr_processor import OCRProcessor
-from passport_parser import PassportParser
 from openai_automation import OpenAIAutomation
 from hr_automation import HRAutomation
+from job_queue import job_queue
+from batch_intake import BatchIntake, batch_status
+from ocr_cache import ocr_cache
+from ai_policy import ai_policy
+from openai_client import openai_client
+from ai_cache import ai_cache
+from ai_usage import ai_usage
+from ai_breaker import ai_breaker, AIUnavailable
+from expiry_watch import expiry_watch
+import bulk_ai
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
@@ -18,6 +26,10 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def wants_json():
+    """True when the client prefers a JSON response over an HTML redirect"""
+    return request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'application/json'
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -25,7 +37,7 @@ def index():
 @app.route('/records')
 def records():
     records = PassportRecord.query.order_by(PassportRecord.created_at.desc()).all()
-    return render_template('records.html', records=records)
+    return render_template('records.html', records=records, today=date.today())
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -50,58 +62,35 @@ def upload_file():
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
             file.save(filepath)
             
-            # Process the file with OCR
-            ocr_processor = OCRProcessor()
-            raw_text = ocr_processor.process_file(filepath)
-            
-            if not raw_text:
-                flash('Failed to extract text from the document', 'error')
-                return redirect(url_for('index'))
-            
-            # Parse passport data
-            parser = PassportParser()
-            passport_data = parser.parse_passport_text(raw_text)
-            
-            # Enhance with OpenAI if available
-            ai_automation = OpenAIAutomation()
-            if ai_automation.enabled:
-                try:
-                    enhanced_data = ai_automation.enhance_passport_extraction(raw_text, passport_data)
-                    passport_data.update(enhanced_data)
-                    flash('AI enhanced data extraction completed!', 'info')
-                except Exception as e:
-                    app.logger.warning(f"AI enhancement failed: {str(e)}")
-            
-            # Create database record
-            record = PassportRecord(
-                filename=filename,
-                passport_number=passport_data.get('passport_number'),
-                surname=passport_data.get('surname'),
-                given_names=passport_data.get('given_names'),
-                nationality=passport_data.get('nationality'),
-                date_of_birth=passport_data.get('date_of_birth'),
-                place_of_birth=passport_data.get('place_of_birth'),
-                sex=passport_data.get('sex'),
-                date_of_issue=passport_data.get('date_of_issue'),
-                date_of_expiry=passport_data.get('date_of_expiry'),
-                issuing_authority=passport_data.get('issuing_authority'),
-                emergency_contact=passport_data.get('emergency_contact'),
-                phone_number=passport_data.get('phone_number'),
-                previous_passport=passport_data.get('previous_passport'),
-                raw_text=raw_text
-            )
+            # Identical bytes already processed: report the existing record immediately
+            file_hash = ocr_cache.hash_file(filepath)
+            existing = ocr_cache.existing_record(ocr_cache.get(file_hash))
+            if existing:
+                os.remove(filepath)
+                if wants_json():
+                    return jsonify({
+                        'duplicate': True,
+                        'passport_record_id': existing.id,
+                        'message': f'Already processed as record #{existing.id}'
+                    })
+                flash(f'This document was already processed as record #{existing.id}.', 'info')
+                return redirect(url_for('edit_record', record_id=existing.id))
             
-            db.session.add(record)
-            db.session.commit()
+            # Hand the OCR/parse/AI pipeline to the background job queue
+            job = job_queue.enqueue(filename, filepath, file_hash=file_hash)
             
-            # Clean up uploaded file
-            os.remove(filepath)
+            if wants_json():
+                return jsonify({
+                    'job_id': job.id,
+                    'status': job.status,
+                    'status_url': url_for('job_status', job_id=job.id)
+                }), 202
             
-            flash('Passport processed successfully!', 'success')
+            flash(f'Passport queued for processing (job #{job.id}). It will appear in the records list shortly.', 'info')
             return redirect(url_for('records'))
             
         except Exception as e:
-            app.logger.error(f"Error processing file: {str(e)}")
+            app.logger.error(f"Error queuing file: {str(e)}")
             flash(f'Error processing file: {str(e)}', 'error')
             # Clean up file if it exists
             if 'filepath' in locals() and os.path.exists(filepath):
@@ -111,6 +100,99 @@ def upload_file():
         flash('Invalid file type. Please upload PNG, JPG, JPEG, or PDF files only.', 'error')
         return redirect(url_for('index'))
 
+@app.route('/upload_batch', methods=['POST'])
+def upload_batch():
+    """Batch intake of many passport scans and/or ZIP archives, queued as one OCR job per document"""
+    # Batches legitimately exceed the single-upload limit
+    request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+    
+    uploads = [f for f in request.files.getlist('files') if f and f.filename]
+    if not uploads:
+        if wants_json():
+            return jsonify({'error': 'No files selected'}), 400
+        flash('No files selected', 'error')
+        return redirect(url_for('index'))
+    
+    try:
+        batch = BatchIntake(ai_enhance=bool(request.form.get('ai_enhance'))).run(uploads)
+    except Exception as e:
+        app.logger.error(f"Batch upload failed: {str(e)}")
+        if wants_json():
+            return jsonify({'error': str(e)}), 500
+        flash(f'Batch upload failed: {str(e)}', 'error')
+        return redirect(url_for('index'))
+    
+    if wants_json():
+        return jsonify(dict(batch_status(batch), status_url=url_for('batch_status_api', batch_id=batch.id))), 202
+    
+    flash(f'Batch #{batch.id} queued for processing.', 'info')
+    return redirect(url_for('batch_status_page', batch_id=batch.id))
+
+@app.route('/batches/<int:batch_id>')
+def batch_status_page(batch_id):
+    """Batch progress page; polls /api/batches/<id> until every job has finished"""
+    batch = ProcessingBatch.query.get_or_404(batch_id)
+    return render_template('batch_status.html', status=batch_status(batch))
+
+@app.route('/api/batches/<int:batch_id>')
+def batch_status_api(batch_id):
+    """API endpoint reporting the state of every document in a batch upload"""
+    batch = ProcessingBatch.query.get_or_404(batch_id)
+    return jsonify(batch_status(batch))
+
+@app.route('/api/jobs/<int:job_id>')
+def job_status(job_id):
+    """API endpoint reporting the state of a queued OCR job"""
+    job = ProcessingJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+@app.route('/api/ai/metrics')
+def ai_metrics():
+    """How many AI enhancement calls the confidence policy made and avoided, OpenAI client, response cache and circuit breaker stats (this process)"""
+    return jsonify(dict(ai_policy.snapshot(), client=openai_client.snapshot(), cache=ai_cache.snapshot(),
+                        breaker=ai_breaker.snapshot()))
+
+@app.route('/api/ai/usage')
+def ai_usage_summary():
+    """Tokens, latency, cost and outcomes of AI calls by feature: this process, and every worker over ``?hours=`` (24)"""
+    hours = request.args.get('hours', 24, type=float)
+    return jsonify({'process': ai_usage.snapshot(), 'log': ai_usage.summarise_log(hours)})
+
+@app.route('/api/ai/bulk', methods=['POST'])
+def start_bulk_ai():
+    """Queue a bulk AI validation or enhancement run; poll /api/ai/bulk/<id> for progress.
+
+    JSON body: {"mode": "validate"|"enhance", "filters": {ids, since, until,
+    missing, unvalidated}, "options": {records_per_prompt, max_prompt_chars,
+    workers, requests_per_minute, batch_size, dry_run, only_empty, fresh}}
+    """
+    payload = request.get_json(silent=True) or {}
+    mode = payload.get('mode')
+    filters = payload.get('filters') or {}
+    options = payload.get('options') or {}
+    if mode not in bulk_ai.MODES:
+        return jsonify({'error': f"mode must be one of {', '.join(bulk_ai.MODES)}"}), 400
+    if not OpenAIAutomation().enabled:
+        return jsonify({'error': 'Bulk AI requires OpenAI API key'}), 503
+    try:
+        # Fail on bad filters or options now rather than in the background thread
+        bulk_ai.build_query(filters)
+        bulk_ai.BulkAIRunner(mode, **options)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    job = AIBulkJob(mode=mode, filters=json.dumps(filters), options=json.dumps(options))
+    db.session.add(job)
+    db.session.commit()
+    bulk_ai.start_job(app, job.id)
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/ai/bulk/<int:job_id>')
+def bulk_ai_status(job_id):
+    """Progress of a bulk AI run"""
+    job = AIBulkJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
 @app.route('/edit_record/<int:record_id>', methods=['GET', 'POST'])
 def edit_record(record_id):
     record = PassportRecord.query.get_or_404(record_id)
@@ -144,6 +226,12 @@ def edit_record(record_id):
 @app.route('/delete_record/<int:record_id>', methods=['POST'])
 def delete_record(record_id):
     record = PassportRecord.query.get_or_404(record_id)
+    # Databases created before the foreign keys had ON DELETE SET NULL still reject the delete, so unlink here too
+    for model in (ProcessingJob, OCRCacheEntry):
+        model.query.filter_by(passport_record_id=record_id).update({'passport_record_id': None},
+                                                                   synchronize_session=False)
+    # SQLite does not enforce ON DELETE CASCADE without PRAGMA foreign_keys, so alerts would outlive the record
+    ExpiryAlert.query.filter_by(passport_record_id=record_id).delete(synchronize_session=False)
     db.session.delete(record)
     db.session.commit()
     flash('Record deleted successfully!', 'success')
@@ -151,7 +239,7 @@ def delete_record(record_id):
 
 @app.route('/ai_validate/<int:record_id>')
 def ai_validate_record(record_id):
-    """Use AI to validate passport record data"""
+    """Use AI to validate passport record data (``?fresh=1`` bypasses the AI response cache)"""
     record = PassportRecord.query.get_or_404(record_id)
     
     ai_automation = OpenAIAutomation()
@@ -160,7 +248,11 @@ def ai_validate_record(record_id):
         return redirect(url_for('records'))
     
     try:
-        validation = ai_automation.validate_passport_data(record.to_dict())
+        validation = ai_automation.validate_passport_data(record.to_dict(), fresh=request.args.get('fresh') == '1')
+        
+        record.ai_validation = json.dumps(validation)
+        record.ai_validated_at = datetime.utcnow()
+        db.session.commit()
         
         if validation['valid']:
             flash('AI validation: Data appears correct ✓', 'success')
@@ -172,14 +264,17 @@ def ai_validate_record(record_id):
             suggestions = '; '.join(validation['suggestions'])
             flash(f'AI suggestions: {suggestions}', 'info')
             
+    except AIUnavailable:
+        flash('AI is temporarily unavailable; the record was not validated. Try again shortly.', 'warning')
     except Exception as e:
+        # Nothing is stored, so the record stays in the unvalidated selection
         flash(f'AI validation failed: {str(e)}', 'error')
     
     return redirect(url_for('edit_record', record_id=record_id))
 
 @app.route('/ai_enhance/<int:record_id>')
 def ai_enhance_record(record_id):
-    """Re-process record with AI enhancement"""
+    """Re-process record with AI enhancement (``?fresh=1`` bypasses the AI response cache)"""
     record = PassportRecord.query.get_or_404(record_id)
     
     ai_automation = OpenAIAutomation()
@@ -206,7 +301,8 @@ def ai_enhance_record(record_id):
         }
         
         # Enhance with AI
-        enhanced_data = ai_automation.enhance_passport_extraction(record.raw_text, current_data)
+        enhanced_data = ai_automation.enhance_passport_extraction(record.raw_text, current_data,
+                                                                  fresh=request.args.get('fresh') == '1')
         
         # Update record
         for field, value in enhanced_data.items():
@@ -216,6 +312,8 @@ def ai_enhance_record(record_id):
         db.session.commit()
         flash('Record enhanced with AI analysis ✓', 'success')
         
+    except AIUnavailable:
+        flash('AI is temporarily unavailable; the record was not changed. Try again shortly.', 'warning')
     except Exception as e:
         flash(f'AI enhancement failed: {str(e)}', 'error')
     
@@ -235,8 +333,15 @@ def hr_dashboard():
         recent_records = PassportRecord.query.order_by(PassportRecord.created_at.desc()).limit(20).all()
         recent_leaves = LeaveRequest.query.order_by(LeaveRequest.submitted_at.desc()).limit(10).all()
         recent_queries = HRQuery.query.order_by(HRQuery.submitted_at.desc()).limit(10).all()
+        expiry_summary = expiry_watch.summary()
+        expiring_soon = expiry_watch.expiring_within(expiry_watch.thresholds[-1], limit=10)
+        ai_usage_day = ai_usage.summarise_log(24)
         
         return render_template('hr_dashboard.html',
+                             ai_usage_day=ai_usage_day,
+                             expiry_summary=expiry_summary,
+                             expiring_soon=expiring_soon,
+                             today=date.today(),
                              total_records=total_records,
                              total_employees=total_employees,
                              pending_leaves=pending_leaves,
@@ -247,6 +352,10 @@ def hr_dashboard():
     except Exception as e:
         flash(f'Dashboard error: {str(e)}', 'error')
         return render_template('hr_dashboard.html',
+                             ai_usage_day={'features': {}, 'total': {}},
+                             expiry_summary={},
+                             expiring_soon=[],
+                             today=date.today(),
                              total_records=0,
                              total_employees=0,
                              pending_leaves=0,
@@ -269,6 +378,37 @@ def dashboard_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/passports/expiring')
+def passports_expiring():
+    """Passports expiring within ?days=N (default 90) or between ?start= and ?end= (YYYY-MM-DD)"""
+    try:
+        if request.args.get('start') or request.args.get('end'):
+            start = datetime.strptime(request.args.get('start', date.today().isoformat()), '%Y-%m-%d').date()
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+            records = expiry_watch.expiring_between(start, end)
+        else:
+            records = expiry_watch.expiring_within(int(request.args.get('days', 90)))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Use days=N or start/end as YYYY-MM-DD'}), 400
+    
+    today = date.today()
+    return jsonify({
+        'summary': expiry_watch.summary(today),
+        'records': [{
+            'id': record.id,
+            'name': f"{record.given_names or ''} {record.surname or ''}".strip(),
+            'passport_number': record.passport_number,
+            'expiry_date': record.expiry_date.isoformat(),
+            'days_left': (record.expiry_date - today).days
+        } for record in records]
+    })
+
+@app.route('/api/passports/expiry-alerts')
+def passport_expiry_alerts():
+    """Most recent threshold crossings raised by the daily expiry-watch scan"""
+    alerts = ExpiryAlert.query.order_by(ExpiryAlert.created_at.desc()).limit(request.args.get('limit', 100, type=int)).all()
+    return jsonify([alert.to_dict() for alert in alerts])
+
 @app.route('/export/<data_type>')
 def export_data(data_type):
     """Export data in CSV format"""
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before app is first imported: tests get their own SQLite file, never the instance database
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ['OCR_POOL_ENABLED'] = '0'
+
+# models imports db from app, so app has to be loaded before any test module pulls in models
+import app  # noqa: E402,F401
+
+
+@pytest.fixture
+def app_context():
+    """App context over freshly created, empty tables"""
+    from app import app, db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,133 @@
+import pytest
+
+import ai_breaker as breaker_module
+from ai_breaker import AIUnavailable, CircuitBreaker, is_outage, parse_budgets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    monkeypatch.setenv('AI_BREAKER_MIN_CALLS', '4')
+    monkeypatch.setenv('AI_BREAKER_ERROR_RATE', '0.5')
+    monkeypatch.setenv('AI_BREAKER_COOLDOWN_SECONDS', '30')
+    return CircuitBreaker()
+
+
+def succeed():
+    return 'answer'
+
+
+def fail():
+    raise TimeoutError('deadline exceeded')
+
+
+def run(breaker, fn):
+    try:
+        return breaker.call(fn)
+    except TimeoutError:
+        return None
+
+
+def test_opens_once_enough_recent_calls_fail(breaker):
+    for fn in (succeed, fail, succeed):
+        run(breaker, fn)
+    assert breaker.state == 'closed'
+
+    run(breaker, fail)
+
+    assert breaker.state == 'open'
+    with pytest.raises(AIUnavailable):
+        breaker.call(succeed)
+    assert breaker.snapshot()['short_circuited'] == 1
+
+
+def test_bad_requests_do_not_count_as_outages(breaker):
+    def bad_request():
+        raise ValueError('unparseable answer')
+
+    for _ in range(6):
+        with pytest.raises(ValueError):
+            breaker.call(bad_request)
+    assert breaker.state == 'closed'
+
+
+def test_opens_on_slow_calls(breaker, clock):
+    breaker.p95_seconds = 5
+
+    def slow():
+        clock.now += 8
+        return 'late answer'
+
+    for _ in range(4):
+        breaker.call(slow)
+    assert breaker.state == 'open'
+
+
+def open_breaker(breaker):
+    for _ in range(4):
+        run(breaker, fail)
+    assert breaker.state == 'open'
+
+
+def test_half_open_probe_success_closes(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 31
+
+    assert breaker.call(succeed) == 'answer'
+
+    assert breaker.state == 'closed'
+    assert breaker.snapshot()['probes'] == 1
+
+
+def test_half_open_probe_failure_reopens(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 31
+
+    run(breaker, fail)
+
+    assert breaker.state == 'open'
+    clock.now += 10
+    with pytest.raises(AIUnavailable):
+        breaker.call(succeed)
+
+
+def test_only_one_probe_at_a_time(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 31
+
+    def probe():
+        # A second caller arrives while the probe is in flight
+        with pytest.raises(AIUnavailable):
+            breaker.call(succeed)
+        return 'answer'
+
+    assert breaker.call(probe) == 'answer'
+    assert breaker.state == 'closed'
+
+
+def test_disabled_breaker_never_opens(breaker):
+    breaker.enabled = False
+    for _ in range(6):
+        run(breaker, fail)
+    assert breaker.call(succeed) == 'answer'
+
+
+def test_budgets_and_outage_errors():
+    assert parse_budgets('validate_passport_data=4, process_query_response = 2.5,') == \
+        {'validate_passport_data': 4.0, 'process_query_response': 2.5}
+    assert is_outage(TimeoutError())
+    assert not is_outage(ValueError())
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from ai_cache import AIResponseCache
+from models import AIResponseCacheEntry
+
+REQUEST = {'model': 'gpt-4o', 'temperature': 0, 'messages': [{'role': 'user', 'content': 'Validate'}]}
+
+
+@pytest.fixture
+def cache(app_context):
+    return AIResponseCache()
+
+
+def test_request_hash_ignores_key_order():
+    reordered = {'messages': REQUEST['messages'], 'temperature': 0, 'model': 'gpt-4o'}
+    assert AIResponseCache.request_hash(reordered) == AIResponseCache.request_hash(REQUEST)
+    assert AIResponseCache.request_hash(dict(REQUEST, temperature=1)) != AIResponseCache.request_hash(REQUEST)
+
+
+def test_miss_then_hit(cache):
+    key = cache.request_hash(REQUEST)
+    assert cache.get(key) is None
+
+    cache.put(key, 'gpt-4o', '{"valid": true}')
+
+    assert cache.get(key) == '{"valid": true}'
+    stats = cache.snapshot()
+    assert (stats['misses'], stats['hits'], stats['stored']) == (1, 1, 1)
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_expired_entry_is_a_miss_and_is_deleted(cache):
+    key = cache.request_hash(REQUEST)
+    cache.put(key, 'gpt-4o', '{"valid": true}')
+    AIResponseCacheEntry.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+    assert cache.get(key) is None
+    assert AIResponseCacheEntry.query.count() == 0
+    assert cache.snapshot()['expired'] == 1
+
+
+def test_put_drops_expired_entries_then_least_recently_used(cache):
+    keys = [cache.request_hash(dict(REQUEST, seed=i)) for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key, 'gpt-4o', 'answer')
+    cache.max_entries = 2
+    hour_ago = datetime.utcnow() - timedelta(hours=1)
+    AIResponseCacheEntry.query.update({'last_used_at': hour_ago})
+    AIResponseCacheEntry.query.filter_by(request_hash=keys[0]).update({'expires_at': hour_ago})
+    db.session.commit()
+    cache.get(keys[2])
+
+    cache.put(keys[3], 'gpt-4o', 'answer')
+
+    assert {entry.request_hash for entry in AIResponseCacheEntry.query} == {keys[2], keys[3]}
+    stats = cache.snapshot()
+    assert (stats['expired'], stats['evicted']) == (1, 1)
+
+
+def test_unusable_outside_an_app_context():
+    cache = AIResponseCache()
+    key = cache.request_hash(REQUEST)
+    cache.put(key, 'gpt-4o', 'answer')
+    assert cache.get(key) is None
+    assert cache.snapshot()['misses'] == 0
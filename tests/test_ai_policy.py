@@ -0,0 +1,73 @@
+import pytest
+
+import passport_pipeline
+from ai_breaker import AIUnavailable
+from ai_policy import AIEnhancementPolicy
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.setenv('AI_CONFIDENCE_THRESHOLD', '0.7')
+    monkeypatch.setenv('AI_REQUIRED_FIELDS', 'passport_number,surname')
+    return AIEnhancementPolicy()
+
+
+def test_low_confidence_and_missing_required_fields_are_sent(policy):
+    data = {
+        'passport_number': 'A1234567', 'surname': None, 'sex': None, 'nationality': 'Bangladesh',
+        'confidence': {'passport_number': 0.9, 'surname': 0.0, 'sex': 0.0, 'nationality': 0.4},
+    }
+    assert policy.fields_to_enhance(data) == ['surname', 'nationality']
+
+
+def test_valid_mrz_skips_the_call(policy):
+    data = {'mrz': {'valid': True}, 'surname': None, 'confidence': {'surname': 0.0}}
+    assert policy.fields_to_enhance(data) == []
+    policy.record(data, [])
+    stats = policy.snapshot()
+    assert stats['calls_avoided_mrz_valid'] == 1
+    assert stats['avoided_ratio'] == 1.0
+
+
+def test_only_answered_calls_count_as_made(policy):
+    data = {'surname': None, 'confidence': {'surname': 0.0}}
+    for outcome in ('made', 'short_circuited', 'failed'):
+        policy.record(data, ['surname'])
+        policy.record_call(['surname'], outcome)
+
+    stats = policy.snapshot()
+    assert stats['calls_needed'] == 3
+    assert stats['calls_made'] == 1
+    assert stats['calls_short_circuited'] == 1
+    assert stats['calls_failed'] == 1
+    assert stats['fields_sent'] == 1
+    assert stats['calls_avoided'] == 0
+
+
+class FakeAutomation:
+    enabled = True
+    error = None
+
+    def enhance_passport_extraction(self, raw_text, passport_data, fields):
+        if self.error:
+            raise self.error
+        return {field: 'X' for field in fields}
+
+
+@pytest.mark.parametrize('error, outcome', [
+    (None, 'calls_made'),
+    (AIUnavailable('open'), 'calls_short_circuited'),
+    (RuntimeError('boom'), 'calls_failed'),
+])
+def test_pipeline_records_how_the_call_ended(monkeypatch, policy, error, outcome):
+    monkeypatch.setattr(passport_pipeline, 'ai_policy', policy)
+    monkeypatch.setattr(FakeAutomation, 'error', error)
+    monkeypatch.setattr(passport_pipeline, 'OpenAIAutomation', FakeAutomation)
+
+    _, ai_enhanced = passport_pipeline.parse_passport_data("Nationality: Bangladeshi\n")
+
+    stats = policy.snapshot()
+    assert ai_enhanced == (error is None)
+    assert stats['calls_needed'] == 1
+    assert stats[outcome] == 1
+    assert stats['calls_made'] + stats['calls_short_circuited'] + stats['calls_failed'] == 1
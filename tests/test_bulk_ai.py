@@ -0,0 +1,108 @@
+import json
+from datetime import date
+
+import pytest
+
+import openai_automation
+from app import db
+from bulk_ai import BulkAIRunner, build_query
+from models import PassportRecord
+
+
+def record(record_id, raw_text='', **fields):
+    return record_id, raw_text, fields
+
+
+def test_validate_packs_by_record_count():
+    runner = BulkAIRunner('validate', records_per_prompt=2)
+    groups = runner.pack([record(i, 'x' * 50000) for i in range(5)])
+    assert [[r[0] for r in group] for group in groups] == [[0, 1], [2, 3], [4]]
+
+
+def test_enhance_packs_by_prompt_size_and_sends_long_documents_alone():
+    runner = BulkAIRunner('enhance', records_per_prompt=10, max_prompt_chars=100)
+    groups = runner.pack([record(1, 'x' * 40), record(2, 'x' * 40), record(3, 'x' * 40), record(4, 'x' * 500),
+                          record(5, 'x' * 10)])
+    assert [[r[0] for r in group] for group in groups] == [[1, 2], [3], [4], [5]]
+
+
+def test_validate_results_need_a_verdict():
+    runner = BulkAIRunner('validate')
+    pending = []
+    runner._collect(record(1), {'valid': False, 'issues': ['expiry before issue']}, pending, None)
+    runner._collect(record(2), {'issues': []}, pending, None)
+    runner._collect(record(3), {'valid': 'yes'}, pending, None)
+    runner._collect(record(4), None, pending, None)
+
+    assert [row['id'] for row in pending] == [1]
+    assert json.loads(pending[0]['ai_validation']) == {'valid': False, 'issues': ['expiry before issue'],
+                                                       'suggestions': []}
+    assert (runner.stats['changed'], runner.stats['invalid'], runner.stats['failed']) == (1, 1, 3)
+
+
+def test_enhance_never_blanks_a_field_and_respects_only_empty():
+    current = record(1, surname='RAHMAN', given_names=None, place_of_birth='DHKA')
+    result = {'surname': '', 'given_names': 'KARIM', 'place_of_birth': 'DHAKA', 'sex': 7}
+
+    pending = []
+    runner = BulkAIRunner('enhance')
+    runner._collect(current, result, pending, None)
+    assert pending == [{'id': 1, 'given_names': 'KARIM', 'place_of_birth': 'DHAKA'}]
+
+    pending = []
+    runner = BulkAIRunner('enhance', only_empty=True)
+    runner._collect(current, result, pending, None)
+    assert pending == [{'id': 1, 'given_names': 'KARIM'}]
+
+
+def test_enhance_rows_carry_the_derived_columns():
+    pending = []
+    BulkAIRunner('enhance')._collect(record(1), {'date_of_expiry': '21/09/2030'}, pending, None)
+    assert pending[0]['expiry_date'] == date(2030, 9, 21)
+    assert pending[0]['expiry_changed_at'] is not None
+
+
+class FakeAutomation:
+    """Answers packed prompts, leaving out the records in ``skip`` so they are retried alone"""
+
+    enabled = True
+    skip = set()
+    requests = []
+
+    def enhance_passport_batch(self, records, fresh=False):
+        FakeAutomation.requests.append(sorted(records))
+        return {record_id: {'date_of_expiry': '21/09/2030'} for record_id in records
+                if len(records) == 1 or record_id not in self.skip}
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    monkeypatch.setattr(openai_automation, 'OpenAIAutomation', FakeAutomation)
+    monkeypatch.setattr(FakeAutomation, 'requests', [])
+    monkeypatch.setattr(FakeAutomation, 'skip', {2})
+    return FakeAutomation
+
+
+def test_run_retries_left_out_records_and_writes_the_results(app_context, fake_ai):
+    for _ in range(3):
+        db.session.add(PassportRecord(filename='passport.png', raw_text='P<BGD'))
+    db.session.commit()
+
+    runner = BulkAIRunner('enhance', records_per_prompt=3, workers=1, requests_per_minute=0)
+    stats = runner.run(build_query({}))
+
+    assert fake_ai.requests == [[1, 2, 3], [2]]
+    assert (stats['processed'], stats['changed'], stats['requests'], stats['failed']) == (3, 3, 2, 0)
+    db.session.expire_all()
+    assert {r.expiry_date for r in PassportRecord.query} == {date(2030, 9, 21)}
+
+
+def test_dry_run_writes_nothing(app_context, fake_ai):
+    db.session.add(PassportRecord(filename='passport.png', raw_text='P<BGD'))
+    db.session.commit()
+
+    stats = BulkAIRunner('enhance', workers=1, requests_per_minute=0, dry_run=True).run(build_query({}))
+
+    assert stats['changed'] == 1
+    db.session.expire_all()
+    assert PassportRecord.query.one().date_of_expiry is None
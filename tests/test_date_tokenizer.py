@@ -0,0 +1,60 @@
+from datetime import date
+
+from date_tokenizer import candidates, format_date, month_first, numeric_order, parse_date
+from passport_parser import PassportParser
+
+
+def test_two_digit_years_pivot_on_the_current_year():
+    this_year = date.today().year % 100
+    assert parse_date(f'01/02/{this_year:02d}') == date(2000 + this_year, 2, 1)
+    assert parse_date(f'01/02/{this_year + 1:02d}') == date(1901 + this_year, 2, 1)
+    assert parse_date('850921') == date(1985, 9, 21)
+
+
+def test_two_digit_expiry_years_are_always_this_century():
+    assert parse_date('21 SEP 90', future=True) == date(2090, 9, 21)
+    assert parse_date('900921', future=True) == date(2090, 9, 21)
+
+
+def test_printed_date_shapes():
+    assert parse_date('1987-09-21') == date(1987, 9, 21)
+    assert parse_date('21 SEP/SEPT 1987') == date(1987, 9, 21)
+    assert parse_date('September 21, 1987') == date(1987, 9, 21)
+    assert parse_date('21.09.1987') == date(1987, 9, 21)
+    assert parse_date('no date here') is None
+    assert parse_date('31/02/1987') is None
+
+
+def test_ambiguous_numeric_dates_follow_day_first_then_the_hint():
+    assert candidates('03/04/1987') == [date(1987, 4, 3), date(1987, 3, 4)]
+    assert parse_date('03/04/1987') == date(1987, 4, 3)
+    assert parse_date('03/04/1987', day_first=False) == date(1987, 3, 4)
+    assert parse_date('03/04/1987', hint=date(1987, 3, 4)) == date(1987, 3, 4)
+    # Only one reading is a real date, so the order does not matter
+    assert parse_date('21/09/1987', day_first=False) == date(1987, 9, 21)
+
+
+def test_numeric_order():
+    assert numeric_order('21/09/1987') is True
+    assert numeric_order('09/21/1987') is False
+    assert numeric_order('03/04/1987') is None
+    assert numeric_order('21 SEP 1987') is None
+
+
+def test_month_first_countries():
+    assert month_first('USA')
+    assert month_first(' United States ')
+    assert not month_first('Bangladesh')
+    assert not month_first(None)
+
+
+def test_format_date():
+    assert format_date(date(1987, 9, 21)) == '21/09/1987'
+    assert format_date(None) is None
+
+
+def test_parser_reads_numeric_dates_month_first_for_month_first_countries():
+    parser = PassportParser()
+    assert parser.parse_passport_text("Nationality: USA\nDate of Birth: 03/04/1987\n")['date_of_birth'] == '04/03/1987'
+    assert parser.parse_passport_text("Nationality: Bangladeshi\nDate of Birth: 03/04/1987\n")['date_of_birth'] \
+        == '03/04/1987'
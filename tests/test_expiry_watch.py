@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta
+
+from app import db
+from models import PassportRecord, ExpiryAlert, ExpiryScanState
+from expiry_watch import expiry_watch
+
+TODAY = date(2026, 1, 15)
+
+
+def add_record(expiry, **fields):
+    record = PassportRecord(filename='passport.png', date_of_expiry=expiry.strftime('%d/%m/%Y'), **fields)
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def alerts():
+    return sorted((alert.passport_record_id, alert.threshold_days) for alert in ExpiryAlert.query.all())
+
+
+def test_first_scan_alerts_at_most_urgent_threshold(app_context):
+    expired = add_record(TODAY - timedelta(days=3))
+    soon = add_record(TODAY + timedelta(days=30))
+    later = add_record(TODAY + timedelta(days=120))
+    add_record(TODAY + timedelta(days=400))
+
+    assert expiry_watch.scan(today=TODAY) == 3
+    assert alerts() == [(expired.id, 0), (soon.id, 90), (later.id, 180)]
+    # Alerts are not raised twice
+    assert expiry_watch.scan(today=TODAY) == 0
+
+
+def test_incremental_scan_finds_threshold_crossings(app_context):
+    crossing = add_record(TODAY + timedelta(days=90))
+    add_record(TODAY + timedelta(days=91))
+    PassportRecord.query.update({'created_at': datetime(2025, 1, 1), 'expiry_changed_at': datetime(2025, 1, 1)})
+    db.session.commit()
+
+    assert expiry_watch.scan(since_on=TODAY - timedelta(days=1), since_at=datetime(2026, 1, 14), today=TODAY) == 1
+    assert alerts() == [(crossing.id, 90)]
+
+
+def test_corrected_expiry_inside_a_window_is_picked_up(app_context):
+    record = add_record(TODAY + timedelta(days=900))
+    PassportRecord.query.update({'created_at': datetime(2025, 1, 1), 'expiry_changed_at': datetime(2025, 1, 1)})
+    db.session.commit()
+    since_at = datetime.utcnow()
+
+    record.date_of_expiry = (TODAY + timedelta(days=20)).strftime('%d/%m/%Y')
+    db.session.commit()
+    assert record.expiry_changed_at >= since_at
+
+    assert expiry_watch.scan(since_on=TODAY - timedelta(days=1), since_at=since_at, today=TODAY) == 1
+    assert alerts() == [(record.id, 90)]
+
+
+def test_scan_if_due_runs_once_per_day(app_context):
+    add_record(TODAY + timedelta(days=10))
+    assert expiry_watch.scan_if_due(today=TODAY) == 1
+    assert expiry_watch.scan_if_due(today=TODAY) is None
+    assert ExpiryScanState.query.one().last_scan_on == TODAY
+
+
+def test_expiring_within_limit(app_context):
+    for days in range(5, 20):
+        add_record(date.today() + timedelta(days=days))
+    soonest = expiry_watch.expiring_within(90, limit=10)
+    assert len(soonest) == 10
+    assert [record.expiry_date for record in soonest] == sorted(record.expiry_date for record in soonest)
+    assert len(expiry_watch.expiring_within(90)) == 15
+
+
+def test_deleting_a_record_removes_its_alerts(app_context):
+    record = add_record(TODAY + timedelta(days=10))
+    expiry_watch.scan(today=TODAY)
+    client = app_context.test_client()
+    client.post(f'/delete_record/{record.id}')
+    assert ExpiryAlert.query.count() == 0
+
+    assert client.get('/api/passports/expiry-alerts?limit=abc').status_code == 200
@@ -0,0 +1,78 @@
+import pickle
+
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+from image_quality import ImageQualityCheck, ImageQualityError
+
+
+def page(size=(1200, 800)):
+    """White page with rows of dark 'words'"""
+    image = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(60, size[1] - 60, 40):
+        for left in range(60, size[0] - 160, 120):
+            draw.rectangle([left, top, left + 90, top + 18], fill=20)
+            for x in range(left + 6, left + 90, 12):
+                draw.line([x, top, x, top + 18], fill=255, width=3)
+    return image
+
+
+@pytest.fixture
+def check(monkeypatch):
+    monkeypatch.delenv('OCR_QUALITY_MODE', raising=False)
+    return ImageQualityCheck()
+
+
+def test_clean_page_passes(check):
+    quality = check.check(page())
+    assert quality['issues'] == []
+    assert quality['warnings'] == []
+    assert quality['sharpness'] >= check.min_sharpness
+    assert quality['contrast'] >= check.min_contrast
+    assert abs(quality['skew']) <= 1
+
+
+def test_blurred_page_is_rejected(check):
+    with pytest.raises(ImageQualityError) as error:
+        check.check(page().filter(ImageFilter.GaussianBlur(8)))
+    assert 'too blurry' in str(error.value)
+    assert error.value.quality['rejected']
+
+
+def test_blank_page_is_rejected_for_contrast(check):
+    quality = check.assess(Image.new('L', (1200, 800), 250))
+    assert quality['contrast'] == 0
+    assert len(quality['issues']) == 1
+    assert 'too little contrast' in quality['issues'][0]
+
+
+def test_small_scan_is_rejected_for_resolution(check):
+    quality = check.assess(page((400, 300)))
+    assert quality['rejected']
+    assert 'resolution too low' in quality['issues'][0]
+
+
+def test_rotated_page_only_warns(check):
+    quality = check.check(page().rotate(10, expand=True, fillcolor=255))
+    assert not quality['rejected']
+    assert 8 <= abs(quality['skew']) <= 12
+    assert quality['warnings']
+
+
+def test_flag_mode_records_issues_without_rejecting(check):
+    check.mode = 'flag'
+    quality = check.check(page((400, 300)))
+    assert quality['issues']
+    assert not quality['rejected']
+
+
+def test_off_mode_skips_the_check(check):
+    check.mode = 'off'
+    assert check.check(page((400, 300))) is None
+
+
+def test_error_survives_pickling():
+    error = pickle.loads(pickle.dumps(ImageQualityError('blurry', {'sharpness': 3.0})))
+    assert str(error) == 'blurry'
+    assert error.quality == {'sharpness': 3.0}
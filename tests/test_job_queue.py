@@ -0,0 +1,114 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import job_queue as job_queue_module
+from app import db
+from image_quality import ImageQualityError
+from job_queue import JobQueue
+from models import ProcessingJob, PassportRecord
+
+
+@pytest.fixture
+def queue(app_context):
+    return JobQueue(app_context)
+
+
+def add_job(filepath=None, **fields):
+    job = ProcessingJob(filename='passport.png', filepath=filepath, status='queued', **fields)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / 'passport.png'
+    path.write_bytes(b'scan')
+    return str(path)
+
+
+def test_jobs_are_claimed_oldest_first_and_only_once(queue):
+    first, second = add_job(), add_job()
+
+    claimed = queue._claim_next_job()
+    assert claimed.id == first.id
+    assert claimed.status == 'running'
+    assert claimed.attempts == 1
+    assert claimed.started_at is not None
+
+    assert queue._claim_next_job().id == second.id
+    assert queue._claim_next_job() is None
+
+
+def test_stale_running_jobs_are_requeued(queue):
+    stale = add_job()
+    fresh = add_job()
+    queue._claim_next_job()
+    queue._claim_next_job()
+    stale.started_at = datetime.utcnow() - timedelta(seconds=queue.stale_after + 60)
+    db.session.commit()
+
+    queue._requeue_stale_jobs()
+
+    assert db.session.get(ProcessingJob, stale.id).status == 'queued'
+    assert db.session.get(ProcessingJob, fresh.id).status == 'running'
+
+
+def test_successful_job_saves_a_record_and_removes_the_upload(queue, upload, monkeypatch):
+    monkeypatch.setattr(job_queue_module, 'extract_passport_data',
+                        lambda *args, **kwargs: ({'text': 'P<BGD'}, {'passport_number': 'A1234567'}, False))
+    add_job(upload)
+
+    queue._run_job(queue._claim_next_job())
+
+    job = ProcessingJob.query.one()
+    assert job.status == 'done'
+    assert job.finished_at is not None
+    assert db.session.get(PassportRecord, job.passport_record_id).passport_number == 'A1234567'
+    assert not os.path.exists(upload)
+
+
+def fail_with(error):
+    def extract(*args, **kwargs):
+        raise error
+    return extract
+
+
+def test_failed_job_is_retried_until_max_attempts(queue, upload, monkeypatch):
+    monkeypatch.setattr(job_queue_module, 'extract_passport_data', fail_with(RuntimeError('tesseract crashed')))
+    add_job(upload)
+
+    for _ in range(queue.max_attempts - 1):
+        queue._run_job(queue._claim_next_job())
+        job = ProcessingJob.query.one()
+        assert job.status == 'queued'
+        assert job.finished_at is None
+
+    queue._run_job(queue._claim_next_job())
+    job = ProcessingJob.query.one()
+    assert job.status == 'failed'
+    assert job.attempts == queue.max_attempts
+    assert job.error == 'tesseract crashed'
+
+
+def test_unreadable_scan_is_not_retried(queue, upload, monkeypatch):
+    monkeypatch.setattr(job_queue_module, 'extract_passport_data',
+                        fail_with(ImageQualityError('Image too blurry', {'sharpness': 3.0})))
+    add_job(upload)
+
+    queue._run_job(queue._claim_next_job())
+
+    job = ProcessingJob.query.one()
+    assert job.status == 'failed'
+    assert job.attempts == 1
+
+
+def test_missing_upload_is_not_retried(queue, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue_module, 'extract_passport_data', fail_with(RuntimeError('unreachable')))
+    add_job(str(tmp_path / 'gone.png'), file_hash='0' * 64)
+
+    queue._run_job(queue._claim_next_job())
+
+    assert ProcessingJob.query.one().status == 'failed'
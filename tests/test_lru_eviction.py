@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import OCRCacheEntry
+from lru_eviction import evict_lru
+
+START = datetime(2026, 1, 1)
+
+
+def add_entries(sizes):
+    for index, size in enumerate(sizes):
+        db.session.add(OCRCacheEntry(file_hash=f'{index:064d}', config_version='test', size_bytes=size,
+                                     last_used_at=START + timedelta(minutes=index)))
+    db.session.commit()
+
+
+def remaining():
+    return [entry.file_hash[-1] for entry in OCRCacheEntry.query.order_by(OCRCacheEntry.last_used_at)]
+
+
+def test_within_bounds_nothing_is_evicted(app_context):
+    add_entries([10, 10, 10])
+    assert evict_lru(OCRCacheEntry, OCRCacheEntry.last_used_at, max_entries=3, max_bytes=30) == (0, 0)
+    assert len(remaining()) == 3
+
+
+def test_entry_bound_evicts_least_recently_used(app_context):
+    add_entries([10, 10, 10, 10])
+    assert evict_lru(OCRCacheEntry, OCRCacheEntry.last_used_at, max_entries=2, max_bytes=1000) == (2, 20)
+    assert remaining() == ['2', '3']
+
+
+def test_byte_bound_evicts_until_it_holds(app_context):
+    add_entries([50, 5, 5, 40])
+    # 100 bytes against a 55 byte bound: the oldest entry alone frees enough
+    assert evict_lru(OCRCacheEntry, OCRCacheEntry.last_used_at, max_entries=10, max_bytes=55) == (1, 50)
+    assert remaining() == ['1', '2', '3']
@@ -0,0 +1,31 @@
+from mrz import _document_number, check_digit, parse_mrz, verified_fields
+
+# ICAO 9303 specimen passport
+LINE1 = 'P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<'
+LINE2 = 'L898902C36UTO7408122F1204159ZE184226B<<<<<10'
+
+
+def test_specimen_is_valid():
+    mrz = parse_mrz(f"{LINE1}\n{LINE2}")
+    assert mrz['valid']
+    assert mrz['document_number'] == 'L898902C3'
+    assert check_digit('L898902C3') == '6'
+
+
+def test_single_confusion_is_corrected():
+    assert _document_number('L8989O2C3', '6') == ('L898902C3', True)
+
+
+def test_wrong_check_digit_is_not_verified():
+    # No single letter/digit swap of the number matches a 1
+    assert _document_number('L898902C3', '1') == ('L898902C3', False)
+
+    mrz = parse_mrz(f"{LINE1}\n{LINE2[:9]}1{LINE2[10:]}")
+    assert mrz['document_number'] == 'L898902C3'
+    assert not mrz['checks']['document_number']
+    assert 'passport_number' not in verified_fields(mrz)
+
+
+def test_ambiguous_correction_is_not_verified():
+    # 12S583015 and 12558301S both carry check digit 1
+    assert _document_number('125583015', '1') == ('125583015', False)
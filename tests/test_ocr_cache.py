@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from models import OCRCacheEntry, PassportRecord
+from ocr_cache import OCRResultCache
+from word_layout import WordLayout
+
+
+@pytest.fixture
+def cache(app_context):
+    return OCRResultCache()
+
+
+def ocr_result(text='P<BGDRAHMAN<<KARIM'):
+    layout = WordLayout()
+    layout.add('RAHMAN', 0, 0, 10, 20, 60, 12, 91)
+    return {'text': text, 'words': [['RAHMAN', 91.0]], 'layout': layout, 'quality': {'sharpness': 120.0}}
+
+
+def test_miss_then_hit_round_trips_the_result(cache):
+    file_hash = cache.hash_bytes(b'scan')
+    assert cache.get(file_hash) is None
+
+    cache.put(file_hash, ocr_result(), {'surname': 'RAHMAN'})
+
+    entry = cache.get(file_hash)
+    assert entry.hit_count == 1
+    result, parsed = cache.cached_result(entry)
+    assert result['text'] == 'P<BGDRAHMAN<<KARIM'
+    assert result['words'] == [['RAHMAN', 91.0]]
+    assert result['layout'].text == ['RAHMAN']
+    assert result['quality'] == {'sharpness': 120.0}
+    assert parsed == {'surname': 'RAHMAN'}
+
+
+def test_entries_from_another_ocr_config_version_miss(cache):
+    file_hash = cache.hash_bytes(b'scan')
+    cache.put(file_hash, ocr_result(), {})
+    cache.version = 'next'
+    assert cache.get(file_hash) is None
+
+
+def test_put_refreshes_an_existing_entry(cache):
+    file_hash = cache.hash_bytes(b'scan')
+    cache.put(file_hash, ocr_result('old'), {})
+    cache.put(file_hash, ocr_result('new'), {})
+    assert OCRCacheEntry.query.count() == 1
+    assert cache.get(file_hash).raw_text == 'new'
+
+
+def test_existing_record_is_none_once_the_record_is_deleted(cache):
+    record = PassportRecord(filename='passport.png')
+    db.session.add(record)
+    db.session.commit()
+    file_hash = cache.hash_bytes(b'scan')
+    cache.put(file_hash, ocr_result(), {}, record.id)
+    assert cache.existing_record(cache.get(file_hash)).id == record.id
+
+    db.session.delete(record)
+    db.session.commit()
+    assert cache.existing_record(cache.get(file_hash)) is None
+
+
+def test_a_hit_keeps_the_entry_from_being_evicted(cache):
+    cache.max_entries = 2
+    first, second, third = (cache.hash_bytes(bytes([i])) for i in range(3))
+    cache.put(first, ocr_result(), {})
+    cache.put(second, ocr_result(), {})
+    OCRCacheEntry.query.update({'last_used_at': datetime.utcnow() - timedelta(hours=1)})
+    db.session.commit()
+    cache.get(first)
+
+    cache.put(third, ocr_result(), {})
+
+    assert {entry.file_hash for entry in OCRCacheEntry.query} == {first, third}
+
+
+def test_disabled_cache_stores_nothing(cache):
+    cache.enabled = False
+    file_hash = cache.hash_bytes(b'scan')
+    cache.put(file_hash, ocr_result(), {})
+    assert cache.get(file_hash) is None
+    assert OCRCacheEntry.query.count() == 0
@@ -0,0 +1,53 @@
+from PIL import Image
+
+from ocr_processor import OCRProcessor, PDF_PAGE_CONFIGS
+
+# Average word confidence each layout reaches on every page
+CONFIDENCE = {'psm6': 85, 'psm4': 95, 'psm3': 60}
+
+
+class FakeBackend:
+    name = 'fake'
+
+    def __init__(self):
+        self.calls = []
+
+    def image_to_data(self, image, config='', lang='eng'):
+        name = next(name for name, value in PDF_PAGE_CONFIGS.items() if value == config)
+        self.calls.append(name)
+        return {'level': [5], 'page_num': [1], 'block_num': [1], 'par_num': [1], 'line_num': [1], 'word_num': [1],
+                'left': [0], 'top': [0], 'width': [10], 'height': [10], 'conf': [CONFIDENCE[name]], 'text': [name]}
+
+
+def processor(sample_every):
+    ocr = OCRProcessor()
+    ocr.backend = FakeBackend()
+    ocr.preflight.mode = 'off'
+    ocr.config_sample_every = sample_every
+    return ocr
+
+
+def test_confident_first_layout_stops_early():
+    ocr = processor(sample_every=0)
+    page = ocr._ocr_pdf_page_image(Image.new('L', (64, 64), 255))
+    assert page['config'] == 'psm6'
+    assert ocr.backend.calls == ['psm6']
+    assert 'trials' not in page
+
+
+def test_sampled_page_runs_every_layout():
+    ocr = processor(sample_every=2)
+    pages = [ocr._ocr_pdf_page_image(Image.new('L', (64, 64), 255)) for _ in range(2)]
+    assert 'trials' not in pages[0]
+    assert pages[1]['trials'] == {'psm6': 85.0, 'psm4': 95.0, 'psm3': 60.0}
+    assert pages[1]['config'] == 'psm4'
+
+
+def test_order_follows_sampled_win_rate_not_raw_wins(app_context):
+    from ocr_config_stats import ocr_config_stats
+    from ocr_executor import ocr_executor
+
+    # psm6 is tried first and keeps most pages, but psm4 wins every sampled page
+    ocr_config_stats.record({'configs': ['psm6'] * 50, 'config_trials': [dict(CONFIDENCE)] * 2})
+    assert ocr_config_stats.apply()[0] == 'psm4'
+    assert ocr_executor.config_order == ['psm4', 'psm6', 'psm3']
@@ -0,0 +1,13 @@
+from PIL import Image
+
+import ocr_executor as executor_module
+from ocr_executor import OCRExecutor
+
+
+def test_scanned_pdf_without_pdf2image_falls_back_to_text_layer(tmp_path, monkeypatch):
+    pdf_path = str(tmp_path / 'scan.pdf')
+    Image.new('L', (200, 300), 255).save(pdf_path)
+    monkeypatch.setattr(executor_module, 'pdf_rendering_available', lambda: False)
+
+    result = OCRExecutor(max_workers=1)._submit_pdf(None, pdf_path).result()
+    assert result == {'text': 'No text could be extracted from PDF', 'words': []}
@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+from openai import OpenAI
+
+import openai_client as client_module
+from benchmarks.bench_openai_client import StandInServer
+from openai_client import AIDeadlineExceeded, OpenAIClientManager
+
+MESSAGES = [{'role': 'user', 'content': 'Validate this passport data.'}]
+COMPLETION = {
+    'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o',
+    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': '{"valid": true}'}}],
+}
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setenv('OPENAI_BACKOFF', '0.01')
+    manager = OpenAIClientManager()
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays the client asked for, without waiting them out"""
+    delays = []
+    monkeypatch.setattr(client_module.time, 'sleep', delays.append)
+    return delays
+
+
+def serve(manager, *responses):
+    """Point the manager at a fake API answering with ``responses`` (status, headers, body) in turn"""
+    remaining = list(responses)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        status, headers, body = remaining.pop(0)
+        return httpx.Response(status, headers=headers, json=body)
+
+    manager._client = OpenAI(api_key='test-key', base_url='http://api.test/v1', max_retries=0,
+                             http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    manager._pid = os.getpid()
+    return requests
+
+
+def ok():
+    return 200, {}, COMPLETION
+
+
+def error(status, code=None, headers=None):
+    return status, headers or {}, {'error': {'message': 'failure', 'type': 'server_error', 'code': code}}
+
+
+def test_5xx_and_429_are_retried(manager, sleeps):
+    requests = serve(manager, error(503), error(429, headers={'retry-after': '2'}), ok())
+
+    response = manager.chat(model='gpt-4o', messages=MESSAGES)
+
+    assert json.loads(response.choices[0].message.content) == {'valid': True}
+    assert len(requests) == 3
+    assert sleeps[0] <= manager.backoff
+    assert sleeps[1] == 2.0  # Retry-After
+    stats = manager.snapshot()
+    assert (stats['calls'], stats['succeeded'], stats['retries'], stats['in_flight']) == (1, 1, 2, 0)
+
+
+def test_client_errors_and_exhausted_quota_are_not_retried(manager, sleeps):
+    requests = serve(manager, error(400), error(429, code='insufficient_quota'))
+
+    with pytest.raises(openai.BadRequestError):
+        manager.chat(model='gpt-4o', messages=MESSAGES)
+    with pytest.raises(openai.RateLimitError):
+        manager.chat(model='gpt-4o', messages=MESSAGES)
+
+    assert len(requests) == 2
+    assert sleeps == []
+    assert manager.snapshot()['failed'] == 2
+
+
+def test_retries_stop_after_max_retries(manager, sleeps):
+    manager.max_retries = 2
+    requests = serve(manager, error(503), error(503), error(503), ok())
+
+    with pytest.raises(openai.InternalServerError):
+        manager.chat(model='gpt-4o', messages=MESSAGES)
+
+    assert len(requests) == 3
+    assert manager.snapshot()['retries'] == 2
+
+
+def test_no_retry_that_would_end_past_the_deadline(manager, sleeps):
+    requests = serve(manager, error(429, headers={'retry-after': '5'}), ok())
+
+    with pytest.raises(openai.RateLimitError):
+        manager.chat(timeout=1, model='gpt-4o', messages=MESSAGES)
+
+    assert len(requests) == 1
+    assert sleeps == []
+
+
+def test_hung_request_raises_at_the_deadline(manager):
+    server = StandInServer(hang_rate=1.0, hang_seconds=2.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    manager.base_url = server.base_url
+    try:
+        start = time.monotonic()
+        with pytest.raises(AIDeadlineExceeded):
+            manager.chat(timeout=0.3, model='gpt-4o', messages=MESSAGES)
+        assert time.monotonic() - start < 1.5
+        assert manager.snapshot()['deadline_exceeded'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_waiting_for_a_slot_counts_against_the_deadline(manager):
+    manager._slots = threading.BoundedSemaphore(1)
+    manager._slots.acquire()
+    try:
+        with pytest.raises(AIDeadlineExceeded):
+            manager.chat(timeout=0.1, model='gpt-4o', messages=MESSAGES)
+    finally:
+        manager._slots.release()
+    assert manager.snapshot()['deadline_exceeded'] == 1
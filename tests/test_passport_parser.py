@@ -0,0 +1,64 @@
+from passport_parser import PassportParser, expiry_after
+from reparse_records import parse_chunk
+
+
+def parse(text):
+    return PassportParser().parse_passport_text(text)
+
+
+def test_nationality_must_resolve_to_a_country():
+    assert parse("Nationality: Bangladeshi\n")['nationality'] == 'Bangladesh'
+    assert parse("Nationality: HFRS\n")['nationality'] is None
+    assert parse("Nationality: Personal No\n")['nationality'] is None
+
+
+def test_reparse_keeps_old_nationality_over_misreads():
+    rows = [
+        (1, "Nationality: Hfrs\n", None, {'nationality': 'Bgd'}),
+        (2, "Nationality: Personal No\n", None, {'nationality': 'Tea'}),
+    ]
+    assert parse_chunk(rows, ['nationality'], only_empty=False) == []
+
+
+def test_expiry_must_follow_birth_and_issue():
+    assert expiry_after('21/09/2030', '21/09/1987', '22/09/2020')
+    assert not expiry_after('21/09/1987', '21/09/1987')
+    assert not expiry_after('01/01/2020', '21/09/1987', '22/09/2020')
+    # Nothing to compare against
+    assert expiry_after('21/09/1987')
+    assert expiry_after(None, '21/09/1987')
+
+
+def test_expiry_equal_to_birth_date_is_dropped():
+    data = parse("Date of Birth: 21/09/1987\nDate of Expiry: 21/09/1987\n")
+    assert data['date_of_birth'] == '21/09/1987'
+    assert data['date_of_expiry'] is None
+
+
+def test_reparse_keeps_old_expiry_before_birth_date():
+    # The text holds no birth date; the record's own one rules the new expiry out
+    assert parse("Expiry Date: 21 SEP 1987\n")['date_of_expiry'] == '21/09/1987'
+    rows = [(1, "Expiry Date: 21 SEP 1987\n", None, {'date_of_expiry': '14/03/2031', 'date_of_birth': '21/09/1987'})]
+    assert parse_chunk(rows, ['date_of_expiry'], only_empty=False) == []
+
+
+def test_verified_mrz_nationality_code_is_kept():
+    # ICAO 9303 specimen: every check digit passes, but UTO is no real country
+    data = parse("P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\n"
+                 "L898902C36UTO7408122F1204159ZE184226B<<<<<10\n")
+    assert 'nationality' in data['mrz']['verified_fields']
+    assert data['nationality'] == 'UTO'
+    assert data['nationality_code'] is None
+
+
+def test_unverified_mrz_nationality_code_is_dropped():
+    # Same zone with a broken composite check digit
+    data = parse("P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\n"
+                 "L898902C36UTO7408122F1204159ZE184226B<<<<<11\n")
+    assert not data['mrz']['valid']
+    assert data['nationality'] is None
+
+
+def test_place_values_keep_slashes_and_apostrophes():
+    assert parse("Issuing Authority: DIP/DHAKA\n")['issuing_authority'] == 'DIP/DHAKA'
+    assert parse("Place of Birth: COX'S BAZAR\n")['place_of_birth'] == "COX'S BAZAR"
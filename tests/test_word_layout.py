@@ -0,0 +1,64 @@
+from word_layout import WordLayout, same_row
+
+DATA = {
+    'text': ['Surname', 'RAHMAN', '', 'Given', 'Names', 'KARIM', 'low'],
+    'conf': ['96', '91', '-1', '88', '90', '93', '12'],
+    'page_num': [1, 1, 1, 1, 1, 1, 1],
+    'block_num': [1, 1, 1, 2, 2, 2, 3],
+    'par_num': [1, 1, 1, 1, 1, 1, 1],
+    'line_num': [1, 1, 1, 1, 1, 1, 1],
+    'left': [10, 120, 0, 10, 70, 160, 10],
+    'top': [20, 21, 0, 50, 50, 52, 90],
+    'width': [90, 70, 0, 50, 55, 60, 30],
+    'height': [12, 12, 0, 12, 12, 12, 12],
+}
+
+
+def test_from_data_skips_empty_and_low_confidence_words():
+    layout = WordLayout.from_data(DATA, min_conf=30, offset=(5, 100))
+    assert layout.text == ['Surname', 'RAHMAN', 'Given', 'Names', 'KARIM']
+    assert list(layout.line) == [0, 0, 1, 1, 1]
+    assert (layout.left[0], layout.top[0]) == (15, 120)
+    assert layout.words()[1] == ['RAHMAN', 91.0]
+
+
+def test_bytes_round_trip():
+    layout = WordLayout.from_data(DATA)
+    layout.add('DHAKA', 1, 3, 70000, -5, 40.6, 12, 101)
+
+    restored = WordLayout.from_bytes(layout.to_bytes())
+
+    assert restored.text == layout.text
+    for name in ('page', 'line', 'left', 'top', 'width', 'height', 'conf'):
+        assert getattr(restored, name) == getattr(layout, name)
+    # Values outside a column's range are clamped when added
+    assert (restored.left[-1], restored.top[-1], restored.width[-1], restored.conf[-1]) == (0xFFFF, 0, 40, 100)
+
+
+def test_empty_and_unrecognised_blobs():
+    assert len(WordLayout.from_bytes(WordLayout().to_bytes())) == 0
+    assert WordLayout.from_bytes(None) is None
+    assert WordLayout.from_bytes(b'') is None
+    assert WordLayout.from_bytes(b'JSON' + b'\0' * 8) is None
+
+
+def test_merge_numbers_pages_and_lines_on():
+    first = WordLayout.from_data(DATA)
+    merged = WordLayout.merge([first, None, WordLayout.from_data(DATA)])
+    assert len(merged) == 2 * len(first)
+    assert list(merged.page) == [0] * len(first) + [1] * len(first)
+    assert merged.line[len(first)] == first.line[-1] + 1
+
+
+def test_rows_join_side_by_side_lines():
+    layout = WordLayout()
+    layout.add('Surname', 0, 0, 10, 20, 90, 12, 96)
+    layout.add('RAHMAN', 0, 1, 200, 22, 70, 12, 91)
+    layout.add('KARIM', 0, 2, 10, 60, 60, 12, 93)
+
+    rows = layout.rows()
+
+    assert [lines for _, _, _, lines in rows] == [[[0], [1]], [[2]]]
+    assert layout.box([0, 1]) == (10, 20, 270, 34)
+    assert same_row(20, 32, 26, 38)
+    assert not same_row(20, 32, 30, 42)
@@ -0,0 +1,169 @@
+import sys
+import zlib
+import struct
+from array import array
+
+# Format tag and word count at the start of a serialised layout
+_HEADER = struct.Struct('<4sI')
+_MAGIC = b'WLB1'
+
+# Column name -> array typecode; coordinates are pixels, conf is tesseract's 0-100
+_COLUMNS = (('page', 'H'), ('line', 'I'), ('left', 'H'), ('top', 'H'), ('width', 'H'), ('height', 'H'),
+            ('conf', 'B'))
+
+
+def _clamp(value, limit):
+    return min(max(int(float(value)), 0), limit)
+
+
+def same_row(top, bottom, other_top, other_bottom):
+    """True if two vertical extents overlap by at least half the shorter one"""
+    overlap = min(bottom, other_bottom) - max(top, other_top)
+    return overlap * 2 >= min(bottom - top, other_bottom - other_top)
+
+
+class WordLayout:
+    """OCR words with their bounding boxes and confidences, stored column-wise in typed arrays.
+
+    Word ``i`` is ``text[i]`` at ``(left[i], top[i], width[i], height[i])`` on
+    ``page[i]``, in OCR line ``line[i]`` (numbered across the whole document).
+    Serialised with to_bytes it costs ~15 bytes per word plus the text,
+    compressed, against ~60 for the same data as JSON.
+    """
+
+    __slots__ = ('text',) + tuple(name for name, _ in _COLUMNS)
+
+    def __init__(self):
+        self.text = []
+        for name, typecode in _COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.text)
+
+    def add(self, text, page, line, left, top, width, height, conf):
+        self.text.append(text)
+        self.page.append(page)
+        self.line.append(line)
+        self.left.append(_clamp(left, 0xFFFF))
+        self.top.append(_clamp(top, 0xFFFF))
+        self.width.append(_clamp(width, 0xFFFF))
+        self.height.append(_clamp(height, 0xFFFF))
+        self.conf.append(_clamp(round(float(conf)), 100))
+
+    @classmethod
+    def from_data(cls, data, min_conf=-1, offset=(0, 0), page=0):
+        """Build from image_to_data output, skipping empty words and those not above ``min_conf``.
+
+        ``offset`` is added to every box, for data read from a crop of the page.
+        """
+        layout = cls()
+        lines = {}
+        dx, dy = offset
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            conf = float(data['conf'][i])
+            if not word or conf <= min_conf:
+                continue
+            key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            line = lines.setdefault(key, len(lines))
+            layout.add(word, page, line, data['left'][i] + dx, data['top'][i] + dy,
+                       data['width'][i], data['height'][i], conf)
+        return layout
+
+    @classmethod
+    def merge(cls, layouts):
+        """One layout for a multi-page document; each input layout becomes the next page(s)"""
+        merged = cls()
+        for layout in layouts:
+            if not layout:
+                continue
+            page_base = merged.page[-1] + 1 if len(merged) else 0
+            line_base = merged.line[-1] + 1 if len(merged) else 0
+            merged.text.extend(layout.text)
+            merged.page.extend(page + page_base for page in layout.page)
+            merged.line.extend(line + line_base for line in layout.line)
+            for name in ('left', 'top', 'width', 'height', 'conf'):
+                getattr(merged, name).extend(getattr(layout, name))
+        return merged
+
+    def words(self):
+        """``[[word, conf], ...]``, the shape of an OCR result's ``words``"""
+        return [[word, float(conf)] for word, conf in zip(self.text, self.conf)]
+
+    def lines(self):
+        """Word indices grouped by OCR line, in reading order"""
+        grouped = []
+        current = None
+        for i, line in enumerate(self.line):
+            if line != current:
+                grouped.append([])
+                current = line
+            grouped[-1].append(i)
+        return grouped
+
+    def rows(self):
+        """OCR lines grouped into rows of vertically overlapping lines, top to bottom on each page.
+
+        Returns ``[(page, top, bottom, [[word index, ...] per line]), ...]``;
+        a label and its value printed side by side often come out of OCR as
+        separate lines of the same row.
+        """
+        lines = []  # [page, top, bottom, word indices]
+        current = None
+        for i, line in enumerate(self.line):
+            top = self.top[i]
+            bottom = top + self.height[i]
+            if line != current:
+                lines.append([self.page[i], top, bottom, [i]])
+                current = line
+                continue
+            entry = lines[-1]
+            entry[1] = min(entry[1], top)
+            entry[2] = max(entry[2], bottom)
+            entry[3].append(i)
+
+        rows = []
+        for page, top, bottom, indices in sorted(lines, key=lambda entry: (entry[0], entry[1])):
+            if rows and rows[-1][0] == page and same_row(top, bottom, rows[-1][1], rows[-1][2]):
+                _, row_top, row_bottom, row_lines = rows[-1]
+                row_lines.append(indices)
+                rows[-1] = (page, min(row_top, top), max(row_bottom, bottom), row_lines)
+            else:
+                rows.append((page, top, bottom, [indices]))
+        return rows
+
+    def box(self, indices):
+        """(left, top, right, bottom) around the given words"""
+        return (min(self.left[i] for i in indices), min(self.top[i] for i in indices),
+                max(self.left[i] + self.width[i] for i in indices), max(self.top[i] + self.height[i] for i in indices))
+
+    def to_bytes(self):
+        columns = [getattr(self, name) for name, _ in _COLUMNS]
+        if sys.byteorder != 'little':
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        body = b''.join(column.tobytes() for column in columns) + '\n'.join(self.text).encode('utf-8')
+        return _HEADER.pack(_MAGIC, len(self)) + zlib.compress(body)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Inverse of to_bytes; None for an empty or unrecognised blob"""
+        if not blob or len(blob) < _HEADER.size:
+            return None
+        magic, count = _HEADER.unpack_from(blob)
+        if magic != _MAGIC:
+            return None
+        body = zlib.decompress(blob[_HEADER.size:])
+        layout = cls()
+        position = 0
+        for name, typecode in _COLUMNS:
+            column = getattr(layout, name)
+            size = column.itemsize * count
+            column.frombytes(body[position:position + size])
+            if sys.byteorder != 'little':
+                column.byteswap()
+            position += size
+        layout.text = body[position:].decode('utf-8').split('\n') if count else []
+        return layout